@@ -0,0 +1,65 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from werkzeug.security import check_password_hash
+from .extensions import db
+from .erp_models import AppRole, User, UserRole, password_hash_for, password_needs_rehash
+
+# --- Authentication ---
+#
+# Login reads the user and their roles in one query and puts both into the
+# access token, so protected routes can trust the claims instead of loading
+# the user. Hashes made with an older PASSWORD_HASH_METHOD are replaced at the
+# next successful login. Known AppRole values are kept in a small per-process
+# LRU; roles are only ever added, so a cached role never goes stale.
+
+ROLE_CACHE_SIZE = 64
+
+class RoleCache:
+    def __init__(self, maxsize=ROLE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._roles = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Adds the AppRole row to the current session when the role is new
+    def ensure(self, role):
+        with self._lock:
+            if role in self._roles:
+                self._roles.move_to_end(role)
+                return
+        if db.session.get(AppRole, role) is None:
+            # Cached on a later lookup, once this transaction has committed it
+            db.session.add(AppRole(role=role))
+            return
+        with self._lock:
+            self._roles[role] = True
+            if len(self._roles) > self.maxsize:
+                self._roles.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._roles.clear()
+
+role_cache = RoleCache()
+
+# Returns (user_id, full_name, roles) for valid credentials, else None
+def authenticate(email, password):
+    users = User.__table__
+    roles = UserRole.__table__
+    rows = db.session.execute(
+        db.select(users.c.id, users.c.password_hash, users.c.full_name, roles.c.role)
+        .select_from(users.outerjoin(roles, roles.c.user_id == users.c.id))
+        .where(users.c.email == email)
+    ).all()
+    if not rows or not check_password_hash(rows[0].password_hash, password):
+        return None
+    user_id, full_name = rows[0].id, rows[0].full_name
+    if password_needs_rehash(rows[0].password_hash):
+        db.session.execute(db.update(users).where(users.c.id == user_id)
+                           .values(password_hash=password_hash_for(password), updated_at=datetime.utcnow()))
+        db.session.commit()
+    return user_id, full_name, sorted(row.role for row in rows if row.role)
+
+def token_claims(full_name, roles):
+    return {'name': full_name, 'roles': roles}
+# --- End Authentication ---
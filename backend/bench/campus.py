@@ -0,0 +1,142 @@
+import math
+import random
+from datetime import time
+from ..extensions import db
+from ..erp_models import Section, Subject, TimeSlot, Room, Faculty, FacultySubject, TimetableEntry
+from ..scheduling import DAYS
+
+# --- Synthetic Campus ---
+#
+# Builds a campus of any size with the same shape as a real one: seven periods
+# a day, a classroom per section, one lab per five sections, department-wide
+# theory subjects, lab subjects tied to a lab room, faculty loaded evenly
+# within their department and (optionally) a share of locked entries.
+# Rows go in with Core bulk inserts so thousands of sections load in seconds.
+
+SLOTS_PER_DAY = 7
+SECTIONS_PER_LAB = 5
+MAPPINGS_PER_FACULTY = 4
+INSERT_CHUNK_SIZE = 5000
+
+class CampusSpec:
+    def __init__(self, sections, departments=None, theory_per_section=6, labs_per_section=2,
+                 locked_fraction=0.05, seed=1):
+        self.sections = sections
+        self.departments = departments or max(1, min(20, sections // 50))
+        self.theory_per_section = theory_per_section
+        self.labs_per_section = labs_per_section
+        self.locked_fraction = locked_fraction
+        self.seed = seed
+
+    def to_dict(self):
+        return {
+            'sections': self.sections,
+            'departments': self.departments,
+            'theoryPerSection': self.theory_per_section,
+            'labsPerSection': self.labs_per_section,
+            'lockedFraction': self.locked_fraction,
+            'seed': self.seed
+        }
+
+def _insert(model, rows):
+    table = model.__table__
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        db.session.execute(table.insert(), rows[start:start + INSERT_CHUNK_SIZE])
+
+# Fills the (empty) database bound to the current app context and returns row counts
+def populate(spec):
+    rng = random.Random(spec.seed)
+    slots = [{
+        'id': f'slot-{order}', 'slot_order': order,
+        'start_time': time(8 + order, 0), 'end_time': time(8 + order, 50)
+    } for order in range(1, SLOTS_PER_DAY + 1)]
+
+    n_labs = max(1, math.ceil(spec.sections / SECTIONS_PER_LAB))
+    rooms = [{'id': f'room-{s}', 'name': f'R{s}', 'type': 'classroom', 'capacity': 60}
+             for s in range(spec.sections)]
+    rooms += [{'id': f'lab-{j}', 'name': f'L{j}', 'type': 'lab', 'capacity': 30} for j in range(n_labs)]
+
+    departments = [f'D{d}' for d in range(spec.departments)]
+    sections = [{
+        'id': f'sec-{s}', 'name': f'S{s}', 'department': departments[s % spec.departments],
+        'classroom': f'R{s}'
+    } for s in range(spec.sections)]
+
+    # Theory subjects are shared across a department; lab subjects belong to a lab room
+    subjects = []
+    theory_by_department = {}
+    for department in departments:
+        theory_by_department[department] = [f'{department}-T{k}' for k in range(spec.theory_per_section)]
+        subjects += [{
+            'id': subject_id, 'name': subject_id, 'code': subject_id, 'type': 'theory',
+            'credits': rng.choice([3, 4, 5]), 'lab_room': None
+        } for subject_id in theory_by_department[department]]
+    labs_by_room = {}
+    for j in range(n_labs):
+        labs_by_room[j] = [f'L{j}-P{k}' for k in range(spec.labs_per_section)]
+        subjects += [{
+            'id': subject_id, 'name': subject_id, 'code': subject_id, 'type': 'lab',
+            'credits': 2, 'lab_room': f'L{j}'
+        } for subject_id in labs_by_room[j]]
+
+    # Faculty per department, sized so each teaches about MAPPINGS_PER_FACULTY subjects
+    per_section = spec.theory_per_section + spec.labs_per_section
+    faculty, faculty_by_department = [], {}
+    for department in departments:
+        n_sections = sum(1 for s in sections if s['department'] == department)
+        count = max(1, math.ceil(n_sections * per_section / MAPPINGS_PER_FACULTY))
+        faculty_by_department[department] = [f'{department}-F{i}' for i in range(count)]
+        faculty += [{'id': f, 'name': f, 'department': department} for f in faculty_by_department[department]]
+
+    mappings = []
+    next_faculty = {department: 0 for department in departments}
+    for s, section in enumerate(sections):
+        department = section['department']
+        pool = faculty_by_department[department]
+        for subject_id in theory_by_department[department] + labs_by_room[s % n_labs]:
+            mappings.append({
+                'id': f'fs-{len(mappings)}', 'section_id': section['id'],
+                'subject_id': subject_id, 'faculty_id': pool[next_faculty[department] % len(pool)]
+            })
+            next_faculty[department] += 1
+
+    # Locked theory entries for a share of sections, placed without clashes
+    subject_type = {subject['id']: subject['type'] for subject in subjects}
+    classroom_id = {f'sec-{s}': f'room-{s}' for s in range(spec.sections)}
+    busy = set()
+    locked = []
+    for mapping in mappings:
+        if subject_type[mapping['subject_id']] != 'theory' or rng.random() >= spec.locked_fraction:
+            continue
+        section_id = mapping['section_id']
+        room_id = classroom_id[section_id]
+        for _ in range(20):
+            day, slot = rng.choice(DAYS), rng.choice(slots)
+            keys = [(kind, key, day, slot['id']) for kind, key in
+                    (('section', section_id), ('faculty', mapping['faculty_id']), ('room', room_id))]
+            if not any(k in busy for k in keys):
+                busy.update(keys)
+                locked.append({
+                    'id': f'locked-{len(locked)}', 'section_id': section_id, 'subject_id': mapping['subject_id'],
+                    'faculty_id': mapping['faculty_id'], 'room_id': room_id, 'time_slot_id': slot['id'],
+                    'day_of_week': day, 'session_type': 'theory', 'is_locked': True
+                })
+                break
+
+    _insert(TimeSlot, slots)
+    _insert(Room, rooms)
+    _insert(Section, sections)
+    _insert(Subject, subjects)
+    _insert(Faculty, faculty)
+    _insert(FacultySubject, mappings)
+    _insert(TimetableEntry, locked)
+    db.session.commit()
+    return {
+        'sections': len(sections),
+        'subjects': len(subjects),
+        'rooms': len(rooms),
+        'faculty': len(faculty),
+        'facultySubjects': len(mappings),
+        'lockedEntries': len(locked)
+    }
+# --- End Synthetic Campus ---
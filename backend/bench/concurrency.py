@@ -0,0 +1,92 @@
+import argparse
+import os
+import sys
+import tempfile
+import threading
+from collections import Counter
+
+# --- Concurrent Generation Check ---
+#
+# Fires overlapping generations (campus, department and section scopes) from
+# many threads at once, then scans every committed TimetableEntry for a
+# section, faculty member or room booked twice in the same period, counting
+# both periods of a lab. Exits non-zero when a clash is found:
+#
+#   python -m backend.bench.concurrency --threads 8 --rounds 3
+#   python -m backend.bench.concurrency --lock-timeout 30   # serialize instead of rejecting
+#   python -m backend.bench.concurrency --database mysql+pymysql://user:pw@localhost/erp_check
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m backend.bench.concurrency',
+                                     description='Check that concurrent generations never double-book.')
+    parser.add_argument('--database', default=None, help='SQLAlchemy URL (default: temp SQLite file); it is wiped')
+    parser.add_argument('--sections', type=int, default=60)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--lock-timeout', type=int, default=0, help='GENERATION_LOCK_TIMEOUT for the run')
+    return parser.parse_args(argv)
+
+def find_clashes():
+    from ..extensions import db
+    from ..erp_models import TimeSlot, TimetableEntry
+    from ..scheduling import session_slot_orders
+    entries = TimetableEntry.__table__
+    slots = TimeSlot.__table__
+    rows = db.session.execute(db.select(
+        entries.c.section_id, entries.c.faculty_id, entries.c.room_id, entries.c.day_of_week,
+        entries.c.session_type, slots.c.slot_order
+    ).select_from(entries.join(slots, slots.c.id == entries.c.time_slot_id))).all()
+    booked = Counter()
+    for row in rows:
+        for slot_order in session_slot_orders(row.session_type, row.slot_order):
+            for kind, resource in (('section', row.section_id), ('faculty', row.faculty_id), ('room', row.room_id)):
+                booked[(kind, resource, row.day_of_week, slot_order)] += 1
+    return len(rows), [key for key, count in booked.items() if count > 1]
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ['MYSQL_URI'] = args.database or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'concurrency.db')
+    from ..app import app
+    from ..extensions import db
+    from .campus import CampusSpec, populate
+
+    app.config['GENERATION_LOCK_TIMEOUT'] = args.lock_timeout
+    spec = CampusSpec(args.sections, departments=3)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        populate(spec)
+
+    # Every thread mixes scopes so campus, department and section runs overlap
+    scopes = [{}, {'department': 'D0'}, {'department': 'D1'}, {'department': 'D2'},
+              {'sectionId': 'sec-0'}, {'sectionId': 'sec-1'}]
+    statuses = Counter()
+    lock = threading.Lock()
+    start = threading.Barrier(args.threads)
+
+    def worker(index):
+        client = app.test_client()
+        start.wait()
+        for round_index in range(args.rounds):
+            scope = scopes[(index + round_index) % len(scopes)]
+            body = {'action': 'regenerate', 'output': 'summary', 'seed': index * 1000 + round_index, **scope}
+            response = client.post('/api/generate-timetable', json=body)
+            with lock:
+                statuses[response.status_code] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with app.app_context():
+        entry_count, clashes = find_clashes()
+    print(f"responses: {dict(sorted(statuses.items()))}  entries: {entry_count}  clashes: {len(clashes)}")
+    for clash in clashes[:20]:
+        print('  double-booked', clash)
+    return 1 if clashes or set(statuses) - {200, 409} else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
+# --- End Concurrent Generation Check ---
@@ -0,0 +1,163 @@
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+# --- Read Endpoint Load Test ---
+#
+# Hammers the read endpoints (timetable, stats, sections, faculty, time slots)
+# from a growing number of threads and reports throughput and latency:
+#
+#   python -m backend.bench.loadtest --concurrency 1,8,32 --duration 10
+#   python -m backend.bench.loadtest --url http://127.0.0.1:8000 --sections 500
+#
+# Without --url the app is served in-process on a seeded SQLite file (or the
+# --database URL), using the DB_* pool settings from the environment. With
+# --url it targets a running deployment, e.g. gunicorn on MySQL, whose
+# sections must follow the synthetic campus naming (seed it with --seed-only).
+
+DEFAULT_CONCURRENCY = '1,4,16'
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m backend.bench.loadtest', description='Load test the read endpoints.')
+    parser.add_argument('--url', default=None, help='base URL of a running server (default: serve in-process)')
+    parser.add_argument('--database', default=None, help='SQLAlchemy URL for the in-process server (default: temp SQLite file)')
+    parser.add_argument('--sections', type=int, default=200, help='synthetic campus size')
+    parser.add_argument('--concurrency', default=DEFAULT_CONCURRENCY, help='comma separated thread counts')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per concurrency level')
+    parser.add_argument('--seed-only', action='store_true', help='seed --database with a generated campus and exit')
+    parser.add_argument('--out', default=None, help='write results to this JSON file')
+    args = parser.parse_args(argv)
+    try:
+        args.concurrency = [int(c) for c in args.concurrency.split(',') if c.strip()]
+    except ValueError:
+        parser.error('--concurrency must be a comma separated list of integers')
+    if not args.concurrency or min(args.concurrency) < 1:
+        parser.error('--concurrency values must be positive')
+    return args
+
+def seed_campus(app, sections):
+    from ..extensions import db
+    from ..generation import run_generation
+    from .campus import CampusSpec, populate
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        counts = populate(CampusSpec(sections))
+        run_generation({'action': 'regenerate', 'output': 'summary'})
+        db.session.remove()
+    return counts
+
+def serve(app):
+    from werkzeug.serving import make_server
+    # One access log line per request would dominate the measurement
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+def request_paths(sections, rng):
+    section = rng.randrange(sections)
+    return rng.choice([
+        f'/api/timetable?section_id=sec-{section}',
+        '/api/stats',
+        '/api/sections?limit=100',
+        '/api/faculty?department=D0&limit=100',
+        '/api/time-slots',
+    ])
+
+def run_level(base_url, threads, duration, sections):
+    parts = urlsplit(base_url)
+    deadline = time.perf_counter() + duration
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def worker(index):
+        rng = random.Random(index)
+        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+        mine, failed = [], 0
+        while time.perf_counter() < deadline:
+            path = request_paths(sections, rng)
+            started = time.perf_counter()
+            try:
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+                continue
+            mine.append(time.perf_counter() - started)
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            errors.append(failed)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2) if latencies else None
+    return {
+        'concurrency': threads,
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'requestsPerSecond': round(len(latencies) / elapsed, 1),
+        'p50Ms': percentile(0.5),
+        'p95Ms': percentile(0.95),
+        'p99Ms': percentile(0.99)
+    }
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = None
+    base_url = args.url
+    if base_url is None or args.seed_only:
+        database = args.database or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'loadtest.db')
+        # The app reads its database URL on import
+        os.environ['MYSQL_URI'] = database
+        from ..app import app
+        counts = seed_campus(app, args.sections)
+        print(f"Seeded {counts['sections']} sections into {database}")
+        if args.seed_only:
+            return None
+        server, base_url = serve(app)
+
+    results = []
+    try:
+        for threads in args.concurrency:
+            row = run_level(base_url, threads, args.duration, args.sections)
+            results.append(row)
+            print(f"{threads:>4} threads  {row['requestsPerSecond']:>8} req/s  p50 {row['p50Ms']}ms  "
+                  f"p95 {row['p95Ms']}ms  p99 {row['p99Ms']}ms  errors {row['errors']}")
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    report = {'url': args.url, 'database': args.database, 'sections': args.sections,
+              'duration': args.duration, 'results': results}
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Results written to {args.out}')
+    return report
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
+# --- End Read Endpoint Load Test ---
@@ -0,0 +1,154 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+# --- Generation Benchmark ---
+#
+# Runs the full generation pipeline (load, entity build, solve, score, persist)
+# on synthetic campuses against SQLite and writes the timings as JSON:
+#
+#   python -m backend.bench.run --sizes 10,100,1000 --solver greedy --out bench.json
+#   python -m backend.bench.run --sizes 10,100,1000 --compare bench.json
+#
+# Peak memory comes from tracemalloc, which slows the solve down noticeably;
+# pass --no-memory for timings that are comparable with production.
+
+DEFAULT_SIZES = '10,100,1000'
+MAX_SECTIONS = 5000
+PHASES = ['load', 'build', 'solve', 'score', 'persist']
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m backend.bench.run', description='Benchmark timetable generation.')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='comma separated section counts (10 to 5000)')
+    parser.add_argument('--solver', default='greedy')
+    parser.add_argument('--time-budget', type=float, default=None, help='seconds for the search solvers')
+    parser.add_argument('--starts', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=1, help='seeds both the campus and the solver')
+    parser.add_argument('--locked-fraction', type=float, default=0.05)
+    parser.add_argument('--database', default='sqlite://', help='SQLAlchemy URL (default: in-memory SQLite)')
+    parser.add_argument('--no-memory', action='store_true', help='skip tracemalloc')
+    parser.add_argument('--out', default=None, help='write results to this JSON file')
+    parser.add_argument('--compare', default=None, help='print changes against an earlier results file')
+    args = parser.parse_args(argv)
+    try:
+        args.sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    except ValueError:
+        parser.error('--sizes must be a comma separated list of integers')
+    if not args.sizes or not all(1 <= size <= MAX_SECTIONS for size in args.sizes):
+        parser.error(f'--sizes must be between 1 and {MAX_SECTIONS}')
+    return args
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_size(app, sections, args):
+    from ..extensions import db
+    from ..generation import run_generation
+    from .campus import CampusSpec, populate
+
+    spec = CampusSpec(sections, locked_fraction=args.locked_fraction, seed=args.seed)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        started = time.perf_counter()
+        counts = populate(spec)
+        seed_seconds = time.perf_counter() - started
+        db.session.remove()
+
+        marks = []
+        def progress(phase=None, **values):
+            if phase is not None:
+                marks.append((phase, time.perf_counter()))
+
+        params = {'action': 'regenerate', 'solver': args.solver, 'seed': args.seed, 'starts': args.starts}
+        if args.time_budget is not None:
+            params['timeBudget'] = args.time_budget
+        if not args.no_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        result = run_generation(params, progress=progress)
+        finished = time.perf_counter()
+        peak = None
+        if not args.no_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        db.session.remove()
+
+    phases = {phase: 0.0 for phase in PHASES}
+    for (phase, at), (_, until) in zip(marks, marks[1:] + [(None, finished)]):
+        phases[phase] = phases.get(phase, 0.0) + until - at
+    missing = sum(u['missingSessions'] for u in result['unplaced'])
+    required = result['entriesCount'] + missing
+    return {
+        'sections': sections,
+        'campus': counts,
+        'seedSeconds': round(seed_seconds, 4),
+        'phases': {phase: round(seconds, 4) for phase, seconds in phases.items()},
+        'totalSeconds': round(finished - started, 4),
+        'peakMemoryMB': round(peak / 2 ** 20, 2) if peak is not None else None,
+        'placed': result['entriesCount'],
+        'required': required,
+        'placementRate': round(result['entriesCount'] / required, 4) if required else 1.0,
+        'score': result['score'],
+        'seed': result['seed'],
+        'iterations': result['iterations'],
+        'steps': result['steps']
+    }
+
+def print_row(row, previous=None):
+    line = (f"{row['sections']:>5} sections  {row['totalSeconds']:>8.3f}s  "
+            + '  '.join(f"{phase} {row['phases'][phase]:.3f}" for phase in PHASES)
+            + f"  placed {row['placementRate']:.2%}  score {row['score']}")
+    if row['peakMemoryMB'] is not None:
+        line += f"  peak {row['peakMemoryMB']}MB"
+    if previous:
+        line += f"  (x{row['totalSeconds'] / previous['totalSeconds']:.2f} time" if previous['totalSeconds'] else '  ('
+        line += f", score {row['score'] - previous['score']:+d})"
+    print(line)
+
+def main(argv=None):
+    args = parse_args(argv)
+    # The app reads its database URL on import
+    os.environ['MYSQL_URI'] = args.database
+    from ..app import app
+
+    previous = {}
+    if args.compare:
+        with open(args.compare) as f:
+            previous = {row['sections']: row for row in json.load(f)['results']}
+
+    results = []
+    for sections in args.sizes:
+        row = run_size(app, sections, args)
+        results.append(row)
+        print_row(row, previous.get(sections))
+
+    report = {
+        'commit': git_commit(),
+        'createdAt': int(time.time()),
+        'python': platform.python_version(),
+        'database': args.database,
+        'solver': args.solver,
+        'timeBudget': args.time_budget,
+        'starts': args.starts,
+        'memoryTraced': not args.no_memory,
+        'results': results
+    }
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Results written to {args.out}')
+    return report
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
+# --- End Generation Benchmark ---
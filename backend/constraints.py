@@ -0,0 +1,177 @@
+from .scheduling import DAYS, LAB_START_ORDERS, THEORY_SLOT_ORDERS
+from .scoring import SoftWeights, EARLY_SLOT, EARLY_PENALTY, LATE_SLOT, LATE_PENALTY, SECTION_DAY_LIMIT, \
+    OVERLOAD_PENALTY, GAP_PENALTY
+
+# --- Constraint Registry ---
+#
+# Scheduling rules are declared as data (the SCHEDULER_CONSTRAINTS config merged
+# with a request's "constraints") and compiled once per generation:
+#
+#   {
+#     "days": [1, 2, 3, 4, 5],
+#     "labStartOrders": [4, 3, 5, 2, 6],
+#     "theorySlotOrders": [3, 2, 4, 5, 1, 6, 7],
+#     "weights": {"earlySlot": 1, "earlyPenalty": 2, "lateSlot": 7, "latePenalty": 1,
+#                 "slotPenalties": {}, "sectionDayLimit": 5, "overloadPenalty": 3, "gapPenalty": 2},
+#     "hard": [
+#       {"type": "room_capacity", "sectionSizes": {"<section id>": 60}, "defaultSectionSize": 0},
+#       {"type": "faculty_unavailable", "facultyId": "<id>", "day": 3, "slots": [1, 2]},
+#       {"type": "room_unavailable", "roomId": "<id>", "day": 5},
+#       {"type": "max_consecutive", "limit": 3, "appliesTo": ["section", "faculty"]}
+#     ]
+#   }
+#
+# Hard constraints compile to pre-occupied week-mask bits, run-length limits
+# checked only when one is configured, and per-entity checks evaluated once
+# before the solve. Soft weights compile to a ScoreEngine penalty table.
+
+class ConstraintError(ValueError):
+    pass
+
+class CompiledConstraints:
+    def __init__(self, config=None):
+        self.config = config or {}  # the declaration, so worker processes can recompile it
+        self.days = list(DAYS)
+        self.lab_start_orders = list(LAB_START_ORDERS)
+        self.theory_slot_orders = list(THEORY_SLOT_ORDERS)
+        self.weights = SoftWeights()
+        self.unavailable = []     # (kind, resource_id, day, slot_orders or None for the whole day)
+        self.run_limits = {}      # 'section' | 'faculty' -> max consecutive periods
+        self.entity_checks = []   # (reason, predicate(entity) -> True when the entity cannot be placed)
+
+    # Entities no placement can satisfy, mapped to the reason; checked once per solve
+    def rejected(self, entities):
+        reasons = {}
+        if not self.entity_checks:
+            return reasons
+        for entity in entities:
+            for reason, check in self.entity_checks:
+                if check(entity):
+                    reasons[id(entity)] = reason
+                    break
+        return reasons
+
+def _int(value, name, minimum=0, maximum=None):
+    if isinstance(value, bool) or not isinstance(value, int) or value < minimum \
+            or (maximum is not None and value > maximum):
+        limit = f'between {minimum} and {maximum}' if maximum is not None else f'at least {minimum}'
+        raise ConstraintError(f'{name} must be an integer {limit}')
+    return value
+
+def _int_list(value, name, minimum=0, maximum=None):
+    if not isinstance(value, list) or not value:
+        raise ConstraintError(f'{name} must be a non-empty list of integers')
+    return [_int(v, name, minimum, maximum) for v in value]
+
+def compile_room_capacity(spec, compiled, rooms):
+    sizes = spec.get('sectionSizes', {})
+    if not isinstance(sizes, dict):
+        raise ConstraintError('room_capacity.sectionSizes must map section ids to sizes')
+    sizes = {section_id: _int(size, 'room_capacity.sectionSizes') for section_id, size in sizes.items()}
+    default_size = _int(spec.get('defaultSectionSize', 0), 'room_capacity.defaultSectionSize')
+    capacity = {room.id: room.capacity for room in rooms if getattr(room, 'capacity', None) is not None}
+    def too_small(entity):
+        room_capacity = capacity.get(entity.room_id)
+        return room_capacity is not None and sizes.get(entity.section_id, default_size) > room_capacity
+    compiled.entity_checks.append(('room_capacity', too_small))
+
+def _compile_unavailable(kind, id_key):
+    def compile_unavailable(spec, compiled, rooms):
+        resource_id = spec.get(id_key)
+        if not resource_id:
+            raise ConstraintError(f'{kind}_unavailable requires {id_key}')
+        day = _int(spec.get('day'), f'{kind}_unavailable.day', 0, 7)
+        slots = spec.get('slots')
+        if slots is not None:
+            slots = _int_list(slots, f'{kind}_unavailable.slots')
+        compiled.unavailable.append((kind, resource_id, day, slots))
+    return compile_unavailable
+
+def compile_max_consecutive(spec, compiled, rooms):
+    limit = _int(spec.get('limit'), 'max_consecutive.limit', 1)
+    applies_to = spec.get('appliesTo', ['section', 'faculty'])
+    if not isinstance(applies_to, list) or not set(applies_to) <= {'section', 'faculty'}:
+        raise ConstraintError("max_consecutive.appliesTo must list 'section' and/or 'faculty'")
+    for kind in applies_to:
+        compiled.run_limits[kind] = min(limit, compiled.run_limits.get(kind, limit))
+
+HARD_CONSTRAINTS = {
+    'room_capacity': compile_room_capacity,
+    'faculty_unavailable': _compile_unavailable('faculty', 'facultyId'),
+    'room_unavailable': _compile_unavailable('room', 'roomId'),
+    'max_consecutive': compile_max_consecutive,
+}
+
+def compile_weights(spec):
+    if not isinstance(spec, dict):
+        raise ConstraintError('weights must be an object')
+    early_slot = _int(spec.get('earlySlot', EARLY_SLOT), 'weights.earlySlot')
+    late_slot = _int(spec.get('lateSlot', LATE_SLOT), 'weights.lateSlot')
+    slot_penalties = {}
+    for slot_order, penalty in ((early_slot, spec.get('earlyPenalty', EARLY_PENALTY)),
+                                (late_slot, spec.get('latePenalty', LATE_PENALTY))):
+        slot_penalties[slot_order] = slot_penalties.get(slot_order, 0) + _int(penalty, 'weights slot penalty')
+    extra = spec.get('slotPenalties', {})
+    if not isinstance(extra, dict):
+        raise ConstraintError('weights.slotPenalties must map slot orders to penalties')
+    for slot_order, penalty in extra.items():
+        try:
+            slot_order = int(slot_order)
+        except (TypeError, ValueError):
+            raise ConstraintError('weights.slotPenalties keys must be slot orders')
+        slot_order = _int(slot_order, 'weights.slotPenalties slot order')
+        slot_penalties[slot_order] = slot_penalties.get(slot_order, 0) + _int(penalty, 'weights.slotPenalties')
+    return SoftWeights(
+        slot_penalties=slot_penalties,
+        section_day_limit=_int(spec.get('sectionDayLimit', SECTION_DAY_LIMIT), 'weights.sectionDayLimit'),
+        overload_penalty=_int(spec.get('overloadPenalty', OVERLOAD_PENALTY), 'weights.overloadPenalty'),
+        gap_penalty=_int(spec.get('gapPenalty', GAP_PENALTY), 'weights.gapPenalty')
+    )
+
+# Request settings override the configured ones key by key; hard constraints
+# add to the configured list, so a request cannot drop a campus-wide rule.
+def merge_constraints(configured, requested):
+    if requested is not None and not isinstance(requested, dict):
+        raise ConstraintError('constraints must be an object')
+    merged = dict(configured or {})
+    for key, value in (requested or {}).items():
+        if key == 'weights' and isinstance(value, dict):
+            merged['weights'] = {**merged.get('weights', {}), **value}
+        elif key == 'hard' and isinstance(value, list):
+            merged['hard'] = list(merged.get('hard', [])) + value
+        else:
+            merged[key] = value
+    return merged
+
+# Days the solver schedules on under config (a SCHEDULER_CONSTRAINTS declaration)
+def configured_days(config=None):
+    config = config or {}
+    if isinstance(config, dict) and 'days' in config:
+        return list(dict.fromkeys(_int_list(config['days'], 'days', 0, 7)))
+    return list(DAYS)
+
+def compile_constraints(config=None, rooms=()):
+    config = config or {}
+    if not isinstance(config, dict):
+        raise ConstraintError('constraints must be an object')
+    compiled = CompiledConstraints(config)
+    compiled.days = configured_days(config)
+    if 'labStartOrders' in config:
+        compiled.lab_start_orders = _int_list(config['labStartOrders'], 'labStartOrders')
+    if 'theorySlotOrders' in config:
+        compiled.theory_slot_orders = _int_list(config['theorySlotOrders'], 'theorySlotOrders')
+    if 'weights' in config:
+        compiled.weights = compile_weights(config['weights'])
+    hard = config.get('hard', [])
+    if not isinstance(hard, list):
+        raise ConstraintError('hard must be a list of constraints')
+    for spec in hard:
+        if not isinstance(spec, dict):
+            raise ConstraintError('each hard constraint must be an object')
+        compiler = HARD_CONSTRAINTS.get(spec.get('type'))
+        if compiler is None:
+            raise ConstraintError(f"Unknown hard constraint '{spec.get('type')}'. "
+                                  f"Available: {', '.join(sorted(HARD_CONSTRAINTS))}")
+        compiler(spec, compiled, rooms)
+    return compiled
+# --- End Constraint Registry ---
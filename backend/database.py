@@ -0,0 +1,60 @@
+import os
+from .extensions import db
+
+# --- Database Engine Configuration ---
+#
+# Engine options come from the environment so each deployment can size its
+# pools. Every gunicorn worker process has its own pool, so the database sees
+# up to workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections; keep that
+# below MySQL's max_connections.
+#
+#   DB_POOL_SIZE            connections kept open per process (default 5)
+#   DB_MAX_OVERFLOW         extra connections under load (default 10)
+#   DB_POOL_TIMEOUT         seconds to wait for a free connection (default 30)
+#   DB_POOL_RECYCLE         seconds before a connection is replaced (default 1800);
+#                           keep below MySQL's wait_timeout to avoid "server has gone away"
+#   DB_POOL_PRE_PING        1 to test connections on checkout (default 1)
+#   DB_STATEMENT_TIMEOUT_MS MySQL max_execution_time for SELECTs (default 0, off)
+#
+# MYSQL_REPLICA_URI adds a "replica" bind. Read-only endpoints run their
+# queries through read_bind(); everything else, including generation, uses
+# the primary. Replica reads can lag the primary by the replication delay.
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_OVERFLOW = 10
+DEFAULT_POOL_TIMEOUT = 30
+DEFAULT_POOL_RECYCLE = 1800
+
+def _env_int(name, default):
+    return int(os.getenv(name, str(default)))
+
+def _in_memory_sqlite(uri):
+    return uri.startswith('sqlite') and (uri in ('sqlite://', 'sqlite:///') or ':memory:' in uri)
+
+def engine_options(uri):
+    options = {'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', '1') == '1'}
+    # In-memory SQLite shares one connection; pool sizing does not apply
+    if not _in_memory_sqlite(uri):
+        options.update(
+            pool_size=_env_int('DB_POOL_SIZE', DEFAULT_POOL_SIZE),
+            max_overflow=_env_int('DB_MAX_OVERFLOW', DEFAULT_MAX_OVERFLOW),
+            pool_timeout=_env_int('DB_POOL_TIMEOUT', DEFAULT_POOL_TIMEOUT),
+            pool_recycle=_env_int('DB_POOL_RECYCLE', DEFAULT_POOL_RECYCLE)
+        )
+    timeout_ms = _env_int('DB_STATEMENT_TIMEOUT_MS', 0)
+    if timeout_ms and uri.startswith('mysql'):
+        options['connect_args'] = {'init_command': f'SET SESSION max_execution_time = {timeout_ms}'}
+    return options
+
+def replica_binds(uri):
+    if not uri:
+        return {}
+    return {'replica': {'url': uri, **engine_options(uri)}}
+
+# Engine for read-only queries: the replica when configured, else the primary
+def read_bind():
+    return db.engines.get('replica') or db.engine
+
+def read_execute(statement):
+    return db.session.execute(statement, bind_arguments={'bind': read_bind()})
+# --- End Database Engine Configuration ---
@@ -1,6 +1,25 @@
+from flask import current_app
 from .extensions import db
 from werkzeug.security import generate_password_hash, check_password_hash
 
+# A werkzeug method string, e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'
+DEFAULT_PASSWORD_HASH_METHOD = 'scrypt'
+_hash_prefixes = {}
+
+def password_hash_method():
+    return current_app.config.get('PASSWORD_HASH_METHOD') or DEFAULT_PASSWORD_HASH_METHOD
+
+def password_hash_for(password):
+    return generate_password_hash(password, method=password_hash_method())
+
+# True when a stored hash was made with other parameters than the configured ones
+def password_needs_rehash(password_hash):
+    method = password_hash_method()
+    if method not in _hash_prefixes:
+        # werkzeug fills in default parameters, so hash once to learn the full prefix
+        _hash_prefixes[method] = generate_password_hash('', method=method).split('$', 1)[0]
+    return password_hash.split('$', 1)[0] != _hash_prefixes[method]
+
 class AppRole(db.Model):
     __tablename__ = 'app_role'
     role = db.Column(db.String(20), primary_key=True)
@@ -8,9 +27,13 @@ class AppRole(db.Model):
 class UserRole(db.Model):
     __tablename__ = 'user_roles'
     id = db.Column(db.String(36), primary_key=True)
-    user_id = db.Column(db.String(36), nullable=False)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
     role = db.Column(db.String(20), db.ForeignKey('app_role.role'), nullable=False)
     created_at = db.Column(db.DateTime, nullable=False)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'role', name='uq_user_roles_user_role'),
+        db.Index('ix_user_roles_role', 'role'),
+    )
 
 class Profile(db.Model):
     __tablename__ = 'profiles'
@@ -41,7 +64,7 @@ class TimeSlot(db.Model):
     id = db.Column(db.String(36), primary_key=True)
     start_time = db.Column(db.Time, nullable=False)
     end_time = db.Column(db.Time, nullable=False)
-    slot_order = db.Column(db.Integer, nullable=False)
+    slot_order = db.Column(db.Integer, nullable=False, unique=True)
 
 class Room(db.Model):
     __tablename__ = 'rooms'
@@ -62,6 +85,11 @@ class FacultySubject(db.Model):
     faculty_id = db.Column(db.String(36), db.ForeignKey('faculty.id'), nullable=False)
     subject_id = db.Column(db.String(36), db.ForeignKey('subjects.id'), nullable=False)
     section_id = db.Column(db.String(36), db.ForeignKey('sections.id'), nullable=False)
+    __table_args__ = (
+        # Also serves the section-scoped lookups during generation
+        db.UniqueConstraint('section_id', 'subject_id', 'faculty_id', name='uq_faculty_subjects_section_subject_faculty'),
+        db.Index('ix_faculty_subjects_faculty', 'faculty_id'),
+    )
 
 class TimetableEntry(db.Model):
     __tablename__ = 'timetable_entries'
@@ -74,6 +102,38 @@ class TimetableEntry(db.Model):
     day_of_week = db.Column(db.Integer, nullable=False)
     session_type = db.Column(db.Enum('theory', 'lab'), nullable=False)
     is_locked = db.Column(db.Boolean, nullable=False, default=False)
+    # A section, faculty member or room can hold only one entry per day and slot.
+    # The leading columns double as the per-view (entity, day) indexes.
+    __table_args__ = (
+        db.UniqueConstraint('section_id', 'day_of_week', 'time_slot_id', name='uq_timetable_entries_section_slot'),
+        db.UniqueConstraint('faculty_id', 'day_of_week', 'time_slot_id', name='uq_timetable_entries_faculty_slot'),
+        db.UniqueConstraint('room_id', 'day_of_week', 'time_slot_id', name='uq_timetable_entries_room_slot'),
+        db.Index('ix_timetable_entries_locked_section', 'is_locked', 'section_id'),
+    )
+
+# Single row (id 1) counting committed timetable changes (see revisions.py); per-process caches
+# compare it to know when to reload
+class TimetableRevision(db.Model):
+    __tablename__ = 'timetable_revision'
+    id = db.Column(db.Integer, primary_key=True)
+    revision = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+# Sessions of a section the last generation that covered it could not place;
+# every generation rewrites the rows of the sections it scheduled
+class SectionUnplaced(db.Model):
+    __tablename__ = 'section_unplaced'
+    section_id = db.Column(db.String(36), db.ForeignKey('sections.id'), primary_key=True)
+    missing_sessions = db.Column(db.Integer, nullable=False)
+
+# Denormalized days x slots grid of one section, faculty member or room,
+# rewritten whenever its entries change (see grids.py)
+class TimetableGrid(db.Model):
+    __tablename__ = 'timetable_grids'
+    entity_type = db.Column(db.Enum('section', 'faculty', 'room'), primary_key=True)
+    entity_id = db.Column(db.String(36), primary_key=True)
+    payload = db.Column(db.Text, nullable=False)  # serialized JSON grid
+    updated_at = db.Column(db.DateTime, nullable=False)
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -85,6 +145,6 @@ class User(db.Model):
     updated_at = db.Column(db.DateTime, nullable=False)
     roles = db.relationship('UserRole', backref='user', lazy=True)
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hash_for(password)
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
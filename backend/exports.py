@@ -0,0 +1,245 @@
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime, timedelta
+from xml.sax.saxutils import escape
+from .extensions import db
+from .database import read_execute
+from .erp_models import TimeSlot, TimetableEntry, Section
+from .queries import QueryError, timetable_select, filter_timetable, format_time
+
+# --- Timetable Export ---
+#
+# CSV, XLSX and iCalendar exports of a section, faculty member, room or the
+# whole campus. Rows are read through a server-side cursor in batches and
+# written out as they arrive, so memory stays flat however many entries are
+# exported; no ORM objects are loaded. XLSX is written as a minimal
+# SpreadsheetML package straight into a streamed zip, without a spreadsheet
+# library.
+
+EXPORT_BATCH_SIZE = 1000  # rows fetched per round trip
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'ics': 'text/calendar; charset=utf-8',
+}
+DAY_NAMES = {1: 'Monday', 2: 'Tuesday', 3: 'Wednesday', 4: 'Thursday', 5: 'Friday', 6: 'Saturday', 7: 'Sunday'}
+ICS_DAYS = {1: 'MO', 2: 'TU', 3: 'WE', 4: 'TH', 5: 'FR', 6: 'SA', 7: 'SU'}
+COLUMNS = ['Section', 'Day', 'Start', 'End', 'Subject Code', 'Subject', 'Type', 'Faculty', 'Room', 'Locked']
+
+class ExportScope:
+    def __init__(self, section_id=None, faculty_id=None, room_id=None):
+        self.section_id = section_id
+        self.faculty_id = faculty_id
+        self.room_id = room_id
+
+    @property
+    def name(self):
+        for kind, value in (('section', self.section_id), ('faculty', self.faculty_id), ('room', self.room_id)):
+            if value:
+                return f'{kind}-{value}'
+        return 'campus'
+
+    def filename(self, fmt):
+        return re.sub(r'[^A-Za-z0-9._-]', '_', f'timetable-{self.name}.{fmt}')
+
+def _slot_ends():
+    # A lab ends with the period after the one it starts in
+    slots = read_execute(db.select(TimeSlot.slot_order, TimeSlot.end_time)).all()
+    return {slot.slot_order: slot.end_time for slot in slots}
+
+def export_rows(scope):
+    entries = TimetableEntry.__table__
+    slots = TimeSlot.__table__
+    query = filter_timetable(timetable_select(), section_id=scope.section_id,
+                             faculty_id=scope.faculty_id, room_id=scope.room_id)
+    # One person's or room's week reads by day; anything wider groups by section
+    order = [entries.c.day_of_week, slots.c.slot_order, entries.c.id]
+    if not (scope.faculty_id or scope.room_id):
+        order.insert(0, Section.__table__.c.name)
+    ends = _slot_ends()
+    result = read_execute(query.order_by(*order).execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for row in result:
+        end = ends.get(row.slot_order + 1, row.end_time) if row.session_type == 'lab' else row.end_time
+        yield row, end
+
+def _values(row, end):
+    return [row.section_name, DAY_NAMES.get(row.day_of_week, str(row.day_of_week)), format_time(row.start_time),
+            format_time(end), row.subject_code, row.subject_name, row.session_type, row.faculty_name,
+            row.room_name, 'yes' if row.is_locked else 'no']
+
+def stream_csv(scope):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for count, (row, end) in enumerate(export_rows(scope), 1):
+        writer.writerow(_values(row, end))
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+# --- XLSX ---
+
+class _ZipSink:
+    # Write-only file object for ZipFile; the generator drains what was written
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Timetable" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+def _xlsx_row(values):
+    # Inline strings avoid a shared string table that would need every value up front
+    cells = ''.join(f'<c t="inlineStr"><is><t>{escape(str(v))}</t></is></c>' for v in values)
+    return f'<row>{cells}</row>'
+
+def stream_xlsx(scope):
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as package:
+        for name, content in XLSX_PARTS.items():
+            package.writestr(name, content)
+        yield sink.drain()
+        with package.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                         '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                         '<sheetData>' + _xlsx_row(COLUMNS)).encode())
+            batch = []
+            for row, end in export_rows(scope):
+                batch.append(_xlsx_row(_values(row, end)))
+                if len(batch) >= EXPORT_BATCH_SIZE:
+                    sheet.write(''.join(batch).encode())
+                    batch = []
+                    yield sink.drain()
+            sheet.write((''.join(batch) + '</sheetData></worksheet>').encode())
+    yield sink.drain()
+# --- End XLSX ---
+
+# --- iCalendar ---
+
+def _ics_text(value):
+    return (str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n'))
+
+def _ics_line(line):
+    # Content lines are folded at 75 octets, continuations start with a space
+    data = line.encode()
+    if len(data) <= 75:
+        return line + '\r\n'
+    parts = []
+    while data:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(data))
+        # Never split a UTF-8 sequence
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode())
+        data = data[cut:]
+    return '\r\n '.join(parts) + '\r\n'
+
+def _ics_stamp(day, at):
+    return datetime.combine(day, at).strftime('%Y%m%dT%H%M%S')
+
+# start: first day of term (date); until: last day (date) or None for an open-ended rule
+def stream_ics(scope, start, until=None):
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+    rule_end = f';UNTIL={until.strftime("%Y%m%d")}T235959' if until else ''
+    yield ''.join(_ics_line(line) for line in (
+        'BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//ERP Timetable//Export//EN', 'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{_ics_text("Timetable " + scope.name)}'))
+    batch = []
+    for row, end in export_rows(scope):
+        # First occurrence: the term's first matching weekday
+        first = start + timedelta(days=(row.day_of_week - start.isoweekday()) % 7)
+        lines = [
+            'BEGIN:VEVENT',
+            f'UID:{row.id}@erp-timetable',
+            f'DTSTAMP:{stamp}',
+            f'DTSTART:{_ics_stamp(first, row.start_time)}',
+            f'DTEND:{_ics_stamp(first, end)}',
+            f'RRULE:FREQ=WEEKLY;BYDAY={ICS_DAYS.get(row.day_of_week, "MO")}{rule_end}',
+            f'SUMMARY:{_ics_text(f"{row.subject_code} {row.subject_name}" + (" (Lab)" if row.session_type == "lab" else ""))}',
+            f'LOCATION:{_ics_text(row.room_name)}',
+            f'DESCRIPTION:{_ics_text(f"Section {row.section_name}, {row.faculty_name}")}',
+            'END:VEVENT'
+        ]
+        batch.append(''.join(_ics_line(line) for line in lines))
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield ''.join(batch)
+            batch = []
+    yield ''.join(batch) + _ics_line('END:VCALENDAR')
+
+def parse_term(args):
+    def parse(name):
+        value = args.get(name)
+        if not value:
+            return None
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise QueryError(f'{name} must be a date (YYYY-MM-DD)')
+    today = date.today()
+    start = parse('start') or today - timedelta(days=today.weekday())  # this week's Monday
+    until = parse('until')
+    if until is not None and until < start:
+        raise QueryError('until must not be before start')
+    return start, until
+# --- End iCalendar ---
+
+def export_stream(fmt, scope, args):
+    if fmt not in FORMATS:
+        raise QueryError(f"format must be one of: {', '.join(FORMATS)}")
+    if fmt == 'csv':
+        return stream_csv(scope)
+    if fmt == 'xlsx':
+        return stream_xlsx(scope)
+    start, until = parse_term(args)
+    return stream_ics(scope, start, until)
+# --- End Timetable Export ---
@@ -0,0 +1,362 @@
+import json
+import uuid
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from .extensions import db
+from .erp_models import Section, Subject, TimeSlot, Room, Faculty, FacultySubject, TimetableEntry, SectionUnplaced
+from .scheduling import SchedulableEntity, SchedulingContext, session_slot_orders, occupy_mask
+from .solver import solve, SolverError, SolverCancelled
+from .constraints import compile_constraints, merge_constraints, ConstraintError
+from .locks import NamedLock
+from .grids import empty_touched, note_touched, refresh_grids
+from .revisions import bump_revision
+
+INSERT_CHUNK_SIZE = 1000  # rows per executemany batch when persisting entries
+COMMIT_LOCK_TIMEOUT = 30  # seconds to wait for another generation's commit
+
+class GenerationError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+class GenerationCancelled(Exception):
+    pass
+
+OUTPUTS = ('entries', 'summary', 'stream')
+
+class GenerationRun:
+    # A solved generation waiting to be persisted
+    def __init__(self, action, scope_section_ids, scoped, context, entities, result):
+        self.action = action
+        self.scope_section_ids = scope_section_ids
+        self.scoped = scoped
+        self.context = context
+        self.faculty_ids = list({e.faculty_id for e in entities})
+        self.room_ids = list({e.room_id for e in entities})
+        self.result = result
+
+def output_mode(params, allow_stream=False):
+    output = params.get('output', 'entries')
+    if output not in OUTPUTS:
+        raise GenerationError(f"output must be one of: {', '.join(OUTPUTS)}")
+    if output == 'stream' and not allow_stream:
+        raise GenerationError('Streaming output is only available for synchronous requests')
+    return output
+
+# Load, solve and persist one timetable generation. params is the
+# /api/generate-timetable request body; progress and cancel are optional
+# hooks used by background jobs. With output 'summary' the entries are
+# persisted but left out of the payload.
+def run_generation(params, progress=None, cancel=None):
+    output = output_mode(params)
+    lock = acquire_scope_lock(params)
+    try:
+        run = prepare_generation(params, progress=progress, cancel=cancel)
+        entries = []
+        count = 0
+        for chunk in persist_entries(run, progress=progress, cancel=cancel):
+            count += len(chunk)
+            if output == 'entries':
+                entries.extend(chunk)
+    finally:
+        lock.release()
+    payload = generation_summary(run, count)
+    if output == 'entries':
+        payload['entries'] = entries
+    return payload
+
+# Overlapping scopes are serialized through one lock per department: a campus
+# run takes every department, a department run its own and a section run its
+# section's department. Clashes between departments that share faculty or
+# rooms are caught when committing (see persist_entries).
+def scope_lock_names(params):
+    if params.get('sectionId'):
+        department = db.session.execute(
+            db.select(Section.department).where(Section.id == params['sectionId'])).scalar()
+        departments = [department] if department is not None else []
+    elif params.get('department'):
+        departments = [params['department']]
+    else:
+        departments = db.session.execute(db.select(Section.department).distinct()).scalars().all()
+    db.session.commit()
+    return [f'department:{department}' for department in departments]
+
+# GENERATION_LOCK_TIMEOUT seconds to wait for an overlapping generation; 0 rejects at once
+def acquire_scope_lock(params):
+    lock = NamedLock(scope_lock_names(params), current_app.config.get('GENERATION_LOCK_TIMEOUT', 0))
+    if not lock.acquire():
+        raise GenerationError('Another timetable generation is running for this scope; please retry', 409)
+    return lock
+
+# Entries that survive a run: everything except the unlocked entries of the
+# scope when regenerating. For scoped runs only entries sharing a section,
+# faculty member or room with the scope can clash, so only those are loaded.
+def surviving_entries(action, scoped, scope_section_ids, faculty_ids, room_ids):
+    query = db.session.query(
+        TimetableEntry.faculty_id, TimetableEntry.section_id, TimetableEntry.room_id,
+        TimetableEntry.time_slot_id, TimetableEntry.day_of_week, TimetableEntry.session_type
+    )
+    if action == 'regenerate':
+        if scoped:
+            query = query.filter(db.or_(
+                TimetableEntry.is_locked == True,
+                TimetableEntry.section_id.notin_(scope_section_ids)
+            ))
+        else:
+            query = query.filter(TimetableEntry.is_locked == True)
+    if scoped:
+        query = query.filter(db.or_(
+            TimetableEntry.section_id.in_(scope_section_ids),
+            TimetableEntry.faculty_id.in_(faculty_ids),
+            TimetableEntry.room_id.in_(room_ids)
+        ))
+    return query.all()
+
+# Load, build and solve; nothing is written
+def prepare_generation(params, progress=None, cancel=None):
+    action = params.get('action', 'generate')
+    section_id = params.get('sectionId')
+    department = params.get('department')
+    solver = params.get('solver', 'greedy')
+    time_budget = params.get('timeBudget')
+    seed = params.get('seed')
+    starts = params.get('starts', 1)
+    iterations = params.get('iterations')
+    steps = params.get('steps')
+
+    def report(**values):
+        if progress:
+            progress(**values)
+
+    report(phase='load')
+    # Scope: one section, one department or (by default) the whole campus
+    if section_id:
+        sections = Section.query.filter_by(id=section_id).all()
+    elif department:
+        sections = Section.query.filter_by(department=department).all()
+    else:
+        sections = Section.query.all()
+    scoped = bool(section_id or department)
+    if scoped and not sections:
+        raise GenerationError('No sections found for the requested scope', 404)
+    scope_section_ids = [s.id for s in sections]
+
+    # Fetch only the rows the scope needs
+    time_slots = TimeSlot.query.order_by(TimeSlot.slot_order).all()
+    rooms = Room.query.all()
+    if scoped:
+        faculty_subjects = FacultySubject.query.filter(FacultySubject.section_id.in_(scope_section_ids)) \
+            .order_by(FacultySubject.id).all()
+        subject_ids = {fs.subject_id for fs in faculty_subjects}
+        faculty_ids = {fs.faculty_id for fs in faculty_subjects}
+        subjects = Subject.query.filter(Subject.id.in_(list(subject_ids))).all() if subject_ids else []
+        faculty = Faculty.query.filter(Faculty.id.in_(list(faculty_ids))).all() if faculty_ids else []
+    else:
+        faculty_subjects = FacultySubject.query.order_by(FacultySubject.id).all()
+        subjects = Subject.query.all()
+        faculty = Faculty.query.all()
+
+    report(phase='build')
+    # Compile the configured and requested scheduling rules
+    try:
+        constraints = compile_constraints(
+            merge_constraints(current_app.config.get('SCHEDULER_CONSTRAINTS'), params.get('constraints')), rooms)
+    except ConstraintError as e:
+        raise GenerationError(str(e))
+
+    # Build lookups
+    context = SchedulingContext(time_slots, rooms, constraints)
+    section_classroom = {section.id: section.classroom for section in sections}
+    subject_by_id = {subject.id: subject for subject in subjects}
+    faculty_by_id = {f.id: f for f in faculty}
+    section_by_id = {s.id: s for s in sections}
+
+    # Create schedulable entities
+    entities = []
+    for fs in faculty_subjects:
+        subject = subject_by_id.get(fs.subject_id)
+        faculty_member = faculty_by_id.get(fs.faculty_id)
+        section = section_by_id.get(fs.section_id)
+        if not subject or not faculty_member or not section:
+            continue
+        # Determine room
+        room_id = context.room_id_for(subject, section_classroom.get(fs.section_id))
+        slots_required = 1 if subject.type == 'lab' else max(2, int(round(subject.credits / 1.5)))
+        entities.append(SchedulableEntity(
+            section_id=fs.section_id,
+            subject_id=fs.subject_id,
+            faculty_id=fs.faculty_id,
+            room_id=room_id,
+            session_type=subject.type,
+            slots_required=slots_required,
+            subject_code=subject.code,
+            subject_name=subject.name,
+            faculty_name=faculty_member.name
+        ))
+
+    # Entries that survive this run are fixed occupancy
+    fixed_entries = surviving_entries(action, scoped, scope_section_ids,
+                                      list({e.faculty_id for e in entities}), list({e.room_id for e in entities}))
+    # Release the read transaction before the (possibly long) solve
+    db.session.commit()
+
+    # Generate schedule
+    report(phase='solve')
+    try:
+        result = solve(entities, time_slots, rooms, fixed_entries, solver=solver, time_budget=time_budget,
+                       seed=seed, context=context, progress=progress, cancel=cancel, starts=starts,
+                       iterations=iterations, steps=steps,
+                       max_workers=current_app.config.get('MULTISTART_WORKERS'))
+    except SolverError as e:
+        raise GenerationError(str(e))
+    except SolverCancelled:
+        raise GenerationCancelled('Generation cancelled')
+    return GenerationRun(action, scope_section_ids, scoped, context, entities, result)
+
+# Plain row for a new entry; it doubles as the response dict
+def entry_row(assignment, entry_id=None):
+    return {
+        'id': entry_id or str(uuid.uuid4()),
+        'section_id': assignment.entity.section_id,
+        'subject_id': assignment.entity.subject_id,
+        'faculty_id': assignment.entity.faculty_id,
+        'room_id': assignment.entity.room_id,
+        'time_slot_id': assignment.time_slot_id,
+        'day_of_week': assignment.day_of_week,
+        'session_type': assignment.entity.session_type,
+        'is_locked': False
+    }
+
+# True if no assignment overlaps the entries that survive the run as they are
+# now. Unlike the unique keys this also covers the second period of labs.
+def still_free(run):
+    fixed = surviving_entries(run.action, run.scoped, run.scope_section_ids, run.faculty_ids, run.room_ids)
+    state = run.context.conflict_state(fixed)
+    for a in run.result['assignments']:
+        e = a.entity
+        mask = state.mask(a.day_of_week, session_slot_orders(e.session_type, a.slot_order))
+        if state.busy(e.faculty_id, e.section_id, e.room_id) & mask:
+            return False
+        occupy_mask(state, e.faculty_id, e.section_id, e.room_id, mask)
+    return True
+
+# Rewrites the unplaced session counts of every section the run scheduled,
+# for the dashboard stats of every worker
+def record_unplaced(run):
+    missing = dict.fromkeys(run.scope_section_ids, 0)
+    for u in run.result['unplaced']:
+        missing[u['sectionId']] = missing.get(u['sectionId'], 0) + u['missingSessions']
+    table = SectionUnplaced.__table__
+    stale = table.delete()
+    if run.scoped:
+        stale = stale.where(table.c.section_id.in_(list(missing)))
+    db.session.execute(stale)
+    if missing:
+        db.session.execute(table.insert(), [{'section_id': section_id, 'missing_sessions': count}
+                                            for section_id, count in missing.items()])
+
+# Clears the scope's unlocked entries and inserts the new ones in a single
+# transaction, yielding each inserted chunk of rows. The rows are committed
+# once the generator is exhausted; abandoning it rolls everything back.
+# Commits are serialized campus-wide, and each one first re-checks the new
+# entries against what other generations committed since this one loaded.
+# The affected grid snapshots are rebuilt in the same transaction.
+def persist_entries(run, progress=None, cancel=None):
+    # Last point at which a job can still be cancelled without side effects
+    if cancel is not None and cancel.is_set():
+        raise GenerationCancelled('Generation cancelled')
+    if progress:
+        progress(phase='persist')
+    assignments = run.result['assignments']
+    entries_table = TimetableEntry.__table__
+    commit_lock = NamedLock(['commit'], COMMIT_LOCK_TIMEOUT)
+    if not commit_lock.acquire():
+        raise GenerationError('Timed out waiting for another generation to commit; please retry', 409)
+    try:
+        if not still_free(run):
+            raise GenerationError('The timetable changed during generation; please retry', 409)
+        # Grids to rebuild; a campus regeneration rebuilds them all
+        touched = None if run.action == 'regenerate' and not run.scoped else empty_touched()
+        if run.action == 'regenerate':
+            stale = entries_table.delete().where(entries_table.c.is_locked == False)
+            if run.scoped:
+                stale = stale.where(entries_table.c.section_id.in_(run.scope_section_ids))
+                removed = db.session.execute(
+                    db.select(entries_table.c.section_id, entries_table.c.faculty_id, entries_table.c.room_id)
+                    .where(stale.whereclause).distinct()).all()
+                note_touched(touched, [row._mapping for row in removed])
+            db.session.execute(stale)
+        for start in range(0, len(assignments), INSERT_CHUNK_SIZE):
+            rows = [entry_row(a) for a in assignments[start:start + INSERT_CHUNK_SIZE]]
+            db.session.execute(entries_table.insert(), rows)
+            if touched is not None:
+                note_touched(touched, rows)
+            yield rows
+        refresh_grids(touched)
+        record_unplaced(run)
+        bump_revision()
+        db.session.commit()
+    except IntegrityError:
+        # The unique slot keys caught a clash with entries written since the load
+        db.session.rollback()
+        raise GenerationError('Generated entries clash with the current timetable; please retry', 409)
+    except (Exception, GeneratorExit):
+        db.session.rollback()
+        raise
+    finally:
+        commit_lock.release()
+
+def generation_summary(run, entries_count):
+    result = run.result
+    payload = {
+        'success': True,
+        'message': result['message'],
+        'solver': result['solver'],
+        # Re-running with this solver, seed, iterations and steps reproduces the
+        # timetable, including where the time budget cut the search short
+        'seed': result['seed'],
+        'iterations': result['iterations'],
+        'steps': result['steps'],
+        'score': result['score'],
+        'unplaced': result['unplaced'],
+        'entriesCount': entries_count
+    }
+    if 'starts' in result:
+        payload['starts'] = result['starts']
+    return payload
+
+# Takes the scope lock and solves. The body releases the lock once the entries
+# are committed; the caller should also call release() when the response
+# closes, in case the body is abandoned before it starts.
+def prepare_stream(params, progress=None):
+    lock = acquire_scope_lock(params)
+    try:
+        run = prepare_generation(params, progress=progress)
+    except BaseException:
+        lock.release()
+        raise
+    return stream_generation(run, lock.release), lock.release
+
+# NDJSON body for output 'stream': {"type": "entry"} lines for the committed
+# entries, then a {"type": "summary"} line, or a single {"type": "error"} line.
+# The entries are persisted and the locks released before anything is written
+# out, so a slow client never holds up other commits. Only the new ids are kept
+# meanwhile; the rows are rebuilt from the assignments chunk by chunk as the
+# body is sent.
+def stream_generation(run, release=None):
+    ids = []
+    try:
+        for chunk in persist_entries(run):
+            ids.extend(row['id'] for row in chunk)
+    except GenerationError as e:
+        yield json.dumps({'type': 'error', 'error': str(e), 'status': e.status}) + '\n'
+        return
+    finally:
+        if release is not None:
+            release()
+    assignments = run.result['assignments']
+    for start in range(0, len(ids), INSERT_CHUNK_SIZE):
+        end = start + INSERT_CHUNK_SIZE
+        yield ''.join(json.dumps({'type': 'entry', 'entry': entry_row(a, entry_id)}) + '\n'
+                      for a, entry_id in zip(assignments[start:end], ids[start:end]))
+    yield json.dumps({'type': 'summary', **generation_summary(run, len(ids))}) + '\n'
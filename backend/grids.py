@@ -0,0 +1,157 @@
+import json
+from datetime import datetime
+from .extensions import db
+from .database import read_execute
+from .erp_models import Section, Faculty, Room, TimeSlot, TimetableEntry, TimetableGrid
+from .queries import timetable_select, row_to_dict
+from .scheduling import DAYS
+
+# --- Timetable Grid Snapshots ---
+#
+# Each section, faculty member and room has a precomputed days x slots grid
+# in timetable_grids, so its timetable view is a single primary-key lookup
+# instead of a five-table join. Grids are rebuilt in the same transaction as
+# the change that affects them: generation commits, lock toggles and imports
+# that rename an entity. A missing grid (e.g. before the first generation
+# after an upgrade) is built on the fly from the entries.
+#
+# Payload: {"entityType", "entityId", "days": [1, ...], "timeSlots": [...],
+# "grid": [[cell or null per time slot] per day], "sections", "subjects",
+# "faculty", "rooms", "updatedAt"}. A cell holds the entry's own columns and
+# the ids of its section, subject, faculty member and room, which are looked
+# up in the id-keyed tables alongside. Entries sit in their starting period;
+# a lab's second period is left null.
+
+GRID_KINDS = {'section': 'section_id', 'faculty': 'faculty_id', 'room': 'room_id'}
+GRID_MODELS = {'section': Section, 'faculty': Faculty, 'room': Room}
+IN_CHUNK_SIZE = 500  # ids per IN list
+
+def empty_touched():
+    return {kind: set() for kind in GRID_KINDS}
+
+# Records the grids affected by entry rows (dicts or row mappings)
+def note_touched(touched, rows):
+    for row in rows:
+        for kind, column in GRID_KINDS.items():
+            touched[kind].add(row[column])
+
+def _chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), IN_CHUNK_SIZE):
+        yield ids[start:start + IN_CHUNK_SIZE]
+
+# Cell and lookup-table parts of one entry, shared by its three grids
+def _cell(row):
+    return (
+        {
+            'id': row.id,
+            'session_type': row.session_type,
+            'is_locked': bool(row.is_locked),
+            'section_id': row.section_id,
+            'subject_id': row.subject_id,
+            'faculty_id': row.faculty_id,
+            'room_id': row.room_id
+        },
+        {'id': row.section_id, 'name': row.section_name, 'classroom': row.classroom},
+        {'id': row.subject_id, 'name': row.subject_name, 'code': row.subject_code, 'type': row.subject_type},
+        {'id': row.faculty_id, 'name': row.faculty_name},
+        {'id': row.room_id, 'name': row.room_name, 'type': row.room_type}
+    )
+
+def grid_payload(kind, entity_id, rows, time_slots, updated_at):
+    cells = [(row.day_of_week, row.time_slot_id, _cell(row)) for row in rows]
+    return build_payload(kind, entity_id, cells, time_slots, updated_at)
+
+# cells: (day_of_week, time_slot_id, _cell(row)) per entry
+def build_payload(kind, entity_id, cells, time_slots, updated_at):
+    days = sorted(set(DAYS).union(day for day, _, _ in cells))
+    day_index = {day: i for i, day in enumerate(days)}
+    slot_index = {slot['id']: i for i, slot in enumerate(time_slots)}
+    grid = [[None] * len(time_slots) for _ in days]
+    tables = {'sections': {}, 'subjects': {}, 'faculty': {}, 'rooms': {}}
+    for day, time_slot_id, (cell, section, subject, faculty, room) in cells:
+        grid[day_index[day]][slot_index[time_slot_id]] = cell
+        tables['sections'][section['id']] = section
+        tables['subjects'][subject['id']] = subject
+        tables['faculty'][faculty['id']] = faculty
+        tables['rooms'][room['id']] = room
+    return {
+        'entityType': kind,
+        'entityId': entity_id,
+        'days': days,
+        'timeSlots': time_slots,
+        'grid': grid,
+        **tables,
+        'updatedAt': updated_at.isoformat()
+    }
+
+def _time_slots(execute):
+    rows = execute(db.select(TimeSlot.__table__).order_by(TimeSlot.slot_order)).all()
+    return [row_to_dict(row) for row in rows]
+
+# Rebuilds the grids in touched ({kind: ids}), or every grid when touched is
+# None, inside the current transaction. The caller commits.
+def refresh_grids(touched=None):
+    execute = db.session.execute
+    grids = TimetableGrid.__table__
+    time_slots = _time_slots(execute)
+    now = datetime.utcnow()
+    if touched is None:
+        touched = {kind: set(execute(db.select(model.id)).scalars()) for kind, model in GRID_MODELS.items()}
+        execute(grids.delete())
+        cells_by_kind = {kind: {} for kind in GRID_KINDS}
+        for row in execute(timetable_select()):
+            cell = (row.day_of_week, row.time_slot_id, _cell(row))
+            for kind, column in GRID_KINDS.items():
+                cells_by_kind[kind].setdefault(row._mapping[column], []).append(cell)
+        _write(touched, cells_by_kind, time_slots, now, delete=False)
+        return
+    entries = TimetableEntry.__table__
+    cells_by_kind = {kind: {} for kind in GRID_KINDS}
+    for kind, column in GRID_KINDS.items():
+        for ids in _chunks(touched[kind]):
+            for row in execute(timetable_select().where(entries.c[column].in_(ids))):
+                cell = (row.day_of_week, row.time_slot_id, _cell(row))
+                cells_by_kind[kind].setdefault(row._mapping[column], []).append(cell)
+    _write(touched, cells_by_kind, time_slots, now, delete=True)
+
+def _write(touched, cells_by_kind, time_slots, now, delete):
+    grids = TimetableGrid.__table__
+    for kind in GRID_KINDS:
+        for ids in _chunks(touched[kind]):
+            if delete:
+                db.session.execute(grids.delete().where(grids.c.entity_type == kind, grids.c.entity_id.in_(ids)))
+            db.session.execute(grids.insert(), [{
+                'entity_type': kind,
+                'entity_id': entity_id,
+                'payload': json.dumps(build_payload(kind, entity_id, cells_by_kind[kind].get(entity_id, []),
+                                                    time_slots, now), separators=(',', ':')),
+                'updated_at': now
+            } for entity_id in ids])
+
+# Rebuilds the grids of every entity whose entries reference ids in column
+# (e.g. after a subject is renamed)
+def refresh_grids_referencing(column, ids):
+    entries = TimetableEntry.__table__
+    touched = empty_touched()
+    for chunk in _chunks(ids):
+        rows = db.session.execute(db.select(entries.c.section_id, entries.c.faculty_id, entries.c.room_id)
+                                  .where(entries.c[column].in_(chunk)).distinct()).all()
+        note_touched(touched, [row._mapping for row in rows])
+    if any(touched.values()):
+        refresh_grids(touched)
+
+# Serialized grid for one entity, or None if the entity does not exist
+def load_grid(kind, entity_id):
+    grids = TimetableGrid.__table__
+    payload = read_execute(db.select(grids.c.payload)
+                           .where(grids.c.entity_type == kind, grids.c.entity_id == entity_id)).scalar()
+    if payload is not None:
+        return payload
+    model = GRID_MODELS[kind]
+    if read_execute(db.select(model.id).where(model.id == entity_id)).scalar() is None:
+        return None
+    rows = read_execute(timetable_select().where(TimetableEntry.__table__.c[GRID_KINDS[kind]] == entity_id)).all()
+    return json.dumps(grid_payload(kind, entity_id, rows, _time_slots(read_execute), datetime.utcnow()),
+                      separators=(',', ':'))
+# --- End Timetable Grid Snapshots ---
@@ -0,0 +1,337 @@
+import csv
+import io
+import json
+import uuid
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from .extensions import db
+from .erp_models import Section, Subject, Room, Faculty, FacultySubject, User, UserRole
+from .auth import role_cache
+from .grids import refresh_grids_referencing
+from .revisions import bump_revision
+from .locks import NamedLock
+from .generation import COMMIT_LOCK_TIMEOUT
+
+# --- Bulk Import ---
+#
+# CSV (with a header row) or JSON lines are parsed as a stream, validated in
+# batches and upserted one transaction per batch, so a bad row costs only
+# itself and a failed batch only its own rows. Column types, enum choices and
+# lengths come from the models; each batch checks references, unique columns
+# and existing keys with one query apiece.
+
+BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+FORMATS = ('csv', 'jsonl')
+
+class UploadError(ValueError):
+    pass
+
+class ImportSpec:
+    # required/optional: field names in the upload (after aliases are applied)
+    # aliases: upload column -> model column
+    # references: column -> model whose id it must name
+    # unique: columns unique across the table besides the key
+    # natural_key: columns identifying an existing row when the upload has no id
+    # entry_column: TimetableEntry column whose grids embed this entity's fields
+    def __init__(self, model, required, optional=(), aliases=None, references=None, unique=(),
+                 natural_key=None, insert_defaults=None, update_defaults=None, after_upsert=None,
+                 entry_column=None):
+        self.model = model
+        self.table = model.__table__
+        self.required = list(required)
+        self.optional = list(optional)
+        self.aliases = aliases or {}
+        self.references = references or {}
+        self.unique = list(unique)
+        self.natural_key = natural_key
+        self.insert_defaults = insert_defaults
+        self.update_defaults = update_defaults
+        self.after_upsert = after_upsert
+        self.entry_column = entry_column
+
+    @property
+    def fields(self):
+        return self.required + self.optional
+
+def _now_fields():
+    now = datetime.utcnow()
+    return {'created_at': now, 'updated_at': now}
+
+# Every imported student gets the 'student' role that add_student used to skip
+def _ensure_student_roles(user_ids):
+    if not user_ids:
+        return
+    role_cache.ensure('student')
+    db.session.flush()
+    roles = UserRole.__table__
+    has_role = set(db.session.execute(
+        db.select(roles.c.user_id).where(roles.c.role == 'student', roles.c.user_id.in_(user_ids))).scalars())
+    now = datetime.utcnow()
+    missing = [{'id': str(uuid.uuid4()), 'user_id': user_id, 'role': 'student', 'created_at': now}
+               for user_id in user_ids if user_id not in has_role]
+    if missing:
+        db.session.execute(roles.insert(), missing)
+
+IMPORTS = {
+    'faculty': ImportSpec(Faculty, required=['id', 'name', 'department'], entry_column='faculty_id'),
+    'students': ImportSpec(
+        User, required=['id', 'full_name', 'email'],
+        aliases={'roll': 'id', 'name': 'full_name'}, unique=['email'],
+        insert_defaults=lambda: dict(_now_fields(), password_hash=''),
+        update_defaults=lambda: {'updated_at': datetime.utcnow()},
+        after_upsert=_ensure_student_roles
+    ),
+    'sections': ImportSpec(Section, required=['id', 'name', 'department', 'classroom'], entry_column='section_id'),
+    'subjects': ImportSpec(Subject, required=['id', 'name', 'code', 'type', 'credits'], optional=['lab_room'],
+                           entry_column='subject_id'),
+    'rooms': ImportSpec(Room, required=['id', 'name', 'type', 'capacity'], entry_column='room_id'),
+    'faculty-subjects': ImportSpec(
+        FacultySubject, required=['faculty_id', 'subject_id', 'section_id'], optional=['id'],
+        references={'faculty_id': Faculty, 'subject_id': Subject, 'section_id': Section},
+        natural_key=('section_id', 'subject_id', 'faculty_id')
+    ),
+}
+
+def detect_format(fmt, filename, content_type):
+    if fmt:
+        if fmt not in FORMATS:
+            raise UploadError(f"format must be one of: {', '.join(FORMATS)}")
+        return fmt
+    name = (filename or '').lower()
+    if name.endswith('.csv') or 'csv' in (content_type or ''):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')) or 'json' in (content_type or ''):
+        return 'jsonl'
+    raise UploadError('Could not tell the upload format; pass format=csv or format=jsonl')
+
+# Yields (line number, dict or None, parse error or None) from a binary stream
+def parse_rows(stream, fmt):
+    line_number = 0
+    try:
+        for line_number, raw, error in _parse_text(stream, fmt):
+            yield line_number, raw, error
+    except UnicodeDecodeError:
+        # Rows before this point are already imported; report where reading stopped
+        yield line_number + 1, None, 'Upload must be UTF-8 encoded; stopped reading here'
+    except csv.Error as e:
+        yield line_number + 1, None, f'Malformed CSV, stopped reading here: {e}'
+
+def _parse_text(stream, fmt):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='' if fmt == 'csv' else None)
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for raw in reader:
+            if None in raw:
+                yield reader.line_num, None, 'Row has more values than the header'
+            else:
+                yield reader.line_num, raw, None
+        return
+    for line_number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            raw = json.loads(line)
+        except ValueError:
+            yield line_number, None, 'Invalid JSON'
+            continue
+        if not isinstance(raw, dict):
+            yield line_number, None, 'Each line must be a JSON object'
+            continue
+        yield line_number, raw, None
+
+def _coerce(spec, raw):
+    values, errors = {}, []
+    raw = {spec.aliases.get(key, key): value for key, value in raw.items()}
+    for field in spec.fields:
+        value = raw.get(field)
+        if isinstance(value, str):
+            value = value.strip()
+        if value in (None, ''):
+            if field in spec.required:
+                errors.append(f'{field} is required')
+            continue
+        column = spec.table.c[field]
+        if isinstance(column.type, db.Integer):
+            try:
+                if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+                    raise ValueError
+                value = int(value)
+            except (TypeError, ValueError):
+                errors.append(f'{field} must be an integer')
+                continue
+        elif isinstance(column.type, db.Enum):
+            if value not in column.type.enums:
+                errors.append(f"{field} must be one of: {', '.join(column.type.enums)}")
+                continue
+        elif isinstance(column.type, db.String):
+            value = str(value)
+            if column.type.length and len(value) > column.type.length:
+                errors.append(f'{field} is longer than {column.type.length} characters')
+                continue
+        values[field] = value
+    return values, errors
+
+class ImportReport:
+    def __init__(self, kind):
+        self.kind = kind
+        self.processed = 0
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.failed = 0
+        self.errors = []
+
+    def fail(self, line, messages):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': line, 'errors': messages})
+
+    def to_dict(self):
+        return {
+            'kind': self.kind,
+            'processed': self.processed,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'failed': self.failed,
+            'errors': sorted(self.errors, key=lambda e: e['row']),
+            'errorsTruncated': self.failed > len(self.errors)
+        }
+
+class Importer:
+    def __init__(self, kind):
+        self.spec = IMPORTS[kind]
+        self.report = ImportReport(kind)
+        # Keys already seen in this upload, per key or unique column
+        self.seen = {name: set() for name in ['key'] + self.spec.unique}
+
+    def key_of(self, values):
+        if self.spec.natural_key:
+            return tuple(values.get(c) for c in self.spec.natural_key)
+        return values['id']
+
+    def run(self, rows):
+        batch = []
+        for line, raw, error in rows:
+            self.report.processed += 1
+            if error:
+                self.report.fail(line, [error])
+                continue
+            values, errors = _coerce(self.spec, raw)
+            if errors:
+                self.report.fail(line, errors)
+                continue
+            batch.append((line, values))
+            if len(batch) >= BATCH_SIZE:
+                self.flush(batch)
+                batch = []
+        if batch:
+            self.flush(batch)
+        return self.report.to_dict()
+
+    def validate(self, batch):
+        spec = self.spec
+        errors = {line: [] for line, _ in batch}
+        for line, values in batch:
+            for name, value in [('key', self.key_of(values))] + [(c, values.get(c)) for c in spec.unique]:
+                if value is None:
+                    continue
+                if value in self.seen[name]:
+                    errors[line].append(f"Duplicate {'row' if name == 'key' else name} in upload")
+                self.seen[name].add(value)
+        for column, model in spec.references.items():
+            wanted = {values[column] for _, values in batch}
+            found = set(db.session.execute(db.select(model.id).where(model.id.in_(wanted))).scalars())
+            for line, values in batch:
+                if values[column] not in found:
+                    errors[line].append(f'{column} {values[column]} does not exist')
+        for column in spec.unique:
+            wanted = {values[column] for _, values in batch}
+            owners = dict(db.session.execute(db.select(spec.table.c[column], spec.table.c.id)
+                                             .where(spec.table.c[column].in_(wanted))).all())
+            for line, values in batch:
+                owner = owners.get(values[column])
+                if owner is not None and owner != values['id']:
+                    errors[line].append(f'{column} {values[column]} is already used by {owner}')
+        valid = []
+        for line, values in batch:
+            if errors[line]:
+                self.report.fail(line, errors[line])
+            else:
+                valid.append((line, values))
+        return valid
+
+    def existing_keys(self, valid):
+        spec = self.spec
+        if spec.natural_key:
+            columns = [spec.table.c[c] for c in spec.natural_key]
+            wanted = [self.key_of(values) for _, values in valid]
+            rows = db.session.execute(db.select(*columns).where(db.tuple_(*columns).in_(wanted))).all()
+            return {tuple(row) for row in rows}
+        wanted = [values['id'] for _, values in valid]
+        return set(db.session.execute(db.select(spec.table.c.id).where(spec.table.c.id.in_(wanted))).scalars())
+
+    def flush(self, batch):
+        # Kinds the timetable refers to rebuild grids and bump the revision, so
+        # like every other such writer they hold the commit lock for the batch
+        if not self.spec.entry_column:
+            return self.write(batch)
+        commit_lock = NamedLock(['commit'], COMMIT_LOCK_TIMEOUT)
+        if not commit_lock.acquire():
+            for line, _ in batch:
+                self.report.fail(line, ['Timed out waiting for a timetable generation to commit; please retry'])
+            return
+        try:
+            self.write(batch)
+        finally:
+            commit_lock.release()
+
+    def write(self, batch):
+        spec = self.spec
+        valid = []
+        try:
+            valid = self.validate(batch)
+            if not valid:
+                db.session.rollback()
+                return
+            existing = self.existing_keys(valid)
+            inserts, updates = [], []
+            for _, values in valid:
+                if self.key_of(values) in existing:
+                    # A mapping that already exists has nothing left to update
+                    if not spec.natural_key:
+                        updates.append(dict(values, **(spec.update_defaults() if spec.update_defaults else {})))
+                else:
+                    row = dict(spec.insert_defaults() if spec.insert_defaults else {}, **values)
+                    row.setdefault('id', str(uuid.uuid4()))
+                    inserts.append(row)
+            if inserts:
+                db.session.execute(spec.table.insert(), inserts)
+            if updates:
+                db.session.execute(db.update(spec.model), updates)
+            if spec.after_upsert:
+                spec.after_upsert([values['id'] for _, values in valid])
+            if spec.entry_column:
+                # Updated names show up in the timetable grids that embed them
+                if updates:
+                    refresh_grids_referencing(spec.entry_column, [row['id'] for row in updates])
+                # Reports and the occupancy index reload on the next revision
+                bump_revision()
+            db.session.commit()
+        except IntegrityError as e:
+            # Rows written concurrently since validation; the whole batch is rolled back
+            db.session.rollback()
+            message = f'Batch rolled back: {e.orig}'
+            for line, _ in valid:
+                self.report.fail(line, [message])
+            return
+        self.report.inserted += len(inserts)
+        self.report.updated += len(updates)
+        self.report.unchanged += len(valid) - len(inserts) - len(updates)
+
+def import_rows(kind, stream, fmt):
+    if kind not in IMPORTS:
+        raise UploadError(f"Unknown import '{kind}'. Available: {', '.join(sorted(IMPORTS))}")
+    return Importer(kind).run(parse_rows(stream, fmt))
+# --- End Bulk Import ---
@@ -0,0 +1,199 @@
+import bisect
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from flask import g, request, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# --- Request Instrumentation ---
+#
+# Opt-in (INSTRUMENTATION=1). When enabled every request gets:
+#   - SQL query count and time from SQLAlchemy engine events
+#   - named phase timers (generation phases, serialization)
+#   - a Server-Timing header and one JSON log line on the backend.requests logger
+#   - a latency histogram per route, exposed in Prometheus text format at /metrics
+# When disabled nothing is registered, and timer()/progress() hand out no-ops.
+# Metrics are per process; scrape each worker or aggregate in Prometheus.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+request_log = logging.getLogger('backend.requests')
+
+class RequestTiming:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.phases = {}  # name -> seconds, in the order first seen
+        self._phase = None
+
+    def add_phase(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    # Sequential phases: each mark closes the previous one
+    def mark(self, name):
+        now = time.perf_counter()
+        if self._phase is not None:
+            self.add_phase(self._phase[0], now - self._phase[1])
+        self._phase = (name, now) if name is not None else None
+
+class RouteMetrics:
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.query_seconds = 0.0
+
+class Instrumentation:
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._routes = {}  # (method, route, status class) -> RouteMetrics
+
+    def init_app(self, app):
+        self.enabled = app.config.get('INSTRUMENTATION', False)
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(Engine, 'handle_error', _handle_error)
+
+    # Context manager timing a named phase of the current request
+    def timer(self, name):
+        if not self.enabled:
+            return nullcontext()
+        return self._timer(name)
+
+    @contextmanager
+    def _timer(self, name):
+        timing = current_timing()
+        if timing is not None:
+            timing.mark(None)  # a timed block ends any open sequential phase
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if timing is not None:
+                timing.add_phase(name, time.perf_counter() - started)
+
+    # A progress hook for run_generation that records its phases; None when disabled
+    def progress(self):
+        timing = current_timing() if self.enabled else None
+        if timing is None:
+            return None
+        def report(phase=None, **values):
+            if phase is not None:
+                timing.mark(phase)
+        return report
+
+    def _before_request(self):
+        g.request_timing = RequestTiming()
+
+    def _after_request(self, response):
+        timing = g.pop('request_timing', None)
+        if timing is None:
+            return response
+        timing.mark(None)
+        elapsed = time.perf_counter() - timing.started
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        self._observe(request.method, route, response.status_code, elapsed, timing)
+
+        metrics = [f'db;desc="{timing.queries} queries";dur={timing.query_seconds * 1000:.1f}']
+        metrics += [f'{name};dur={seconds * 1000:.1f}' for name, seconds in timing.phases.items()]
+        metrics.append(f'total;dur={elapsed * 1000:.1f}')
+        response.headers['Server-Timing'] = ', '.join(metrics)
+
+        request_log.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'route': route,
+            'status': response.status_code,
+            'durationMs': round(elapsed * 1000, 2),
+            'queries': timing.queries,
+            'queryMs': round(timing.query_seconds * 1000, 2),
+            'phasesMs': {name: round(seconds * 1000, 2) for name, seconds in timing.phases.items()}
+        }))
+        return response
+
+    def _observe(self, method, route, status, elapsed, timing):
+        key = (method, route, f'{status // 100}xx')
+        with self._lock:
+            metrics = self._routes.get(key)
+            if metrics is None:
+                metrics = self._routes[key] = RouteMetrics()
+            metrics.buckets[bisect.bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+            metrics.count += 1
+            metrics.seconds += elapsed
+            metrics.queries += timing.queries
+            metrics.query_seconds += timing.query_seconds
+
+    def render_metrics(self):
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = [
+                '# HELP http_request_duration_seconds Request latency by route.',
+                '# TYPE http_request_duration_seconds histogram'
+            ]
+            for (method, route, status), m in routes:
+                labels = f'method="{method}",route="{_escape(route)}",status="{status}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), m.buckets):
+                    cumulative += count
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'http_request_duration_seconds_sum{{{labels}}} {m.seconds:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{{labels}}} {m.count}')
+            lines += [
+                '# HELP db_queries_total SQL statements executed by route.',
+                '# TYPE db_queries_total counter'
+            ]
+            for (method, route, status), m in routes:
+                lines.append(f'db_queries_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {m.queries}')
+            lines += [
+                '# HELP db_query_duration_seconds_total Time spent executing SQL by route.',
+                '# TYPE db_query_duration_seconds_total counter'
+            ]
+            for (method, route, status), m in routes:
+                lines.append(f'db_query_duration_seconds_total{{method="{method}",route="{_escape(route)}",'
+                             f'status="{status}"}} {m.query_seconds:.6f}')
+        return '\n'.join(lines) + '\n'
+
+    def metrics_view(self):
+        return self.render_metrics(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+def current_timing():
+    return g.get('request_timing') if has_app_context() else None
+
+# Engine-wide listeners; statements outside a request (background jobs) are ignored
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _query_finished(conn.info['query_started'].pop())
+
+# A failed statement never reaches after_cursor_execute; drop its start time
+# so it does not linger on the pooled connection and skew later timings
+def _handle_error(context):
+    conn = context.connection
+    if conn is None or not conn.info.get('query_started'):
+        return
+    _query_finished(conn.info['query_started'].pop())
+
+def _query_finished(started):
+    timing = current_timing()
+    if timing is not None:
+        timing.queries += 1
+        timing.query_seconds += time.perf_counter() - started
+
+instrumentation = Instrumentation()
+# --- End Request Instrumentation ---
@@ -0,0 +1,133 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from .extensions import db
+from .generation import run_generation, GenerationError, GenerationCancelled
+
+# --- Background Generation Jobs ---
+
+JOB_HISTORY = 100  # finished jobs kept for polling
+
+class Job:
+    def __init__(self, params):
+        self.id = str(uuid.uuid4())
+        self.params = params
+        self.status = 'queued'  # queued -> running -> succeeded | failed | cancelled
+        self.phase = None
+        self.total = None
+        self.placed = 0
+        self.score = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self):
+        return self.status in ('succeeded', 'failed', 'cancelled')
+
+    def report(self, phase=None, total=None, placed=None, score=None):
+        with self._lock:
+            if phase is not None:
+                self.phase = phase
+            if total is not None:
+                self.total = total
+            if placed is not None:
+                self.placed = placed
+            if score is not None:
+                self.score = score
+
+    def to_dict(self, include_result=True):
+        with self._lock:
+            if self.started_at is None:
+                elapsed = 0.0
+            else:
+                elapsed = (self.finished_at or time.time()) - self.started_at
+            data = {
+                'jobId': self.id,
+                'status': self.status,
+                'phase': self.phase,
+                'progress': {
+                    'placed': self.placed,
+                    'total': self.total,
+                    'score': self.score,
+                    'elapsed': round(elapsed, 3)
+                }
+            }
+            if self.error:
+                data['error'] = self.error
+            if include_result and self.result is not None:
+                data['result'] = self.result
+            return data
+
+class JobManager:
+    # max_workers=0 runs each job inline on submit (in-process, used for tests)
+    def __init__(self, app, max_workers=2):
+        self.app = app
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='generation') if max_workers else None
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, params):
+        job = Job(params)
+        with self._lock:
+            self.jobs[job.id] = job
+            self._prune()
+        if self.executor is None:
+            self._run(job)
+        else:
+            self.executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        with job._lock:
+            if job.status == 'queued':
+                job.status = 'cancelled'
+                job.finished_at = time.time()
+        return job
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - JOB_HISTORY)]:
+            del self.jobs[job_id]
+
+    def _run(self, job):
+        with job._lock:
+            if job.status != 'queued':
+                return
+            job.status = 'running'
+            job.started_at = time.time()
+        status, result, error = 'failed', None, None
+        with self.app.app_context():
+            try:
+                result = run_generation(job.params, progress=job.report, cancel=job.cancel_event)
+                status = 'succeeded'
+            except GenerationCancelled:
+                status = 'cancelled'
+            except GenerationError as e:
+                error = str(e)
+            except Exception as e:
+                self.app.logger.exception('Timetable generation job %s failed', job.id)
+                error = str(e)
+            finally:
+                db.session.remove()
+        with job._lock:
+            job.status = status
+            job.result = result
+            job.error = error
+            job.finished_at = time.time()
+# --- End Background Generation Jobs ---
@@ -0,0 +1,95 @@
+import hashlib
+import threading
+import time
+from flask import current_app
+from .extensions import db
+
+# --- Generation Locks ---
+#
+# Named exclusive locks that serialize timetable generations. With MySQL they
+# are GET_LOCK locks held on a dedicated connection, so they cover every
+# worker process; otherwise (SQLite, tests) they are process-local.
+# GENERATION_LOCK forces 'mysql' or 'local'; by default it follows the dialect.
+# Read endpoints never take these locks.
+
+MYSQL_LOCK_PREFIX = 'erp_timetable:'
+
+class LocalLocks:
+    def __init__(self):
+        self._held = set()
+        self._condition = threading.Condition()
+
+    def acquire(self, names, timeout):
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._held.intersection(names):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            self._held.update(names)
+            return True
+
+    def release(self, names):
+        with self._condition:
+            self._held.difference_update(names)
+            self._condition.notify_all()
+
+local_locks = LocalLocks()
+
+def _mysql_name(name):
+    # GET_LOCK names are limited to 64 characters
+    return MYSQL_LOCK_PREFIX + hashlib.sha1(name.encode()).hexdigest()[:40]
+
+class NamedLock:
+    def __init__(self, names, timeout=0):
+        self.names = sorted(set(names))  # a fixed order avoids deadlocks between holders
+        self.timeout = timeout
+        self.backend = current_app.config.get('GENERATION_LOCK') or \
+            ('mysql' if db.engine.dialect.name == 'mysql' else 'local')
+        self._connection = None
+        self._held = False
+
+    def acquire(self):
+        if self._held or not self.names:
+            self._held = True
+            return True
+        if self.backend == 'local':
+            self._held = local_locks.acquire(self.names, self.timeout)
+            return self._held
+        deadline = time.monotonic() + self.timeout
+        self._connection = db.engine.connect()
+        taken = []
+        for name in self.names:
+            wait = max(0, int(round(deadline - time.monotonic())))
+            got = self._connection.execute(db.text('SELECT GET_LOCK(:name, :wait)'),
+                                           {'name': _mysql_name(name), 'wait': wait}).scalar()
+            if got != 1:
+                self._release_mysql(taken)
+                return False
+            taken.append(name)
+        self._held = True
+        return True
+
+    # Safe to call more than once
+    def release(self):
+        if not self._held:
+            return
+        self._held = False
+        if self.backend == 'local':
+            local_locks.release(self.names)
+        elif self._connection is not None:
+            self._release_mysql(self.names)
+
+    def _release_mysql(self, names):
+        try:
+            for name in names:
+                self._connection.execute(db.text('SELECT RELEASE_LOCK(:name)'), {'name': _mysql_name(name)})
+        except Exception:
+            # Drop the connection: MySQL frees a session's locks when it ends
+            self._connection.invalidate()
+            raise
+        finally:
+            self._connection.close()
+            self._connection = None
+# --- End Generation Locks ---
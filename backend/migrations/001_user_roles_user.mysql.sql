@@ -0,0 +1,24 @@
+-- Links user_roles to users, as in schema.mysql.sql. Databases created from
+-- an older schema file have no users table yet. Run the check first: the
+-- foreign key cannot be added while roles point at missing users.
+
+create table if not exists users (
+  id char(36) primary key,
+  email varchar(255) not null,
+  password_hash varchar(255) not null,
+  full_name varchar(255) not null,
+  created_at datetime not null,
+  updated_at datetime not null,
+  unique key uq_users_email (email)
+);
+
+-- Roles of users that no longer exist (must return no rows)
+select r.id, r.user_id, r.role
+from user_roles r left join users u on u.id = r.user_id
+where u.id is null;
+
+-- Such roles can be removed with
+-- delete r from user_roles r left join users u on u.id = r.user_id where u.id is null;
+
+alter table user_roles
+  add foreign key (user_id) references users(id);
@@ -0,0 +1,47 @@
+-- Adds the indexes and uniqueness constraints from schema.mysql.sql to an
+-- existing database. Run the checks first: the unique keys cannot be created
+-- while double bookings or duplicate mappings exist.
+
+-- 1. Checks (each query must return no rows)
+
+-- Double-booked sections, faculty and rooms
+select section_id, day_of_week, time_slot_id, count(*) as entries
+from timetable_entries group by section_id, day_of_week, time_slot_id having count(*) > 1;
+
+select faculty_id, day_of_week, time_slot_id, count(*) as entries
+from timetable_entries group by faculty_id, day_of_week, time_slot_id having count(*) > 1;
+
+select room_id, day_of_week, time_slot_id, count(*) as entries
+from timetable_entries group by room_id, day_of_week, time_slot_id having count(*) > 1;
+
+-- Duplicate slot orders and faculty-subject mappings
+select slot_order, count(*) from time_slots group by slot_order having count(*) > 1;
+
+select section_id, subject_id, faculty_id, count(*) as mappings
+from faculty_subjects group by section_id, subject_id, faculty_id having count(*) > 1;
+
+-- Unlocked double bookings can be cleared and regenerated; this removes every
+-- unlocked entry in a clashing (section, day, slot) except one
+-- delete t from timetable_entries t
+-- join timetable_entries keep
+--   on keep.section_id = t.section_id and keep.day_of_week = t.day_of_week
+--  and keep.time_slot_id = t.time_slot_id and keep.id < t.id
+-- where t.is_locked = false;
+
+-- 2. Indexes and constraints
+
+alter table user_roles
+  add key ix_user_roles_role (role);
+
+alter table time_slots
+  add unique key uq_time_slots_slot_order (slot_order);
+
+alter table faculty_subjects
+  add unique key uq_faculty_subjects_section_subject_faculty (section_id, subject_id, faculty_id),
+  add key ix_faculty_subjects_faculty (faculty_id);
+
+alter table timetable_entries
+  add unique key uq_timetable_entries_section_slot (section_id, day_of_week, time_slot_id),
+  add unique key uq_timetable_entries_faculty_slot (faculty_id, day_of_week, time_slot_id),
+  add unique key uq_timetable_entries_room_slot (room_id, day_of_week, time_slot_id),
+  add key ix_timetable_entries_locked_section (is_locked, section_id);
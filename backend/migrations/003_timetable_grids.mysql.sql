@@ -0,0 +1,11 @@
+-- Adds the grid snapshot table from schema.mysql.sql to an existing
+-- database. Grids are filled by the next generation and built on read until
+-- then.
+
+create table if not exists timetable_grids (
+  entity_type enum('section','faculty','room') not null,
+  entity_id char(36) not null,
+  payload text not null,
+  updated_at datetime not null,
+  primary key (entity_type, entity_id)
+);
@@ -0,0 +1,10 @@
+-- Adds the timetable revision table from schema.mysql.sql to an existing
+-- database, with its single row.
+
+create table if not exists timetable_revision (
+  id int primary key,
+  revision int not null,
+  updated_at datetime not null
+);
+
+insert ignore into timetable_revision (id, revision, updated_at) values (1, 0, current_timestamp);
@@ -0,0 +1,9 @@
+-- Adds the per-section unplaced session counts from schema.mysql.sql to an
+-- existing database. Dashboard stats report unplaced sessions once every
+-- section has a row, i.e. after the next campus-wide generation.
+
+create table if not exists section_unplaced (
+  section_id char(36) primary key,
+  missing_sessions int not null,
+  foreign key (section_id) references sections(id)
+);
@@ -0,0 +1,392 @@
+import logging
+import threading
+from flask import current_app
+from .extensions import db
+from .erp_models import TimeSlot, Room, Subject, TimetableEntry
+from .scheduling import SchedulingContext, occupy_mask, release_mask, session_slot_orders
+from .constraints import compile_constraints
+from .revisions import current_revision, bump_revision
+from .grids import empty_touched, note_touched, refresh_grids
+from .locks import NamedLock
+from .generation import COMMIT_LOCK_TIMEOUT
+from .queries import timetable_select, timetable_row_to_dict
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+# --- Occupancy Index ---
+#
+# A per-process copy of who is busy when: the same week bitmasks the solver
+# uses (faculty, section and room, with the configured unavailability
+# pre-occupied) plus which entry holds each (resource, day, period). Manual
+# move checks run against it without touching the entries table. The index
+# is loaded on first use (or at startup with OCCUPANCY_WARM=1) and reloaded
+# whenever the timetable revision moves past it; moves made by this process
+# are applied in place.
+
+MAX_ALTERNATIVES = 5
+
+class MoveError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+class EntryRecord:
+    def __init__(self, id, section_id, subject_id, faculty_id, room_id, session_type, day_of_week, slot_order,
+                 is_locked, lab_room_id=None):
+        self.id = id
+        self.section_id = section_id
+        self.subject_id = subject_id
+        self.faculty_id = faculty_id
+        self.room_id = room_id
+        self.session_type = session_type
+        self.day_of_week = day_of_week
+        self.slot_order = slot_order
+        self.is_locked = is_locked
+        # The subject's lab room when the generator would book it; labs without
+        # one are put in the section's classroom instead
+        self.lab_room_id = lab_room_id
+
+    # Room types the generator would give this session
+    def room_types(self):
+        if self.session_type != 'lab':
+            return ('classroom',)
+        return ('lab',) if self.lab_room_id is not None else ('lab', 'classroom')
+
+    # A theory entity gets at most one session a day (see ScheduleSearch.entity_days)
+    def entity_day(self, day):
+        if self.session_type == 'lab':
+            return None
+        return (self.section_id, self.subject_id, self.faculty_id, day)
+
+    def resources(self, room_id=None):
+        return (('section', self.section_id), ('faculty', self.faculty_id),
+                ('room', room_id if room_id is not None else self.room_id))
+
+class OccupancySnapshot:
+    def __init__(self, revision, context, rows):
+        self.revision = revision
+        self.context = context
+        self.state = context.conflict_state()
+        self.room_by_id = {room.id: room for room in context.rooms}
+        self.entries = {}
+        self.occupant = {}  # (resource kind, id, day, slot_order) -> entry id
+        self.entity_days = {}  # (section, subject, faculty, day) -> ids of that theory entity's entries
+        for row in rows:
+            lab_room = context.room_by_name.get(row.lab_room) if row.lab_room else None
+            record = EntryRecord(row.id, row.section_id, row.subject_id, row.faculty_id, row.room_id,
+                                 row.session_type, row.day_of_week, row.slot_order, bool(row.is_locked),
+                                 lab_room.id if lab_room else None)
+            self.entries[record.id] = record
+            self.occupy(record)
+
+    def orders(self, record, slot_order):
+        return session_slot_orders(record.session_type, slot_order)
+
+    def occupy(self, record):
+        orders = self.orders(record, record.slot_order)
+        occupy_mask(self.state, record.faculty_id, record.section_id, record.room_id,
+                    self.state.mask(record.day_of_week, orders))
+        for kind, resource_id in record.resources():
+            for order in orders:
+                self.occupant[(kind, resource_id, record.day_of_week, order)] = record.id
+        key = record.entity_day(record.day_of_week)
+        if key is not None:
+            self.entity_days.setdefault(key, set()).add(record.id)
+
+    def release(self, record):
+        orders = self.orders(record, record.slot_order)
+        release_mask(self.state, record.faculty_id, record.section_id, record.room_id,
+                     self.state.mask(record.day_of_week, orders))
+        for kind, resource_id in record.resources():
+            for order in orders:
+                if self.occupant.get((kind, resource_id, record.day_of_week, order)) == record.id:
+                    del self.occupant[(kind, resource_id, record.day_of_week, order)]
+        key = record.entity_day(record.day_of_week)
+        if key is not None:
+            self.entity_days.get(key, set()).discard(record.id)
+        # Unavailability stays busy whatever moves out
+        for kind, schedule, resource_id in (('faculty', self.state.faculty_schedule, record.faculty_id),
+                                            ('room', self.state.room_schedule, record.room_id)):
+            mask = self.context.unavailable[kind].get(resource_id)
+            if mask:
+                schedule[resource_id] |= mask
+
+    # Reasons record cannot sit at (day, slot_order) in room_id, given the
+    # current state; entries being moved must already be released
+    def conflicts(self, record, day, slot_order, room_id):
+        context = self.context
+        orders = self.orders(record, slot_order)
+        if day not in context.days:
+            return [{'type': 'day', 'dayOfWeek': day}]
+        if any(order not in context.slot_by_order for order in orders):
+            return [{'type': 'slot', 'slotOrder': slot_order}]
+        block = self.state.mask(day, orders)
+        found = []
+        same_day = self.entity_days.get(record.entity_day(day))
+        if same_day:
+            found.append({'type': 'subjectDay', 'entryId': min(same_day), 'dayOfWeek': day})
+        for kind, resource_id in record.resources(room_id):
+            for order in orders:
+                holder = self.occupant.get((kind, resource_id, day, order))
+                if holder is not None:
+                    found.append({'type': kind, 'id': resource_id, 'entryId': holder, 'slotOrder': order})
+        for kind, resource_id in (('faculty', record.faculty_id), ('room', room_id)):
+            if context.unavailable[kind].get(resource_id, 0) & block:
+                found.append({'type': 'unavailable', 'resource': kind, 'id': resource_id})
+        if not found and context.block_check is not None:
+            if not context.block_check(self.state, record, block):
+                found.append({'type': 'runLimit'})
+        return found
+
+    def free(self, record, day, slot_order, room_id):
+        orders = self.orders(record, slot_order)
+        if any(order not in self.context.slot_by_order for order in orders):
+            return False
+        if self.entity_days.get(record.entity_day(day)):
+            return False
+        block = self.state.mask(day, orders)
+        if self.state.busy(record.faculty_id, record.section_id, room_id) & block:
+            return False
+        return self.context.block_check is None or self.context.block_check(self.state, record, block)
+
+    # Free positions for record (already released), same day first, each day
+    # in the solver's slot preference order
+    def alternatives(self, record, room_id, exclude=()):
+        context = self.context
+        preferred = context.lab_start_orders if record.session_type == 'lab' else context.theory_slot_orders
+        orders = preferred + [o for o in context.slot_by_order if o not in preferred]
+        days = sorted(context.days, key=lambda day: day != record.day_of_week)
+        found = []
+        for day in days:
+            for order in orders:
+                if (day, order) in exclude or not self.free(record, day, order, room_id):
+                    continue
+                slot = context.slot_by_order[order]
+                found.append({'day_of_week': day, 'time_slot_id': slot.id, 'slot_order': order})
+                if len(found) >= MAX_ALTERNATIVES:
+                    return found
+        return found
+
+class OccupancyIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def init_app(self, app):
+        if app.config.get('OCCUPANCY_WARM'):
+            with app.app_context():
+                try:
+                    self.snapshot()
+                except Exception:
+                    # The tables may not exist yet; the index loads on first use instead
+                    logger.warning('Could not warm the occupancy index', exc_info=True)
+                finally:
+                    db.session.remove()
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def _load(self, revision):
+        time_slots = TimeSlot.query.all()
+        rooms = Room.query.all()
+        context = SchedulingContext(time_slots, rooms,
+                                    compile_constraints(current_app.config.get('SCHEDULER_CONSTRAINTS'), rooms))
+        entries = TimetableEntry.__table__
+        slots = TimeSlot.__table__
+        subjects = Subject.__table__
+        rows = db.session.execute(db.select(
+            entries.c.id, entries.c.section_id, entries.c.subject_id, entries.c.faculty_id, entries.c.room_id,
+            entries.c.session_type, entries.c.day_of_week, entries.c.is_locked, slots.c.slot_order,
+            subjects.c.lab_room
+        ).select_from(entries.join(slots, slots.c.id == entries.c.time_slot_id)
+                      .outerjoin(subjects, subjects.c.id == entries.c.subject_id))).all()
+        return OccupancySnapshot(revision, context, rows)
+
+    # Current snapshot, reloaded if the database revision moved on. Callers
+    # use it while holding lock().
+    def snapshot(self):
+        revision = current_revision()
+        with self._lock:
+            if self._snapshot is not None and self._snapshot.revision == revision:
+                return self._snapshot
+        snapshot = self._load(revision)
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    def lock(self):
+        return self._lock
+
+    # Called after this process committed a change that moved the revision
+    # from old to new: apply it in place when the index was current, else
+    # leave the reload to the next lookup
+    def committed(self, old_revision, new_revision, apply):
+        with self._lock:
+            if self._snapshot is None or self._snapshot.revision != old_revision:
+                self._snapshot = None
+                return
+            apply(self._snapshot)
+            self._snapshot.revision = new_revision
+
+occupancy = OccupancyIndex()
+
+def _target(snapshot, record, params):
+    try:
+        day = int(params['day_of_week'])
+    except (KeyError, TypeError, ValueError):
+        raise MoveError('day_of_week is required and must be an integer')
+    slot = snapshot.context.slot_by_id.get(params.get('time_slot_id'))
+    if slot is None:
+        raise MoveError('time_slot_id must name an existing time slot')
+    room_id = params.get('room_id') or record.room_id
+    if room_id != record.room_id:
+        room = snapshot.room_by_id.get(room_id)
+        if room is None:
+            raise MoveError('room_id must name an existing room')
+        if room.type not in record.room_types():
+            raise MoveError(f'A {record.session_type} session needs a {" or a ".join(record.room_types())}')
+    return day, slot.slot_order, room_id
+
+def _record(snapshot, entry_id):
+    record = snapshot.entries.get(entry_id)
+    if record is None:
+        raise MoveError('Timetable entry not found', 404)
+    return record
+
+# Checks moving entry_id to params' day_of_week, time_slot_id and optional
+# room_id. Returns {'valid', 'conflicts', 'alternatives'}; alternatives are
+# only suggested when the target is not valid.
+def check_move(snapshot, entry_id, params):
+    record = _record(snapshot, entry_id)
+    day, slot_order, room_id = _target(snapshot, record, params)
+    if record.is_locked:
+        return {'valid': False, 'conflicts': [{'type': 'locked', 'entryId': record.id}], 'alternatives': []}
+    snapshot.release(record)
+    try:
+        conflicts = snapshot.conflicts(record, day, slot_order, room_id)
+        alternatives = snapshot.alternatives(record, room_id, exclude={(record.day_of_week, record.slot_order)}) \
+            if conflicts else []
+    finally:
+        snapshot.occupy(record)
+    return {'valid': not conflicts, 'conflicts': conflicts, 'alternatives': alternatives}
+
+# Checks exchanging the day and period of two entries, each keeping its room
+def check_swap(snapshot, entry_id, other_id):
+    first = _record(snapshot, entry_id)
+    second = _record(snapshot, other_id)
+    if first.id == second.id:
+        raise MoveError('An entry cannot be swapped with itself')
+    locked = [{'type': 'locked', 'entryId': r.id} for r in (first, second) if r.is_locked]
+    if locked:
+        return {'valid': False, 'conflicts': locked}
+    snapshot.release(first)
+    snapshot.release(second)
+    original = (first.day_of_week, first.slot_order)
+    try:
+        conflicts = snapshot.conflicts(first, second.day_of_week, second.slot_order, first.room_id)
+        if not conflicts:
+            # Place the first entry provisionally so the two cannot overlap each other
+            first.day_of_week, first.slot_order = second.day_of_week, second.slot_order
+            snapshot.occupy(first)
+            conflicts = snapshot.conflicts(second, *original, second.room_id)
+            snapshot.release(first)
+    finally:
+        first.day_of_week, first.slot_order = original
+        snapshot.occupy(first)
+        snapshot.occupy(second)
+    return {'valid': not conflicts, 'conflicts': conflicts}
+
+def set_locked(snapshot, entry_id, is_locked):
+    record = snapshot.entries.get(entry_id)
+    if record is not None:
+        record.is_locked = is_locked
+
+def relocate(snapshot, moves):
+    # moves: (entry id, day, slot_order, room_id) already committed
+    records = [(snapshot.entries[entry_id], day, order, room_id) for entry_id, day, order, room_id in moves]
+    for record, _, _, _ in records:
+        snapshot.release(record)
+    for record, day, order, room_id in records:
+        record.day_of_week, record.slot_order, record.room_id = day, order, room_id
+        snapshot.occupy(record)
+
+# Runs fn(snapshot) under the generation commit lock, in a fresh transaction
+# so the revision it sees is the committed one
+def _with_commit_lock(fn):
+    lock = NamedLock(['commit'], COMMIT_LOCK_TIMEOUT)
+    if not lock.acquire():
+        raise MoveError('A timetable generation is committing; please retry', 409)
+    try:
+        db.session.commit()
+        return fn(occupancy.snapshot())
+    finally:
+        lock.release()
+
+# Writes moves [(record, day, slot_order, room_id)], rebuilds the affected
+# grids and commits; returns the new revision
+def _commit_moves(snapshot, moves):
+    entries = TimetableEntry.__table__
+    touched = empty_touched()
+    try:
+        # Park each entry on its own out-of-range day (-1, -2, ...) first so swaps
+        # never trip the unique slot keys, neither against each other nor real rows
+        for index, (record, _, _, _) in enumerate(moves):
+            note_touched(touched, [{'section_id': record.section_id, 'faculty_id': record.faculty_id,
+                                    'room_id': record.room_id}])
+            db.session.execute(entries.update().where(entries.c.id == record.id).values(day_of_week=-1 - index))
+        for record, day, slot_order, room_id in moves:
+            touched['room'].add(room_id)
+            db.session.execute(entries.update().where(entries.c.id == record.id).values(
+                day_of_week=day, time_slot_id=snapshot.context.slot_by_order[slot_order].id, room_id=room_id))
+        refresh_grids(touched)
+        revision = bump_revision()
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        raise MoveError('The move clashes with the current timetable; please retry', 409)
+    except Exception:
+        db.session.rollback()
+        raise
+    return revision
+
+def _entry_dicts(entry_ids):
+    rows = db.session.execute(timetable_select().where(TimetableEntry.__table__.c.id.in_(entry_ids))).all()
+    by_id = {row.id: timetable_row_to_dict(row) for row in rows}
+    return [by_id[entry_id] for entry_id in entry_ids]
+
+def _apply(snapshot, moves):
+    old_revision = snapshot.revision
+    revision = _commit_moves(snapshot, moves)
+    occupancy.committed(old_revision, revision, lambda s: relocate(
+        s, [(record.id, day, slot_order, room_id) for record, day, slot_order, room_id in moves]))
+
+# Moves an entry after checking it against the committed timetable. Returns
+# the check result, plus the updated entry when the move was made.
+def move_entry(entry_id, params):
+    def move(snapshot):
+        with occupancy.lock():
+            result = check_move(snapshot, entry_id, params)
+            record = snapshot.entries[entry_id]
+            day, slot_order, room_id = _target(snapshot, record, params)
+        if result['valid']:
+            _apply(snapshot, [(record, day, slot_order, room_id)])
+            result['entry'] = _entry_dicts([entry_id])[0]
+        return result
+    return _with_commit_lock(move)
+
+# Exchanges the day and period of two entries; each keeps its room
+def swap_entries(entry_id, other_id):
+    def swap(snapshot):
+        with occupancy.lock():
+            result = check_swap(snapshot, entry_id, other_id)
+            first, second = snapshot.entries[entry_id], snapshot.entries[other_id]
+            moves = [(first, second.day_of_week, second.slot_order, first.room_id),
+                     (second, first.day_of_week, first.slot_order, second.room_id)]
+        if result['valid']:
+            _apply(snapshot, moves)
+            result['entries'] = _entry_dicts([entry_id, other_id])
+        return result
+    return _with_commit_lock(swap)
+# --- End Occupancy Index ---
@@ -0,0 +1,127 @@
+import base64
+import json
+from datetime import time
+from .extensions import db
+from .database import read_execute
+from .erp_models import Section, Subject, TimeSlot, Room, Faculty, TimetableEntry
+
+# --- Read Queries ---
+
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+
+class QueryError(ValueError):
+    pass
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def decode_cursor(cursor, size):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise QueryError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise QueryError('Invalid cursor')
+    return values
+
+def int_arg(args, name, minimum=None, maximum=None):
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise QueryError(f'{name} must be an integer')
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        raise QueryError(f'{name} must be between {minimum} and {maximum}')
+    return value
+
+def page_size(args):
+    limit = int_arg(args, 'limit', 1)
+    return DEFAULT_PAGE_SIZE if limit is None else min(limit, MAX_PAGE_SIZE)
+
+# Keyset pagination: keys must form a unique sort order. Returns the rows of
+# one page and the cursor for the next one (None on the last page). Pages are
+# read from the replica when one is configured.
+def keyset_page(query, keys, limit, cursor=None):
+    if cursor:
+        values = decode_cursor(cursor, len(keys))
+        query = query.where(db.tuple_(*keys) > db.tuple_(*[db.literal(v) for v in values]))
+    rows = read_execute(query.order_by(*keys).limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1]._mapping[key] for key in keys])
+    return rows, next_cursor
+
+def format_time(value):
+    return value.strftime('%H:%M:%S') if value is not None else None
+
+# Timetable entries joined with everything a view needs, in one query
+def timetable_select():
+    entries = TimetableEntry.__table__
+    slots = TimeSlot.__table__
+    sections = Section.__table__
+    subjects = Subject.__table__
+    faculty = Faculty.__table__
+    rooms = Room.__table__
+    return db.select(
+        entries.c.id, entries.c.day_of_week, entries.c.session_type, entries.c.is_locked,
+        slots.c.id.label('time_slot_id'), slots.c.start_time, slots.c.end_time, slots.c.slot_order,
+        sections.c.id.label('section_id'), sections.c.name.label('section_name'), sections.c.classroom,
+        subjects.c.id.label('subject_id'), subjects.c.name.label('subject_name'),
+        subjects.c.code.label('subject_code'), subjects.c.type.label('subject_type'),
+        faculty.c.id.label('faculty_id'), faculty.c.name.label('faculty_name'),
+        rooms.c.id.label('room_id'), rooms.c.name.label('room_name'), rooms.c.type.label('room_type'),
+    ).select_from(
+        entries
+        .join(slots, slots.c.id == entries.c.time_slot_id)
+        .join(sections, sections.c.id == entries.c.section_id)
+        .join(subjects, subjects.c.id == entries.c.subject_id)
+        .join(faculty, faculty.c.id == entries.c.faculty_id)
+        .join(rooms, rooms.c.id == entries.c.room_id)
+    )
+
+def timetable_sort_keys():
+    return [TimetableEntry.__table__.c.day_of_week, TimeSlot.__table__.c.slot_order, TimetableEntry.__table__.c.id]
+
+def filter_timetable(query, section_id=None, faculty_id=None, room_id=None, day=None):
+    entries = TimetableEntry.__table__
+    if section_id:
+        query = query.where(entries.c.section_id == section_id)
+    if faculty_id:
+        query = query.where(entries.c.faculty_id == faculty_id)
+    if room_id:
+        query = query.where(entries.c.room_id == room_id)
+    if day is not None:
+        query = query.where(entries.c.day_of_week == day)
+    return query
+
+# Shape matches TimetableEntryWithDetails in src/hooks/useTimetable.ts
+def timetable_row_to_dict(row):
+    return {
+        'id': row.id,
+        'day_of_week': row.day_of_week,
+        'session_type': row.session_type,
+        'is_locked': bool(row.is_locked),
+        'time_slot': {
+            'id': row.time_slot_id,
+            'start_time': format_time(row.start_time),
+            'end_time': format_time(row.end_time),
+            'slot_order': row.slot_order
+        },
+        'section': {'id': row.section_id, 'name': row.section_name, 'classroom': row.classroom},
+        'subject': {
+            'id': row.subject_id,
+            'name': row.subject_name,
+            'code': row.subject_code,
+            'type': row.subject_type
+        },
+        'faculty': {'id': row.faculty_id, 'name': row.faculty_name},
+        'room': {'id': row.room_id, 'name': row.room_name, 'type': row.room_type}
+    }
+
+def row_to_dict(row):
+    return {key: format_time(value) if isinstance(value, time) else value for key, value in row._mapping.items()}
+# --- End Read Queries ---
@@ -0,0 +1,196 @@
+import threading
+from datetime import datetime
+import numpy as np
+from flask import current_app
+from .extensions import db
+from .erp_models import Section, Faculty, Room, TimeSlot, TimetableEntry
+from .revisions import current_revision
+from .constraints import configured_days
+from .scoring import idle_gaps
+
+# --- Timetable Reports ---
+#
+# Room utilization, faculty workload and section load, computed in one numpy
+# pass over the timetable in array form: every occupied period (both periods
+# of a lab) becomes a cell of a (resource, day, period) boolean array. All
+# reports are computed together and cached per timetable revision, so they
+# are rebuilt at most once per change and per process. A filtered report is
+# recomputed from the cached arrays over the matching rows only, so its
+# totals describe the same rooms, faculty or sections it lists.
+
+class TimetableArrays:
+    def __init__(self):
+        execute = db.session.execute
+        slots = execute(db.select(TimeSlot.id, TimeSlot.slot_order, TimeSlot.start_time, TimeSlot.end_time)
+                        .order_by(TimeSlot.slot_order)).all()
+        self.slot_orders = [slot.slot_order for slot in slots]
+        self.hours = np.array([_hours(slot.start_time, slot.end_time) for slot in slots])
+        self.sections = execute(db.select(Section.id, Section.name, Section.department).order_by(Section.name, Section.id)).all()
+        self.faculty = execute(db.select(Faculty.id, Faculty.name, Faculty.department).order_by(Faculty.name, Faculty.id)).all()
+        self.rooms = execute(db.select(Room.id, Room.name, Room.type, Room.capacity).order_by(Room.name, Room.id)).all()
+
+        entries = TimetableEntry.__table__
+        slot_table = TimeSlot.__table__
+        rows = execute(db.select(
+            entries.c.section_id, entries.c.faculty_id, entries.c.room_id, entries.c.day_of_week,
+            entries.c.session_type, slot_table.c.slot_order
+        ).select_from(entries.join(slot_table, slot_table.c.id == entries.c.time_slot_id))).all()
+        days = configured_days(current_app.config.get('SCHEDULER_CONSTRAINTS'))
+        self.days = sorted(set(days).union(row.day_of_week for row in rows))
+
+        column = {order: i for i, order in enumerate(self.slot_orders)}
+        day_index = {day: i for i, day in enumerate(self.days)}
+        section_index = {row.id: i for i, row in enumerate(self.sections)}
+        faculty_index = {row.id: i for i, row in enumerate(self.faculty)}
+        room_index = {row.id: i for i, row in enumerate(self.rooms)}
+        # One array element per occupied period; labs add their second period
+        periods = []
+        for row in rows:
+            periods.append((row.section_id, row.faculty_id, row.room_id, row.day_of_week, row.slot_order))
+            if row.session_type == 'lab' and row.slot_order + 1 in column:
+                periods.append((row.section_id, row.faculty_id, row.room_id, row.day_of_week, row.slot_order + 1))
+        shape = (len(self.days), len(self.slot_orders))
+        self.section_busy = _busy(periods, 0, section_index, day_index, column, len(self.sections), shape)
+        self.faculty_busy = _busy(periods, 1, faculty_index, day_index, column, len(self.faculty), shape)
+        self.room_busy = _busy(periods, 2, room_index, day_index, column, len(self.rooms), shape)
+
+def _hours(start, end):
+    return (end.hour * 60 + end.minute - start.hour * 60 - start.minute) / 60
+
+def _busy(periods, position, index, day_index, column, count, shape):
+    busy = np.zeros((count,) + shape, dtype=bool)
+    cells = [(index[p[position]], day_index[p[3]], column[p[4]]) for p in periods if p[position] in index]
+    if cells:
+        rows, days, slots = np.array(cells, dtype=np.intp).T
+        busy[rows, days, slots] = True
+    return busy
+
+def _ratio(part, whole):
+    return round(float(part) / whole, 4) if whole else 0.0
+
+# Rows matching every {field: value} filter, and their slice of busy
+def _select(rows, busy, filters):
+    if not filters:
+        return rows, busy
+    keep = [i for i, row in enumerate(rows) if all(getattr(row, field) == value for field, value in filters.items())]
+    return [rows[i] for i in keep], busy[np.array(keep, dtype=np.intp)]
+
+def room_utilization(arrays, filters=None):
+    room_rows, busy = _select(arrays.rooms, arrays.room_busy, filters)
+    available = busy.shape[1] * busy.shape[2]
+    occupied = busy.sum(axis=(1, 2))
+    daily = busy.sum(axis=2)
+    gaps = idle_gaps(busy).sum(axis=1) if busy.size else np.zeros(len(room_rows), dtype=int)
+    rooms = [{
+        'id': room.id,
+        'name': room.name,
+        'type': room.type,
+        'capacity': room.capacity,
+        'occupiedPeriods': int(occupied[i]),
+        'availablePeriods': available,
+        'utilization': _ratio(occupied[i], available),
+        'dailyUtilization': [_ratio(n, busy.shape[2]) for n in daily[i]],
+        'idleGaps': int(gaps[i])
+    } for i, room in enumerate(room_rows)]
+    by_type = {}
+    for room_type in ('classroom', 'lab'):
+        mask = np.array([room.type == room_type for room in room_rows], dtype=bool)
+        by_type[room_type] = {
+            'rooms': int(mask.sum()),
+            'utilization': _ratio(occupied[mask].sum() if mask.any() else 0, mask.sum() * available)
+        }
+    return {
+        'days': arrays.days,
+        'slotOrders': arrays.slot_orders,
+        'rooms': rooms,
+        'byType': by_type,
+        # Share of rooms in use per day and period
+        'heatmap': [[_ratio(n, len(room_rows)) for n in day] for day in busy.sum(axis=0).tolist()]
+                   if room_rows else [],
+        'utilization': _ratio(occupied.sum(), len(room_rows) * available),
+        'idleGaps': int(gaps.sum())
+    }
+
+def faculty_workload(arrays, filters=None):
+    faculty, busy = _select(arrays.faculty, arrays.faculty_busy, filters)
+    periods = busy.sum(axis=(1, 2))
+    hours = (busy * arrays.hours).sum(axis=(1, 2))
+    gaps = idle_gaps(busy) if busy.size else np.zeros((len(faculty), len(arrays.days)), dtype=int)
+    return {
+        'days': arrays.days,
+        'faculty': [{
+            'id': member.id,
+            'name': member.name,
+            'department': member.department,
+            'weeklyPeriods': int(periods[i]),
+            'weeklyHours': round(float(hours[i]), 2),
+            'dailyPeriods': busy[i].sum(axis=1).tolist(),
+            'teachingDays': int(busy[i].any(axis=1).sum()),
+            'idleGaps': int(gaps[i].sum())
+        } for i, member in enumerate(faculty)]
+    }
+
+def section_load(arrays, filters=None):
+    sections, busy = _select(arrays.sections, arrays.section_busy, filters)
+    daily = busy.sum(axis=2)
+    gaps = idle_gaps(busy) if busy.size else np.zeros((len(sections), len(arrays.days)), dtype=int)
+    return {
+        'days': arrays.days,
+        'sections': [{
+            'id': section.id,
+            'name': section.name,
+            'department': section.department,
+            'dailyPeriods': daily[i].tolist(),
+            'totalPeriods': int(daily[i].sum()),
+            'maxDailyPeriods': int(daily[i].max()) if daily.shape[1] else 0,
+            'idleGaps': int(gaps[i].sum())
+        } for i, section in enumerate(sections)]
+    }
+
+REPORTS = {
+    'room-utilization': room_utilization,
+    'faculty-workload': faculty_workload,
+    'section-load': section_load,
+}
+
+# Report filters: query argument -> field of the rows it selects
+REPORT_FILTERS = {
+    'room-utilization': {'type': 'type'},
+    'faculty-workload': {'department': 'department'},
+    'section-load': {'department': 'department'},
+}
+
+class ReportCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revision = None
+        self._arrays = None
+        self._reports = None
+
+    # (revision, arrays, {name: report}) for the current timetable revision
+    def reports(self):
+        revision = current_revision()
+        with self._lock:
+            if self._reports is not None and self._revision == revision:
+                return revision, self._arrays, self._reports
+        arrays = TimetableArrays()
+        generated_at = datetime.utcnow().isoformat()
+        reports = {name: dict(build(arrays), revision=revision, generatedAt=generated_at)
+                   for name, build in REPORTS.items()}
+        with self._lock:
+            self._revision = revision
+            self._arrays = arrays
+            self._reports = reports
+        return revision, arrays, reports
+
+    def get(self, name, filters=None):
+        revision, arrays, reports = self.reports()
+        report = reports[name]
+        selected = {REPORT_FILTERS[name][arg]: value for arg, value in (filters or {}).items()
+                    if value and arg in REPORT_FILTERS[name]}
+        if selected:
+            report = dict(REPORTS[name](arrays, selected), revision=revision, generatedAt=report['generatedAt'])
+        return revision, report
+
+report_cache = ReportCache()
+# --- End Timetable Reports ---
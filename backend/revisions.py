@@ -0,0 +1,35 @@
+from datetime import datetime
+from sqlalchemy.dialects import mysql, sqlite
+from .extensions import db
+from .erp_models import TimetableRevision
+
+# --- Timetable Revision ---
+#
+# Every transaction that changes timetable entries (generation commits, lock
+# toggles, moves) bumps the revision while holding the generation commit lock,
+# so a per-process cache built at revision N is current for as long as the
+# database still reports N. Adding or renaming faculty, sections, subjects or
+# rooms bumps it too, for the caches that list or name them.
+
+def current_revision(execute=None):
+    execute = execute or db.session.execute
+    table = TimetableRevision.__table__
+    return execute(db.select(table.c.revision).where(table.c.id == 1)).scalar() or 0
+
+# Bumps the revision inside the current transaction and returns the new value.
+# The row is seeded by the schema; the upsert still covers a database without
+# it, where two first bumps would otherwise both insert it. Like the locks,
+# this is MySQL in production and SQLite otherwise.
+def bump_revision():
+    table = TimetableRevision.__table__
+    now = datetime.utcnow()
+    first = {'id': 1, 'revision': 1, 'updated_at': now}
+    bumped = {'revision': table.c.revision + 1, 'updated_at': now}
+    if db.engine.dialect.name == 'mysql':
+        statement = mysql.insert(table).values(**first).on_duplicate_key_update(**bumped)
+    else:
+        statement = sqlite.insert(table).values(**first).on_conflict_do_update(index_elements=[table.c.id],
+                                                                              set_=bumped)
+    db.session.execute(statement)
+    return current_revision()
+# --- End Timetable Revision ---
@@ -6,6 +6,13 @@ from flask_jwt_extended import JWTManager, create_access_token, jwt_required, ge
 from datetime import datetime
 import uuid
 from collections import defaultdict
+from .stats import stats_cache
+from sqlalchemy.exc import IntegrityError
+from flask_jwt_extended import get_jwt
+from .auth import authenticate, role_cache, token_claims
+from .locks import NamedLock
+from .revisions import bump_revision
+from .generation import COMMIT_LOCK_TIMEOUT
 
 # Add Faculty endpoint
 @app.route('/api/faculty', methods=['POST'])
@@ -17,9 +24,19 @@ def add_faculty():
     about = request.json.get('about')
     if not all([name, faculty_id, email, department]):
         return jsonify({'error': 'Missing required fields'}), 400
-    faculty = Faculty(id=faculty_id, name=name, department=department)
-    db.session.add(faculty)
-    db.session.commit()
+    # Reports list every faculty member, so the revision moves; like every
+    # revision bump it happens under the commit lock
+    commit_lock = NamedLock(['commit'], COMMIT_LOCK_TIMEOUT)
+    if not commit_lock.acquire():
+        return jsonify({'error': 'A timetable generation is committing; please retry'}), 409
+    try:
+        faculty = Faculty(id=faculty_id, name=name, department=department)
+        db.session.add(faculty)
+        bump_revision()
+        db.session.commit()
+    finally:
+        commit_lock.release()
+    stats_cache.invalidate()
     # Optionally, store 'about' in a separate table or extend Faculty model
     return jsonify({'message': 'Faculty added successfully'})
 
@@ -42,9 +59,35 @@ def add_student():
         updated_at=datetime.utcnow()
     )
     db.session.add(user)
+    role_cache.ensure('student')
+    db.session.add(UserRole(id=str(uuid.uuid4()), user_id=roll, role='student', created_at=datetime.utcnow()))
     db.session.commit()
+    stats_cache.invalidate()
     # Optionally, store department/section in a separate table or extend User model
     return jsonify({'message': 'Student added successfully'})
+
+# --- Bulk Import ---
+from .importer import UploadError, detect_format, import_rows
+
+# Upload a CSV or JSON-lines file (multipart field 'file', or the raw request
+# body) for faculty, students, sections, subjects, rooms or faculty-subjects.
+# Rows are upserted by id; the response reports every rejected row.
+@app.route('/api/import/<kind>', methods=['POST'])
+def bulk_import(kind):
+    upload = request.files.get('file')
+    try:
+        if upload is not None:
+            fmt = detect_format(request.args.get('format'), upload.filename, upload.mimetype)
+            report = import_rows(kind, upload.stream, fmt)
+        else:
+            fmt = detect_format(request.args.get('format'), None, request.mimetype)
+            report = import_rows(kind, request.stream, fmt)
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    if report['inserted'] or report['updated']:
+        stats_cache.invalidate()
+    return jsonify(report)
+# --- End Bulk Import ---
 from flask import request, jsonify
 from .extensions import db
 from .app import app
@@ -53,19 +96,21 @@ from flask_jwt_extended import JWTManager, create_access_token, jwt_required, ge
 from datetime import datetime
 import uuid
 from collections import defaultdict
+from .stats import stats_cache, stats_etag
+from .instrumentation import instrumentation
 
 # Dashboard stats endpoints
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
-    student_count = UserRole.query.filter_by(role='student').count()
-    faculty_count = Faculty.query.count()
-    class_count = Section.query.count()
-    # You can add more stats as needed
-    return jsonify({
-        'students': student_count,
-        'faculty': faculty_count,
-        'classes': class_count
-    })
+    # Head counts come from a TTL cache, timetable numbers from the last generation
+    with instrumentation.timer('stats'):
+        stats = stats_cache.snapshot()
+    with instrumentation.timer('serialize'):
+        response = jsonify(stats)
+    response.set_etag(stats_etag(stats))
+    response.headers['Cache-Control'] = 'no-cache'
+    # Answers If-None-Match with 304 when nothing changed
+    return response.make_conditional(request)
 from flask import request, jsonify
 from .extensions import db
 from .app import app
@@ -75,244 +120,240 @@ from datetime import datetime
 import uuid
 from collections import defaultdict
 
+from flask import Response, stream_with_context
+from .generation import (
+    run_generation, prepare_stream, output_mode, GenerationError, GenerationCancelled, COMMIT_LOCK_TIMEOUT
+)
+from .jobs import JobManager
+from .database import read_execute
+from .grids import GRID_KINDS, load_grid, refresh_grids
+import hashlib
+import json
+from .occupancy import occupancy, MoveError, check_move, move_entry, swap_entries, set_locked
+from .queries import (
+    QueryError, int_arg, page_size, keyset_page, timetable_select, timetable_sort_keys,
+    filter_timetable, timetable_row_to_dict, row_to_dict
+)
+
 # Helper: Convert SQLAlchemy model to dict
 def model_to_dict(obj):
     return {c.name: getattr(obj, c.name) for c in obj.__table__.columns}
 
+# Background generation jobs
+generation_jobs = JobManager(app, max_workers=app.config.get('GENERATION_WORKERS', 2))
+
 @app.route('/api/generate-timetable', methods=['POST'])
 def generate_timetable():
-    data = request.get_json()
-    action = data.get('action', 'generate')
-    section_id = data.get('sectionId')
-
-    # Fetch all required data
-    sections = Section.query.all()
-    subjects = Subject.query.all()
-    time_slots = TimeSlot.query.order_by(TimeSlot.slot_order).all()
-    rooms = Room.query.all()
-    faculty = Faculty.query.all()
-    faculty_subjects = FacultySubject.query.all()
-    locked_entries = TimetableEntry.query.filter_by(is_locked=True).all()
-
-    # Build lookups
-    room_by_name = {room.name: room for room in rooms}
-    section_classroom = {section.id: section.classroom for section in sections}
-    subject_by_id = {subject.id: subject for subject in subjects}
-    faculty_by_id = {f.id: f for f in faculty}
-    section_by_id = {s.id: s for s in sections}
-
-    # Create schedulable entities
-    entities = []
-    for fs in faculty_subjects:
-        subject = subject_by_id.get(fs.subject_id)
-        faculty_member = faculty_by_id.get(fs.faculty_id)
-        section = section_by_id.get(fs.section_id)
-        if not subject or not faculty_member or not section:
-            continue
-        # Determine room
-        if subject.type == 'lab' and subject.lab_room:
-            lab_room = room_by_name.get(subject.lab_room)
-            if lab_room:
-                room_id = lab_room.id
-            else:
-                classroom = section_classroom.get(fs.section_id)
-                classroom_room = next((r for r in rooms if r.name == classroom), None)
-                room_id = classroom_room.id if classroom_room else rooms[0].id
-        else:
-            classroom = section_classroom.get(fs.section_id)
-            classroom_room = next((r for r in rooms if r.name == classroom), None)
-            room_id = classroom_room.id if classroom_room else rooms[0].id
-        slots_required = 1 if subject.type == 'lab' else max(2, int(round(subject.credits / 1.5)))
-        entities.append(SchedulableEntity(
-            section_id=fs.section_id,
-            subject_id=fs.subject_id,
-            faculty_id=fs.faculty_id,
-            room_id=room_id,
-            session_type=subject.type,
-            slots_required=slots_required,
-            subject_code=subject.code,
-            subject_name=subject.name,
-            faculty_name=faculty_member.name
-        ))
-
-    # Generate schedule
-    result = generate_schedule(entities, time_slots, rooms, locked_entries)
-    assignments = result['assignments']
-
-    # Optionally clear existing non-locked entries
-    if action == 'regenerate':
-        TimetableEntry.query.filter_by(is_locked=False).delete()
-        db.session.commit()
+    data = request.get_json() or {}
+    try:
+        # "output": "entries" (default), "summary" (no entry list) or "stream" (NDJSON)
+        output = output_mode(data, allow_stream=not data.get('async'))
+        # With "async": true the run is queued and polled through the jobs endpoints
+        if data.get('async'):
+            job = generation_jobs.submit(data)
+            return jsonify(job.to_dict()), 202
+        if output == 'stream':
+            body, release = prepare_stream(data, progress=instrumentation.progress())
+            response = Response(stream_with_context(body), mimetype='application/x-ndjson')
+            # Releases the scope lock if the client leaves before the commit
+            response.call_on_close(release)
+            return response
+        result = run_generation(data, progress=instrumentation.progress())
+    except GenerationError as e:
+        return jsonify({'error': str(e)}), e.status
+    except GenerationCancelled as e:
+        return jsonify({'error': str(e)}), 409
+    with instrumentation.timer('serialize'):
+        return jsonify(result)
+
+@app.route('/api/generate-timetable/jobs/<job_id>', methods=['GET'])
+def get_generation_job(job_id):
+    job = generation_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/generate-timetable/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_generation_job(job_id):
+    job = generation_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict(include_result=False))
+
+# --- Read APIs ---
 
-    # Insert new entries
-    new_entries = []
-    for a in assignments:
-        entry = TimetableEntry(
-            id=str(uuid.uuid4()),
-            section_id=a.entity.section_id,
-            subject_id=a.entity.subject_id,
-            faculty_id=a.entity.faculty_id,
-            room_id=a.entity.room_id,
-            time_slot_id=a.time_slot_id,
-            day_of_week=a.day_of_week,
-            session_type=a.entity.session_type,
-            is_locked=False
+@app.route('/api/timetable', methods=['GET'])
+def list_timetable():
+    try:
+        day = int_arg(request.args, 'day', 1, 7)
+        limit = page_size(request.args)
+        query = filter_timetable(
+            timetable_select(),
+            section_id=request.args.get('section_id'),
+            faculty_id=request.args.get('faculty_id'),
+            room_id=request.args.get('room_id'),
+            day=day
         )
-        db.session.add(entry)
-        new_entries.append(model_to_dict(entry))
-    db.session.commit()
+        rows, next_cursor = keyset_page(query, timetable_sort_keys(), limit, request.args.get('cursor'))
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'entries': [timetable_row_to_dict(row) for row in rows], 'nextCursor': next_cursor})
+
+@app.route('/api/timetable/<entry_id>/toggle-lock', methods=['POST'])
+def toggle_lock(entry_id):
+    data = request.get_json(silent=True) or {}
+    # Omitted flips the lock; anything but a JSON boolean ("false" included) is rejected
+    if 'is_locked' in data and not isinstance(data['is_locked'], bool):
+        return jsonify({'error': 'is_locked must be true or false'}), 400
+    # The entry is read and its grids rewritten under the commit lock, so a
+    # generation cannot delete or replace it in between
+    commit_lock = NamedLock(['commit'], COMMIT_LOCK_TIMEOUT)
+    if not commit_lock.acquire():
+        return jsonify({'error': 'A timetable generation is committing; please retry'}), 409
+    try:
+        entry = db.session.get(TimetableEntry, entry_id)
+        if entry is None:
+            return jsonify({'error': 'Timetable entry not found'}), 404
+        is_locked = data['is_locked'] if 'is_locked' in data else not entry.is_locked
+        entry.is_locked = is_locked
+        db.session.flush()
+        refresh_grids({kind: {getattr(entry, column)} for kind, column in GRID_KINDS.items()})
+        revision = bump_revision()
+        db.session.commit()
+    finally:
+        commit_lock.release()
+    occupancy.committed(revision - 1, revision, lambda s: set_locked(s, entry_id, is_locked))
+    return jsonify({'id': entry_id, 'is_locked': is_locked})
+
+# Checks a drag-and-drop move without making it:
+# {"day_of_week", "time_slot_id", "room_id" (optional)}
+@app.route('/api/timetable/<entry_id>/validate-move', methods=['POST'])
+def validate_move(entry_id):
+    data = request.get_json(silent=True) or {}
+    try:
+        snapshot = occupancy.snapshot()
+        with occupancy.lock():
+            result = check_move(snapshot, entry_id, data)
+    except MoveError as e:
+        return jsonify({'error': str(e)}), e.status
+    return jsonify(result)
 
-    return jsonify({
-        'success': True,
-        'message': result['message'],
-        'entriesCount': len(new_entries),
-        'entries': new_entries
-    })
-
-# --- Scheduling Data Structures and Helpers ---
-
-class SchedulableEntity:
-    def __init__(self, section_id, subject_id, faculty_id, room_id, session_type, slots_required, subject_code, subject_name, faculty_name):
-        self.section_id = section_id
-        self.subject_id = subject_id
-        self.faculty_id = faculty_id
-        self.room_id = room_id
-        self.session_type = session_type
-        self.slots_required = slots_required
-        self.subject_code = subject_code
-        self.subject_name = subject_name
-        self.faculty_name = faculty_name
-
-class Assignment:
-    def __init__(self, entity, day_of_week, time_slot_id, slot_order):
-        self.entity = entity
-        self.day_of_week = day_of_week
-        self.time_slot_id = time_slot_id
-        self.slot_order = slot_order
-
-class ConflictState:
-    def __init__(self):
-        self.faculty_schedule = defaultdict(set)  # faculty_id -> set(day-slotOrder)
-        self.section_schedule = defaultdict(set)  # section_id -> set(day-slotOrder)
-        self.room_schedule = defaultdict(set)     # room_id -> set(day-slotOrder)
-
-def init_conflict_state():
-    return ConflictState()
-
-def is_slot_available(state, faculty_id, section_id, room_id, day, slot_orders):
-    for slot_order in slot_orders:
-        key = f"{day}-{slot_order}"
-        if key in state.faculty_schedule[faculty_id]:
-            return False
-        if key in state.section_schedule[section_id]:
-            return False
-        if key in state.room_schedule[room_id]:
-            return False
-    return True
-
-def occupy_slot(state, faculty_id, section_id, room_id, day, slot_orders):
-    for slot_order in slot_orders:
-        key = f"{day}-{slot_order}"
-        state.faculty_schedule[faculty_id].add(key)
-        state.section_schedule[section_id].add(key)
-        state.room_schedule[room_id].add(key)
-
-def calculate_score(assignments):
-    score = 0
-    # Group by section and day
-    section_day_assignments = defaultdict(list)
-    for a in assignments:
-        key = f"{a.entity.section_id}-{a.day_of_week}"
-        section_day_assignments[key].append(a)
-    # Soft constraint 1: Penalize extreme early/late slots
-    for a in assignments:
-        if a.slot_order == 1:
-            score += 2
-        if a.slot_order == 7:
-            score += 1
-    # Soft constraint 2: Penalize overloading sections
-    for day_assignments in section_day_assignments.values():
-        if len(day_assignments) > 5:
-            score += (len(day_assignments) - 5) * 3
-    # Soft constraint 3: Faculty idle gaps
-    faculty_day_slots = defaultdict(list)
-    for a in assignments:
-        key = f"{a.entity.faculty_id}-{a.day_of_week}"
-        faculty_day_slots[key].append(a.slot_order)
-    for slots in faculty_day_slots.values():
-        if len(slots) > 1:
-            sorted_slots = sorted(slots)
-            for i in range(1, len(sorted_slots)):
-                gap = sorted_slots[i] - sorted_slots[i-1] - 1
-                if gap > 0:
-                    score += gap * 2
-    return score
-
-def generate_schedule(entities, time_slots, rooms, locked_entries):
-    state = init_conflict_state()
-    assignments = []
-    days = [1, 2, 3, 4, 5]  # Monday to Friday
-    sorted_slots = sorted(time_slots, key=lambda s: s.slot_order)
-    room_by_name = {room.name: room for room in rooms}
-    # Pre-occupy locked entries
-    for entry in locked_entries:
-        slot = next((s for s in sorted_slots if s.id == entry.time_slot_id), None)
-        if slot:
-            slots_needed = [slot.slot_order, slot.slot_order + 1] if entry.session_type == 'lab' else [slot.slot_order]
-            occupy_slot(state, entry.faculty_id, entry.section_id, entry.room_id, entry.day_of_week, slots_needed)
-    # Separate labs and theory
-    lab_entities = [e for e in entities if e.session_type == 'lab']
-    theory_entities = [e for e in entities if e.session_type == 'theory']
-    import random
-    def shuffle(arr):
-        arr = list(arr)
-        random.shuffle(arr)
-        return arr
-    shuffled_labs = shuffle(lab_entities)
-    shuffled_theory = shuffle(theory_entities)
-    # Schedule labs
-    for entity in shuffled_labs:
-        scheduled = False
-        preferred_start_orders = [4, 3, 5, 2, 6]
-        for day in shuffle(days):
-            for start_order in preferred_start_orders:
-                if start_order + 1 > len(sorted_slots):
-                    continue
-                start_slot = next((s for s in sorted_slots if s.slot_order == start_order), None)
-                if not start_slot:
-                    continue
-                slots_needed = [start_order, start_order + 1]
-                if is_slot_available(state, entity.faculty_id, entity.section_id, entity.room_id, day, slots_needed):
-                    occupy_slot(state, entity.faculty_id, entity.section_id, entity.room_id, day, slots_needed)
-                    assignments.append(Assignment(entity, day, start_slot.id, start_order))
-                    scheduled = True
-                    break
-            if scheduled:
-                break
-    # Schedule theory
-    for entity in shuffled_theory:
-        sessions_needed = entity.slots_required
-        sessions_scheduled = 0
-        for day in shuffle(days):
-            if sessions_scheduled >= sessions_needed:
-                break
-            preferred_orders = [3, 2, 4, 5, 1, 6, 7]
-            for slot_order in preferred_orders:
-                slot = next((s for s in sorted_slots if s.slot_order == slot_order), None)
-                if not slot:
-                    continue
-                if is_slot_available(state, entity.faculty_id, entity.section_id, entity.room_id, day, [slot_order]):
-                    occupy_slot(state, entity.faculty_id, entity.section_id, entity.room_id, day, [slot_order])
-                    assignments.append(Assignment(entity, day, slot.id, slot_order))
-                    sessions_scheduled += 1
-                    break
-    score = calculate_score(assignments)
-    return {
-        'assignments': assignments,
-        'success': True,
-        'message': f'Generated {len(assignments)} timetable entries with optimization score {score}'
-    }
-# --- End Scheduling Helpers ---
+@app.route('/api/timetable/<entry_id>/move', methods=['POST'])
+def move_timetable_entry(entry_id):
+    data = request.get_json(silent=True) or {}
+    try:
+        result = move_entry(entry_id, data)
+    except MoveError as e:
+        return jsonify({'error': str(e)}), e.status
+    if not result['valid']:
+        return jsonify({'error': 'The entry cannot move there', **result}), 409
+    return jsonify(result)
+
+# Exchanges the day and period of two entries: {"swap_with": entry id}
+@app.route('/api/timetable/<entry_id>/swap', methods=['POST'])
+def swap_timetable_entries(entry_id):
+    data = request.get_json(silent=True) or {}
+    if not data.get('swap_with'):
+        return jsonify({'error': 'swap_with is required'}), 400
+    try:
+        result = swap_entries(entry_id, data['swap_with'])
+    except MoveError as e:
+        return jsonify({'error': str(e)}), e.status
+    if not result['valid']:
+        return jsonify({'error': 'The entries cannot be swapped', **result}), 409
+    return jsonify(result)
+
+# Precomputed days x slots grid of a section, faculty member or room
+@app.route('/api/timetable/grid/<kind>/<entity_id>', methods=['GET'])
+def get_timetable_grid(kind, entity_id):
+    if kind not in GRID_KINDS:
+        return jsonify({'error': f"kind must be one of: {', '.join(GRID_KINDS)}"}), 400
+    payload = load_grid(kind, entity_id)
+    if payload is None:
+        return jsonify({'error': f'{kind.capitalize()} not found'}), 404
+    response = Response(payload, mimetype='application/json')
+    response.set_etag(hashlib.sha1(payload.encode()).hexdigest())
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+# Paginated listing of a simple table ordered by (name, id)
+def list_named(model, filters):
+    table = model.__table__
+    query = db.select(table)
+    for column, arg in filters:
+        value = request.args.get(arg)
+        if value:
+            query = query.where(table.c[column] == value)
+    rows, next_cursor = keyset_page(query, [table.c.name, table.c.id], page_size(request.args), request.args.get('cursor'))
+    return [row_to_dict(row) for row in rows], next_cursor
+
+@app.route('/api/sections', methods=['GET'])
+def list_sections():
+    try:
+        sections, next_cursor = list_named(Section, [('department', 'department')])
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'sections': sections, 'nextCursor': next_cursor})
+
+@app.route('/api/faculty', methods=['GET'])
+def list_faculty():
+    try:
+        faculty, next_cursor = list_named(Faculty, [('department', 'department')])
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'faculty': faculty, 'nextCursor': next_cursor})
+
+@app.route('/api/rooms', methods=['GET'])
+def list_rooms():
+    try:
+        rooms, next_cursor = list_named(Room, [('type', 'type')])
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'rooms': rooms, 'nextCursor': next_cursor})
+
+@app.route('/api/time-slots', methods=['GET'])
+def list_time_slots():
+    # A campus has a handful of periods, so this is never paginated
+    rows = read_execute(db.select(TimeSlot.__table__).order_by(TimeSlot.slot_order)).all()
+    return jsonify({'time_slots': [row_to_dict(row) for row in rows]})
+
+# --- End Read APIs ---
+
+# --- Reports ---
+from .reports import REPORTS, REPORT_FILTERS, report_cache
+
+# room-utilization (?type=), faculty-workload and section-load (?department=),
+# cached until the timetable revision changes
+@app.route('/api/reports/<name>', methods=['GET'])
+def get_report(name):
+    if name not in REPORTS:
+        return jsonify({'error': f"Unknown report '{name}'. Available: {', '.join(REPORTS)}"}), 404
+    filters = {arg: request.args.get(arg) for arg in REPORT_FILTERS[name]}
+    with instrumentation.timer('report'):
+        revision, report = report_cache.get(name, filters)
+    with instrumentation.timer('serialize'):
+        response = jsonify(report)
+    response.set_etag(hashlib.sha1(json.dumps([name, revision, filters], sort_keys=True).encode()).hexdigest())
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+# --- End Reports ---
+
+# --- Export ---
+from .exports import FORMATS as EXPORT_FORMATS, ExportScope, export_stream
+
+# /api/export/csv|xlsx|ics?section_id=|faculty_id=|room_id= (campus-wide when
+# none is given); ics also takes the term's start and until dates
+@app.route('/api/export/<fmt>', methods=['GET'])
+def export_timetable(fmt):
+    scope = ExportScope(request.args.get('section_id'), request.args.get('faculty_id'), request.args.get('room_id'))
+    try:
+        body = export_stream(fmt, scope, request.args)
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    response = Response(stream_with_context(body), content_type=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{scope.filename(fmt)}"'
+    return response
+# --- End Export ---
 
 # Setup JWT
 app.config['JWT_SECRET_KEY'] = 'your-secret-key'  # Change this in production
@@ -338,18 +379,21 @@ def register():
     )
     user.set_password(password)
     db.session.add(user)
-    # Assign role
-    if not AppRole.query.filter_by(role=role).first():
-        db.session.add(AppRole(role=role))
-    db.session.commit()
-    user_role = UserRole(
+    # Assign role; user, role and membership commit together
+    role_cache.ensure(role)
+    db.session.add(UserRole(
         id=str(uuid.uuid4()),
         user_id=user.id,
         role=role,
         created_at=datetime.utcnow()
-    )
-    db.session.add(user_role)
-    db.session.commit()
+    ))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another registration with this email committed first
+        db.session.rollback()
+        return jsonify({'msg': 'User already exists'}), 400
+    stats_cache.invalidate()
     return jsonify({'msg': 'User registered successfully'})
 
 @app.route('/api/login', methods=['POST'])
@@ -357,15 +401,18 @@ def login():
     data = request.get_json()
     email = data.get('email')
     password = data.get('password')
-    user = User.query.filter_by(email=email).first()
-    if not user or not user.check_password(password):
+    user = authenticate(email, password) if email and password else None
+    if user is None:
         return jsonify({'msg': 'Invalid credentials'}), 401
-    access_token = create_access_token(identity=user.id)
-    return jsonify({'access_token': access_token, 'user_id': user.id, 'full_name': user.full_name})
+    user_id, full_name, roles = user
+    access_token = create_access_token(identity=user_id, additional_claims=token_claims(full_name, roles))
+    return jsonify({'access_token': access_token, 'user_id': user_id, 'full_name': full_name, 'roles': roles})
 
 @app.route('/api/protected', methods=['GET'])
 @jwt_required()
 def protected():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    return jsonify({'msg': f'Hello, {user.full_name}! This is a protected route.'})
+    full_name = get_jwt().get('name')
+    if full_name is None:
+        # Tokens issued before roles were embedded carry no claims
+        full_name = db.session.get(User, get_jwt_identity()).full_name
+    return jsonify({'msg': f'Hello, {full_name}! This is a protected route.'})
@@ -0,0 +1,225 @@
+import random
+from .scoring import ScoreEngine
+
+# --- Scheduling Data Structures and Helpers ---
+
+DAYS = [1, 2, 3, 4, 5]  # Monday to Friday
+LAB_START_ORDERS = [4, 3, 5, 2, 6]
+THEORY_SLOT_ORDERS = [3, 2, 4, 5, 1, 6, 7]
+SLOT_STRIDE = 16  # bits reserved per day in a ConflictState week mask
+
+class SchedulableEntity:
+    def __init__(self, section_id, subject_id, faculty_id, room_id, session_type, slots_required, subject_code, subject_name, faculty_name):
+        self.section_id = section_id
+        self.subject_id = subject_id
+        self.faculty_id = faculty_id
+        self.room_id = room_id
+        self.session_type = session_type
+        self.slots_required = slots_required
+        self.subject_code = subject_code
+        self.subject_name = subject_name
+        self.faculty_name = faculty_name
+
+class Assignment:
+    def __init__(self, entity, day_of_week, time_slot_id, slot_order):
+        self.entity = entity
+        self.day_of_week = day_of_week
+        self.time_slot_id = time_slot_id
+        self.slot_order = slot_order
+
+class ConflictState:
+    # Each resource's week is a single integer bitmask: bit (day * slot_stride + slot_order)
+    # is set while the resource is busy in that period, so a multi-period block is one AND.
+    def __init__(self, slot_stride=SLOT_STRIDE):
+        self.slot_stride = slot_stride
+        self.faculty_schedule = {}  # faculty_id -> week bitmask
+        self.section_schedule = {}  # section_id -> week bitmask
+        self.room_schedule = {}     # room_id -> week bitmask
+
+    def mask(self, day, slot_orders):
+        base = day * self.slot_stride
+        mask = 0
+        for slot_order in slot_orders:
+            mask |= 1 << (base + slot_order)
+        return mask
+
+    def busy(self, faculty_id, section_id, room_id):
+        return (self.faculty_schedule.get(faculty_id, 0)
+                | self.section_schedule.get(section_id, 0)
+                | self.room_schedule.get(room_id, 0))
+
+class SchedulingContext:
+    # Lookups built once per generation request and shared by every solver.
+    # constraints is a CompiledConstraints (see constraints.py); None keeps the defaults.
+    def __init__(self, time_slots, rooms, constraints=None):
+        self.sorted_slots = sorted(time_slots, key=lambda s: s.slot_order)
+        self.slot_by_order = {s.slot_order: s for s in self.sorted_slots}
+        self.slot_by_id = {s.id: s for s in self.sorted_slots}
+        self.rooms = rooms
+        self.room_by_name = {room.name: room for room in rooms}
+        self.constraints = constraints
+        self.days = constraints.days if constraints else DAYS
+        lab_start_orders = constraints.lab_start_orders if constraints else LAB_START_ORDERS
+        theory_slot_orders = constraints.theory_slot_orders if constraints else THEORY_SLOT_ORDERS
+        # Preference orders restricted to slots that exist in this campus
+        self.lab_start_orders = [
+            o for o in lab_start_orders
+            if o + 1 <= len(self.sorted_slots) and o in self.slot_by_order
+        ]
+        self.theory_slot_orders = [o for o in theory_slot_orders if o in self.slot_by_order]
+        self.weights = constraints.weights if constraints else None
+        # Unavailability windows as week masks, pre-occupied in every ConflictState
+        template = init_conflict_state(self.sorted_slots)
+        self.unavailable = {'faculty': {}, 'room': {}}
+        for kind, resource_id, day, slot_orders in (constraints.unavailable if constraints else ()):
+            mask = template.mask(day, slot_orders if slot_orders is not None else list(self.slot_by_order))
+            self.unavailable[kind][resource_id] = self.unavailable[kind].get(resource_id, 0) | mask
+        self.run_limits = constraints.run_limits if constraints else {}
+        # Extra per-block check for the placement loops; None when no rule needs one
+        self.block_check = self.within_run_limits if self.run_limits else None
+
+    def within_run_limits(self, state, entity, block):
+        limit = self.run_limits.get('section')
+        if limit is not None and exceeds_run_limit(state.section_schedule.get(entity.section_id, 0), block, limit):
+            return False
+        limit = self.run_limits.get('faculty')
+        if limit is not None:
+            # Unavailable periods are pre-occupied but are not classes
+            week = state.faculty_schedule.get(entity.faculty_id, 0) & ~self.unavailable['faculty'].get(entity.faculty_id, 0)
+            if exceeds_run_limit(week, block, limit):
+                return False
+        return True
+
+    def room_id_for(self, subject, classroom):
+        if subject.type == 'lab' and subject.lab_room:
+            lab_room = self.room_by_name.get(subject.lab_room)
+            if lab_room:
+                return lab_room.id
+        classroom_room = self.room_by_name.get(classroom)
+        return classroom_room.id if classroom_room else self.rooms[0].id
+
+    def conflict_state(self, fixed_entries=()):
+        state = init_conflict_state(self.sorted_slots)
+        state.faculty_schedule.update(self.unavailable['faculty'])
+        state.room_schedule.update(self.unavailable['room'])
+        for entry in fixed_entries:
+            slot = self.slot_by_id.get(entry.time_slot_id)
+            if slot:
+                slots_needed = session_slot_orders(entry.session_type, slot.slot_order)
+                occupy_slot(state, entry.faculty_id, entry.section_id, entry.room_id, entry.day_of_week, slots_needed)
+        return state
+
+def init_conflict_state(time_slots=None):
+    if not time_slots:
+        return ConflictState()
+    # Room for the second period of a lab starting in the last slot
+    return ConflictState(max(SLOT_STRIDE, max(s.slot_order for s in time_slots) + 2))
+
+def is_slot_available(state, faculty_id, section_id, room_id, day, slot_orders):
+    return not state.busy(faculty_id, section_id, room_id) & state.mask(day, slot_orders)
+
+def available_days(state, faculty_id, section_id, room_id, days, slot_orders):
+    # Test the same block on every day with one AND against the combined week
+    pattern = state.mask(0, slot_orders)
+    row = 0
+    for day in days:
+        row |= pattern << (day * state.slot_stride)
+    clashes = state.busy(faculty_id, section_id, room_id) & row
+    if not clashes:
+        return list(days)
+    return [day for day in days if not (clashes >> (day * state.slot_stride)) & pattern]
+
+def exceeds_run_limit(week, block, limit):
+    # True if adding block to week creates a run of more than limit consecutive
+    # periods touching the block. Runs never cross days: the stride leaves gap bits.
+    runs = week | block
+    for _ in range(limit):
+        runs &= runs >> 1
+    # A set bit now marks the start of a run of limit + 1 periods
+    low = (block & -block).bit_length() - 1
+    start = max(low - limit, 0)
+    window = ((1 << (block.bit_length() - start)) - 1) << start
+    return bool(runs & window)
+
+def occupy_mask(state, faculty_id, section_id, room_id, mask):
+    state.faculty_schedule[faculty_id] = state.faculty_schedule.get(faculty_id, 0) | mask
+    state.section_schedule[section_id] = state.section_schedule.get(section_id, 0) | mask
+    state.room_schedule[room_id] = state.room_schedule.get(room_id, 0) | mask
+
+def release_mask(state, faculty_id, section_id, room_id, mask):
+    state.faculty_schedule[faculty_id] = state.faculty_schedule.get(faculty_id, 0) & ~mask
+    state.section_schedule[section_id] = state.section_schedule.get(section_id, 0) & ~mask
+    state.room_schedule[room_id] = state.room_schedule.get(room_id, 0) & ~mask
+
+def occupy_slot(state, faculty_id, section_id, room_id, day, slot_orders):
+    occupy_mask(state, faculty_id, section_id, room_id, state.mask(day, slot_orders))
+
+def release_slot(state, faculty_id, section_id, room_id, day, slot_orders):
+    release_mask(state, faculty_id, section_id, room_id, state.mask(day, slot_orders))
+
+def session_slot_orders(session_type, start_order):
+    # Labs are double periods starting at start_order
+    return [start_order, start_order + 1] if session_type == 'lab' else [start_order]
+
+def calculate_score(assignments, weights=None):
+    # Soft constraints: early/late slots, section overload and faculty idle gaps
+    return ScoreEngine.from_assignments(assignments, weights=weights).total()
+
+def generate_schedule(entities, time_slots, rooms, locked_entries, context=None, rng=None):
+    rng = rng or random
+    if context is None:
+        context = SchedulingContext(time_slots, rooms)
+    # Pre-occupy locked entries
+    state = context.conflict_state(locked_entries)
+    assignments = []
+    days = context.days
+    slot_by_order = context.slot_by_order
+    block_check = context.block_check
+    # Separate labs and theory
+    lab_entities = [e for e in entities if e.session_type == 'lab']
+    theory_entities = [e for e in entities if e.session_type == 'theory']
+    def shuffle(arr):
+        arr = list(arr)
+        rng.shuffle(arr)
+        return arr
+    shuffled_labs = shuffle(lab_entities)
+    shuffled_theory = shuffle(theory_entities)
+    # Schedule labs
+    for entity in shuffled_labs:
+        scheduled = False
+        preferred_start_orders = context.lab_start_orders
+        busy = state.busy(entity.faculty_id, entity.section_id, entity.room_id)
+        for day in shuffle(days):
+            for start_order in preferred_start_orders:
+                block = state.mask(day, [start_order, start_order + 1])
+                if not busy & block and (block_check is None or block_check(state, entity, block)):
+                    occupy_mask(state, entity.faculty_id, entity.section_id, entity.room_id, block)
+                    assignments.append(Assignment(entity, day, slot_by_order[start_order].id, start_order))
+                    scheduled = True
+                    break
+            if scheduled:
+                break
+    # Schedule theory
+    for entity in shuffled_theory:
+        sessions_needed = entity.slots_required
+        sessions_scheduled = 0
+        busy = state.busy(entity.faculty_id, entity.section_id, entity.room_id)
+        for day in shuffle(days):
+            if sessions_scheduled >= sessions_needed:
+                break
+            preferred_orders = context.theory_slot_orders
+            for slot_order in preferred_orders:
+                block = state.mask(day, [slot_order])
+                if not busy & block and (block_check is None or block_check(state, entity, block)):
+                    occupy_mask(state, entity.faculty_id, entity.section_id, entity.room_id, block)
+                    busy |= block
+                    assignments.append(Assignment(entity, day, slot_by_order[slot_order].id, slot_order))
+                    sessions_scheduled += 1
+                    break
+    score = calculate_score(assignments, context.weights)
+    return {
+        'assignments': assignments,
+        'success': True,
+        'message': f'Generated {len(assignments)} timetable entries with optimization score {score}'
+    }
+# --- End Scheduling Helpers ---
@@ -7,13 +7,26 @@ create table app_role (
 );
 insert into app_role (role) values ('admin'), ('teacher'), ('student');
 
+-- Users table
+create table if not exists users (
+  id char(36) primary key,
+  email varchar(255) not null,
+  password_hash varchar(255) not null,
+  full_name varchar(255) not null,
+  created_at datetime not null,
+  updated_at datetime not null,
+  unique key uq_users_email (email)
+);
+
 -- User roles table
 create table if not exists user_roles (
   id char(36) primary key,
   user_id char(36) not null,
   role varchar(20) not null,
   created_at timestamp not null default current_timestamp,
-  unique key (user_id, role),
+  unique key uq_user_roles_user_role (user_id, role),
+  key ix_user_roles_role (role),
+  foreign key (user_id) references users(id),
   foreign key (role) references app_role(role)
 );
 
@@ -49,7 +62,8 @@ create table if not exists time_slots (
   id char(36) primary key,
   start_time time not null,
   end_time time not null,
-  slot_order int not null
+  slot_order int not null,
+  unique key uq_time_slots_slot_order (slot_order)
 );
 
 -- Rooms table
@@ -73,6 +87,8 @@ create table if not exists faculty_subjects (
   faculty_id char(36) not null,
   subject_id char(36) not null,
   section_id char(36) not null,
+  unique key uq_faculty_subjects_section_subject_faculty (section_id, subject_id, faculty_id),
+  key ix_faculty_subjects_faculty (faculty_id),
   foreign key (faculty_id) references faculty(id),
   foreign key (subject_id) references subjects(id),
   foreign key (section_id) references sections(id)
@@ -89,9 +105,38 @@ create table if not exists timetable_entries (
   day_of_week int not null,
   session_type enum('theory','lab') not null,
   is_locked boolean not null default false,
+  -- One entry per section / faculty / room per day and slot
+  unique key uq_timetable_entries_section_slot (section_id, day_of_week, time_slot_id),
+  unique key uq_timetable_entries_faculty_slot (faculty_id, day_of_week, time_slot_id),
+  unique key uq_timetable_entries_room_slot (room_id, day_of_week, time_slot_id),
+  key ix_timetable_entries_locked_section (is_locked, section_id),
   foreign key (section_id) references sections(id),
   foreign key (subject_id) references subjects(id),
   foreign key (faculty_id) references faculty(id),
   foreign key (room_id) references rooms(id),
   foreign key (time_slot_id) references time_slots(id)
 );
+
+-- Precomputed days x slots grid per section, faculty member and room
+create table if not exists timetable_grids (
+  entity_type enum('section','faculty','room') not null,
+  entity_id char(36) not null,
+  payload text not null,
+  updated_at datetime not null,
+  primary key (entity_type, entity_id)
+);
+
+-- Timetable revision: one row counting committed timetable changes
+create table if not exists timetable_revision (
+  id int primary key,
+  revision int not null,
+  updated_at datetime not null
+);
+insert ignore into timetable_revision (id, revision, updated_at) values (1, 0, current_timestamp);
+
+-- Sessions per section the last generation covering it could not place
+create table if not exists section_unplaced (
+  section_id char(36) primary key,
+  missing_sessions int not null,
+  foreign key (section_id) references sections(id)
+);
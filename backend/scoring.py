@@ -0,0 +1,122 @@
+import numpy as np
+
+# --- Soft-Constraint Scoring ---
+#
+# Section-day loads and faculty-day occupancy are kept as dense arrays indexed
+# by (section, day) and (faculty, day, slot_order), so a full timetable scores
+# in a few vectorized ops and a single move or swap re-scores only the rows it
+# touches.
+
+EARLY_SLOT, EARLY_PENALTY = 1, 2    # first period of the day
+LATE_SLOT, LATE_PENALTY = 7, 1      # last period of the day
+SECTION_DAY_LIMIT = 5               # sessions per section per day before overload
+OVERLOAD_PENALTY = 3                # per session over the limit
+GAP_PENALTY = 2                     # per idle period between a faculty member's classes
+
+class SoftWeights:
+    # Soft-constraint weights; the defaults are the constants above.
+    # slot_penalties maps slot_order -> penalty per session in that period.
+    def __init__(self, slot_penalties=None, section_day_limit=SECTION_DAY_LIMIT,
+                 overload_penalty=OVERLOAD_PENALTY, gap_penalty=GAP_PENALTY):
+        if slot_penalties is None:
+            slot_penalties = {EARLY_SLOT: EARLY_PENALTY, LATE_SLOT: LATE_PENALTY}
+        self.slot_penalties = slot_penalties
+        self.section_day_limit = section_day_limit
+        self.overload_penalty = overload_penalty
+        self.gap_penalty = gap_penalty
+
+DEFAULT_WEIGHTS = SoftWeights()
+
+class ScoreEngine:
+    def __init__(self, section_ids, faculty_ids, days, max_slot_order, weights=None):
+        self.weights = weights or DEFAULT_WEIGHTS
+        self.section_index = {section_id: i for i, section_id in enumerate(section_ids)}
+        self.faculty_index = {faculty_id: i for i, faculty_id in enumerate(faculty_ids)}
+        self.day_index = {day: i for i, day in enumerate(days)}
+        n_slots = max([max_slot_order] + list(self.weights.slot_penalties)) + 1
+        self.slot_penalty = np.zeros(n_slots, dtype=np.int64)
+        for slot_order, penalty in self.weights.slot_penalties.items():
+            self.slot_penalty[slot_order] += penalty
+        self.section_load = np.zeros((len(self.section_index), len(self.day_index)), dtype=np.int32)
+        self.faculty_slots = np.zeros((len(self.faculty_index), len(self.day_index), n_slots), dtype=np.int32)
+        self.slot_counts = np.zeros(n_slots, dtype=np.int64)
+
+    @classmethod
+    def from_assignments(cls, assignments, days=(), weights=None):
+        section_ids = list(dict.fromkeys(a.entity.section_id for a in assignments))
+        faculty_ids = list(dict.fromkeys(a.entity.faculty_id for a in assignments))
+        all_days = list(dict.fromkeys(list(days) + [a.day_of_week for a in assignments]))
+        max_slot_order = max((a.slot_order for a in assignments), default=0)
+        engine = cls(section_ids, faculty_ids, all_days, max_slot_order, weights)
+        engine.load(assignments)
+        return engine
+
+    def load(self, assignments):
+        if not assignments:
+            return
+        sections = np.fromiter((self.section_index[a.entity.section_id] for a in assignments), dtype=np.intp)
+        faculty = np.fromiter((self.faculty_index[a.entity.faculty_id] for a in assignments), dtype=np.intp)
+        days = np.fromiter((self.day_index[a.day_of_week] for a in assignments), dtype=np.intp)
+        slots = np.fromiter((a.slot_order for a in assignments), dtype=np.intp)
+        np.add.at(self.section_load, (sections, days), 1)
+        np.add.at(self.faculty_slots, (faculty, days, slots), 1)
+        self.slot_counts += np.bincount(slots, minlength=len(self.slot_counts))
+
+    def total(self):
+        w = self.weights
+        slot_score = int(self.slot_counts @ self.slot_penalty)
+        overload = int(np.maximum(self.section_load - w.section_day_limit, 0).sum()) * w.overload_penalty
+        occupied = self.faculty_slots > 0
+        if not occupied.size:
+            return slot_score + overload
+        return slot_score + overload + int(idle_gaps(occupied).sum()) * w.gap_penalty
+
+    def _gap(self, f, d):
+        occupied = np.flatnonzero(self.faculty_slots[f, d])
+        if len(occupied) < 2:
+            return 0
+        return int(occupied[-1] - occupied[0] + 1 - len(occupied)) * self.weights.gap_penalty
+
+    def _overload(self, s, d):
+        w = self.weights
+        return max(int(self.section_load[s, d]) - w.section_day_limit, 0) * w.overload_penalty
+
+    def _local(self, rows):
+        section_days, faculty_days = rows
+        return (sum(self._overload(s, d) for s, d in section_days)
+                + sum(self._gap(f, d) for f, d in faculty_days))
+
+    # changes: (section_id, faculty_id, day, slot_order, +1 | -1) tuples.
+    # Applies them and returns the score delta, touching only affected rows.
+    def apply(self, changes):
+        indexed = [
+            (self.section_index[s], self.faculty_index[f], self.day_index[d], t, sign)
+            for s, f, d, t, sign in changes
+        ]
+        rows = ({(s, d) for s, _, d, _, _ in indexed}, {(f, d) for _, f, d, _, _ in indexed})
+        before = self._local(rows)
+        delta = 0
+        for s, f, d, t, sign in indexed:
+            self.section_load[s, d] += sign
+            self.faculty_slots[f, d, t] += sign
+            self.slot_counts[t] += sign
+            delta += sign * int(self.slot_penalty[t])
+        return delta + self._local(rows) - before
+
+    def move_delta(self, section_id, faculty_id, old_day, old_slot, new_day, new_slot):
+        changes = [(section_id, faculty_id, old_day, old_slot, -1), (section_id, faculty_id, new_day, new_slot, 1)]
+        delta = self.apply(changes)
+        self.apply(invert(changes))
+        return delta
+
+# Idle periods between the first and last busy period of each row and day of
+# a boolean (rows, days, periods) array
+def idle_gaps(occupied):
+    counts = occupied.sum(axis=2)
+    first = occupied.argmax(axis=2)
+    last = occupied.shape[2] - 1 - occupied[:, :, ::-1].argmax(axis=2)
+    return np.where(counts > 1, last - first + 1 - counts, 0)
+
+def invert(changes):
+    return [(s, f, d, t, -sign) for s, f, d, t, sign in changes]
+# --- End Soft-Constraint Scoring ---
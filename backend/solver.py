@@ -0,0 +1,552 @@
+import math
+import os
+import random
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from .scheduling import (
+    SchedulableEntity, SchedulingContext, Assignment, is_slot_available, available_days, occupy_slot,
+    release_slot, session_slot_orders, calculate_score, generate_schedule
+)
+from .scoring import ScoreEngine, invert
+from .constraints import compile_constraints
+
+# --- Solver Engines ---
+#
+# Every engine takes the entities, a SchedulingContext and the fixed entries and
+# returns the same result dict as generate_schedule; solve() extends it with
+# 'score' and 'unplaced'. Engines are registered in SOLVERS and picked per
+# request by name.
+
+DEFAULT_TIME_BUDGET = 2.0      # seconds, construction + improvement
+MAX_BACKTRACK_DEPTH = 3        # length of an eject-and-reinsert chain
+BACKTRACKS_PER_SESSION = 20    # total backtrack steps allowed per session
+RETRY_UNPLACED_EVERY = 500     # improvement iterations between repair passes
+PROGRESS_EVERY = 200           # placements / iterations between progress reports
+INITIAL_TEMPERATURE = 2.0
+COOLING_RATE = 0.9995          # per annealing iteration, so a run replays from (seed, iterations)
+MIN_TEMPERATURE = 1e-3
+MAX_STARTS = 64
+SEED_RANGE = 2 ** 31
+
+class SolverError(ValueError):
+    pass
+
+class SolverCancelled(Exception):
+    pass
+
+class Session:
+    # One placeable unit: a lab block or a single theory period
+    def __init__(self, index, entity, entity_index):
+        self.index = index
+        self.entity = entity
+        self.entity_index = entity_index
+        self.day = None
+        self.slot_order = None
+
+    @property
+    def placed(self):
+        return self.day is not None
+
+class ScheduleSearch:
+    def __init__(self, entities, context, locked_entries, rng, deadline, progress=None, cancel=None, max_iterations=None,
+                 max_steps=None):
+        self.rng = rng
+        self.deadline = deadline
+        self.max_iterations = max_iterations
+        self.max_steps = max_steps
+        self.iterations = 0
+        self.steps = 0  # time budget checks made so far
+        self.cut_at = None  # the check at which the budget ran out
+        self.progress = progress
+        self.cancel = cancel
+        self.placed_count = 0
+        self.context = context
+        self.state = context.conflict_state(locked_entries)
+        self.owner = {}   # (kind, resource_id, day, slot_order) -> Session
+        self.fixed = set()  # keys held by locked entries
+        self.entity_days = defaultdict(set)  # theory entity -> days already used
+        for entry in locked_entries:
+            slot = context.slot_by_id.get(entry.time_slot_id)
+            if not slot:
+                continue
+            orders = session_slot_orders(entry.session_type, slot.slot_order)
+            for key in self._keys(entry.faculty_id, entry.section_id, entry.room_id, entry.day_of_week, orders):
+                self.fixed.add(key)
+        self.sessions = []
+        for entity_index, entity in enumerate(entities):
+            count = 1 if entity.session_type == 'lab' else entity.slots_required
+            for _ in range(count):
+                self.sessions.append(Session(len(self.sessions), entity, entity_index))
+        self.backtracks = 0
+        self.max_backtracks = BACKTRACKS_PER_SESSION * max(1, len(self.sessions))
+        self._chain = set()
+
+    def _keys(self, faculty_id, section_id, room_id, day, orders):
+        for order in orders:
+            yield ('faculty', faculty_id, day, order)
+            yield ('section', section_id, day, order)
+            yield ('room', room_id, day, order)
+
+    # Construction, repair and annealing all consult the budget here. Each check
+    # is one step of a deterministic work count: the step at which the clock ran
+    # out is recorded, and a replay given that step stops at exactly the same
+    # point without looking at the clock.
+    def out_of_time(self):
+        if self.cancel is not None and self.cancel.is_set():
+            return True
+        if self.cut_at is not None:
+            return True
+        self.steps += 1
+        if self.max_steps is not None:
+            expired = self.steps >= self.max_steps
+        else:
+            expired = time.perf_counter() >= self.deadline
+        if expired:
+            self.cut_at = self.steps
+        return expired
+
+    def report(self, **values):
+        if self.progress:
+            self.progress(**values)
+
+    # Candidate (day, start_order) pairs in the same preference order as the greedy pass
+    def candidates(self, session):
+        days = list(self.context.days)
+        self.rng.shuffle(days)
+        if session.entity.session_type == 'lab':
+            orders = self.context.lab_start_orders
+        else:
+            orders = self.context.theory_slot_orders
+        return [(day, order) for day in days for order in orders]
+
+    def feasible(self, session, day, start_order):
+        entity = session.entity
+        if entity.session_type != 'lab' and day in self.entity_days[session.entity_index]:
+            return False
+        orders = session_slot_orders(entity.session_type, start_order)
+        if not is_slot_available(self.state, entity.faculty_id, entity.section_id, entity.room_id, day, orders):
+            return False
+        check = self.context.block_check
+        return check is None or check(self.state, entity, self.state.mask(day, orders))
+
+    def assign(self, session, day, start_order):
+        entity = session.entity
+        orders = session_slot_orders(entity.session_type, start_order)
+        occupy_slot(self.state, entity.faculty_id, entity.section_id, entity.room_id, day, orders)
+        for key in self._keys(entity.faculty_id, entity.section_id, entity.room_id, day, orders):
+            self.owner[key] = session
+        if entity.session_type != 'lab':
+            self.entity_days[session.entity_index].add(day)
+        session.day = day
+        session.slot_order = start_order
+        self.placed_count += 1
+
+    def unassign(self, session):
+        entity = session.entity
+        orders = session_slot_orders(entity.session_type, session.slot_order)
+        release_slot(self.state, entity.faculty_id, entity.section_id, entity.room_id, session.day, orders)
+        for key in self._keys(entity.faculty_id, entity.section_id, entity.room_id, session.day, orders):
+            self.owner.pop(key, None)
+        if entity.session_type != 'lab':
+            self.entity_days[session.entity_index].discard(session.day)
+        session.day = None
+        session.slot_order = None
+        self.placed_count -= 1
+
+    # Placed sessions that would have to move for session to take (day, start_order).
+    # None means the position is blocked by a locked entry or by the session's own entity.
+    def blockers(self, session, day, start_order):
+        entity = session.entity
+        if entity.session_type != 'lab' and day in self.entity_days[session.entity_index]:
+            return None
+        orders = session_slot_orders(entity.session_type, start_order)
+        found = []
+        for key in self._keys(entity.faculty_id, entity.section_id, entity.room_id, day, orders):
+            if key in self.fixed:
+                return None
+            other = self.owner.get(key)
+            if other is not None and other not in found:
+                if other.entity_index == session.entity_index or other in self._chain:
+                    return None
+                found.append(other)
+        return found
+
+    def place(self, session, depth=MAX_BACKTRACK_DEPTH):
+        entity = session.entity
+        options = self.candidates(session)
+        free_days = {}
+        check = self.context.block_check
+        for day, order in options:
+            if order not in free_days:
+                orders = session_slot_orders(entity.session_type, order)
+                free_days[order] = available_days(self.state, entity.faculty_id, entity.section_id, entity.room_id, self.context.days, orders)
+            if day in free_days[order] and (entity.session_type == 'lab' or day not in self.entity_days[session.entity_index]):
+                if check is None or check(self.state, entity, self.state.mask(day, session_slot_orders(entity.session_type, order))):
+                    self.assign(session, day, order)
+                    return True
+        if depth <= 0 or self.backtracks >= self.max_backtracks or self.out_of_time():
+            return False
+        # Bounded backtracking: eject a single blocking session and re-place it elsewhere
+        self._chain.add(session)
+        try:
+            for day, order in options:
+                found = self.blockers(session, day, order)
+                if not found or len(found) != 1:
+                    continue
+                blocker = found[0]
+                self.backtracks += 1
+                old_day, old_order = blocker.day, blocker.slot_order
+                self.unassign(blocker)
+                # The blocker may not be the only obstacle (unavailability, run limits)
+                if not self.feasible(session, day, order):
+                    self.assign(blocker, old_day, old_order)
+                    continue
+                self.assign(session, day, order)
+                if self.place(blocker, depth - 1):
+                    return True
+                self.unassign(session)
+                self.assign(blocker, old_day, old_order)
+                if self.backtracks >= self.max_backtracks or self.out_of_time():
+                    break
+        finally:
+            self._chain.discard(session)
+        return False
+
+    def construct(self):
+        # Most-constrained first: labs (double periods) before theory, then sessions
+        # whose faculty, section and room carry the heaviest load
+        load = defaultdict(int)
+        for s in self.sessions:
+            e = s.entity
+            load[('faculty', e.faculty_id)] += 1
+            load[('section', e.section_id)] += 1
+            load[('room', e.room_id)] += 1
+        def difficulty(s):
+            e = s.entity
+            return (
+                0 if e.session_type == 'lab' else 1,
+                -(load[('faculty', e.faculty_id)] + load[('section', e.section_id)] + load[('room', e.room_id)]),
+                self.rng.random()
+            )
+        for i, session in enumerate(sorted(self.sessions, key=difficulty)):
+            if self.cancel is not None and self.cancel.is_set():
+                return
+            self.place(session)
+            if i % PROGRESS_EVERY == 0:
+                self.report(placed=self.placed_count)
+        self.report(placed=self.placed_count)
+
+    def assignments(self):
+        return [
+            Assignment(s.entity, s.day, self.context.slot_by_order[s.slot_order].id, s.slot_order)
+            for s in self.sessions if s.placed
+        ]
+
+    def score(self):
+        return calculate_score(self.assignments(), self.context.weights)
+
+    def score_engine(self):
+        entities = [s.entity for s in self.sessions]
+        engine = ScoreEngine(
+            list(dict.fromkeys(e.section_id for e in entities)),
+            list(dict.fromkeys(e.faculty_id for e in entities)),
+            self.context.days,
+            max(self.context.slot_by_order, default=0),
+            self.context.weights
+        )
+        engine.load(self.assignments())
+        return engine
+
+    # Simulated annealing over relocations and same-section swaps. It stops at the
+    # time budget, or after exactly max_iterations / max_steps when replaying a run.
+    def improve(self):
+        if not any(s.placed for s in self.sessions):
+            return
+        engine = self.score_engine()
+        current = engine.total()
+        temperature = INITIAL_TEMPERATURE
+        iteration = 0
+        by_section = defaultdict(list)
+        for s in self.sessions:
+            by_section[(s.entity.section_id, s.entity.session_type)].append(s)
+        while current > 0:
+            if self.max_iterations is not None and iteration >= self.max_iterations:
+                break
+            if self.out_of_time():
+                break
+            iteration += 1
+            self.iterations = iteration
+            temperature = max(temperature * COOLING_RATE, MIN_TEMPERATURE)
+            if iteration % RETRY_UNPLACED_EVERY == 0:
+                self.retry_unplaced()
+                engine = self.score_engine()
+                current = engine.total()
+            if iteration % PROGRESS_EVERY == 0:
+                self.report(placed=self.placed_count, score=current)
+            session = self.rng.choice(self.sessions)
+            if not session.placed:
+                continue
+            peers = by_section[(session.entity.section_id, session.entity.session_type)]
+            if len(peers) > 1 and self.rng.random() < 0.5:
+                move = self._swap(session, self.rng.choice(peers))
+            else:
+                move = self._relocate(session)
+            if move is None:
+                continue
+            undo, changes = move
+            delta = engine.apply(changes)
+            if delta <= 0 or self.rng.random() < math.exp(-delta / temperature):
+                current += delta
+            else:
+                undo()
+                engine.apply(invert(changes))
+
+    def _relocate(self, session):
+        day, order = self.rng.choice(self.candidates(session))
+        old_day, old_order = session.day, session.slot_order
+        if (day, order) == (old_day, old_order):
+            return None
+        self.unassign(session)
+        if not self.feasible(session, day, order):
+            self.assign(session, old_day, old_order)
+            return None
+        self.assign(session, day, order)
+        def undo():
+            self.unassign(session)
+            self.assign(session, old_day, old_order)
+        e = session.entity
+        return undo, [(e.section_id, e.faculty_id, old_day, old_order, -1), (e.section_id, e.faculty_id, day, order, 1)]
+
+    def _swap(self, a, b):
+        if a is b or not b.placed or (a.day, a.slot_order) == (b.day, b.slot_order):
+            return None
+        a_pos, b_pos = (a.day, a.slot_order), (b.day, b.slot_order)
+        self.unassign(a)
+        self.unassign(b)
+        if self.feasible(a, *b_pos):
+            self.assign(a, *b_pos)
+            if self.feasible(b, *a_pos):
+                self.assign(b, *a_pos)
+                def undo():
+                    self.unassign(a)
+                    self.unassign(b)
+                    self.assign(a, *a_pos)
+                    self.assign(b, *b_pos)
+                ea, eb = a.entity, b.entity
+                return undo, [
+                    (ea.section_id, ea.faculty_id, a_pos[0], a_pos[1], -1),
+                    (ea.section_id, ea.faculty_id, b_pos[0], b_pos[1], 1),
+                    (eb.section_id, eb.faculty_id, b_pos[0], b_pos[1], -1),
+                    (eb.section_id, eb.faculty_id, a_pos[0], a_pos[1], 1),
+                ]
+            self.unassign(a)
+        self.assign(a, *a_pos)
+        self.assign(b, *b_pos)
+        return None
+
+    def retry_unplaced(self):
+        for session in self.sessions:
+            if not session.placed and not self.out_of_time():
+                self.place(session)
+
+# reasons: id(entity) -> why it could not be placed at all (see CompiledConstraints.rejected)
+def find_unplaced(entities, assignments, reasons=None):
+    placed = defaultdict(int)
+    for a in assignments:
+        placed[id(a.entity)] += 1
+    unplaced = []
+    for entity in entities:
+        required = 1 if entity.session_type == 'lab' else entity.slots_required
+        missing = required - placed[id(entity)]
+        if missing > 0:
+            item = {
+                'sectionId': entity.section_id,
+                'subjectId': entity.subject_id,
+                'facultyId': entity.faculty_id,
+                'subjectCode': entity.subject_code,
+                'sessionType': entity.session_type,
+                'missingSessions': missing
+            }
+            if reasons and id(entity) in reasons:
+                item['reason'] = reasons[id(entity)]
+            unplaced.append(item)
+    return unplaced
+
+def solve_greedy(entities, context, locked_entries, time_budget=None, seed=None, progress=None, cancel=None,
+                 iterations=None, steps=None):
+    return generate_schedule(entities, context.sorted_slots, context.rooms, locked_entries, context=context,
+                             rng=random.Random(seed))
+
+def _search(entities, context, locked_entries, time_budget, seed, progress, cancel, iterations, steps):
+    if iterations is not None or steps is not None:
+        # Replaying a run: no wall-clock cut-offs, only the recorded iteration and step counts
+        deadline = math.inf
+    else:
+        deadline = time.perf_counter() + (DEFAULT_TIME_BUDGET if time_budget is None else time_budget)
+    return ScheduleSearch(entities, context, locked_entries, random.Random(seed), deadline,
+                          progress=progress, cancel=cancel, max_iterations=iterations, max_steps=steps)
+
+# 'steps' is the budget check at which the time ran out (None if it never did)
+def solve_backtracking(entities, context, locked_entries, time_budget=None, seed=None, progress=None, cancel=None,
+                       iterations=None, steps=None):
+    search = _search(entities, context, locked_entries, time_budget, seed, progress, cancel, iterations, steps)
+    search.construct()
+    assignments = search.assignments()
+    return {'assignments': assignments, 'success': True, 'steps': search.cut_at}
+
+def solve_anneal(entities, context, locked_entries, time_budget=None, seed=None, progress=None, cancel=None,
+                 iterations=None, steps=None):
+    search = _search(entities, context, locked_entries, time_budget, seed, progress, cancel, iterations, steps)
+    search.construct()
+    search.retry_unplaced()
+    search.improve()
+    assignments = search.assignments()
+    return {'assignments': assignments, 'success': True, 'iterations': search.iterations, 'steps': search.cut_at}
+
+SOLVERS = {
+    'greedy': solve_greedy,
+    'backtracking': solve_backtracking,
+    'anneal': solve_anneal,
+}
+
+# --- Multi-start ---
+#
+# Worker processes receive a compact, picklable snapshot once (as the pool
+# initializer) and then only a seed per start; they send back plain tuples.
+
+SlotRow = namedtuple('SlotRow', 'id slot_order')
+RoomRow = namedtuple('RoomRow', 'id name capacity')
+FixedEntry = namedtuple('FixedEntry', 'faculty_id section_id room_id time_slot_id day_of_week session_type')
+
+_worker_input = None
+
+def snapshot(entities, context, locked_entries):
+    return (
+        [(e.section_id, e.subject_id, e.faculty_id, e.room_id, e.session_type, e.slots_required,
+          e.subject_code, e.subject_name, e.faculty_name) for e in entities],
+        [(s.id, s.slot_order) for s in context.sorted_slots],
+        [(r.id, r.name, getattr(r, 'capacity', None)) for r in context.rooms],
+        [(x.faculty_id, x.section_id, x.room_id, x.time_slot_id, x.day_of_week, x.session_type)
+         for x in locked_entries],
+        context.constraints.config if context.constraints else None,
+    )
+
+def _init_worker(data):
+    global _worker_input
+    entity_rows, slot_rows, room_rows, fixed_rows, constraints = data
+    entities = [SchedulableEntity(*row) for row in entity_rows]
+    rooms = [RoomRow(*row) for row in room_rows]
+    context = SchedulingContext([SlotRow(*row) for row in slot_rows], rooms,
+                                compile_constraints(constraints, rooms) if constraints is not None else None)
+    _worker_input = (entities, context, [FixedEntry(*row) for row in fixed_rows])
+
+def _run_start(solver, time_budget, seed, iterations, steps):
+    entities, context, fixed = _worker_input
+    index = {id(e): i for i, e in enumerate(entities)}
+    result = SOLVERS[solver](entities, context, fixed, time_budget=time_budget, seed=seed, iterations=iterations,
+                             steps=steps)
+    assignments = result['assignments']
+    return {
+        'seed': seed,
+        'iterations': result.get('iterations'),
+        'steps': result.get('steps'),
+        'placed': len(assignments),
+        'score': calculate_score(assignments, context.weights),
+        'assignments': [(index[id(a.entity)], a.day_of_week, a.time_slot_id, a.slot_order) for a in assignments],
+    }
+
+def solve_multistart(entities, context, locked_entries, solver, starts, time_budget=None, seed=None,
+                     progress=None, cancel=None, max_workers=None):
+    base = random.Random(seed)
+    seeds = [base.randrange(SEED_RANGE) for _ in range(starts)]
+    workers = min(starts, max_workers or os.cpu_count() or 1)
+    best, runs = None, []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(snapshot(entities, context, locked_entries),)) as pool:
+        pending = {pool.submit(_run_start, solver, time_budget, s, None, None) for s in seeds}
+        while pending:
+            done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            if cancel is not None and cancel.is_set():
+                for future in pending:
+                    future.cancel()
+                raise SolverCancelled()
+            for future in done:
+                run = future.result()
+                runs.append({'seed': run['seed'], 'iterations': run['iterations'], 'steps': run['steps'],
+                             'placed': run['placed'], 'score': run['score']})
+                # Most placed sessions first, then the lowest soft-constraint score
+                if best is None or (run['placed'], -run['score']) > (best['placed'], -best['score']):
+                    best = run
+                if progress:
+                    progress(placed=best['placed'], score=best['score'])
+    assignments = [
+        Assignment(entities[i], day, time_slot_id, slot_order)
+        for i, day, time_slot_id, slot_order in best['assignments']
+    ]
+    runs.sort(key=lambda r: seeds.index(r['seed']))
+    return {'assignments': assignments, 'success': True, 'seed': best['seed'],
+            'iterations': best['iterations'], 'steps': best['steps'], 'starts': runs}
+
+def _int_param(value, name, minimum, maximum):
+    if isinstance(value, bool) or not isinstance(value, int) or not minimum <= value <= maximum:
+        raise SolverError(f'{name} must be an integer between {minimum} and {maximum}')
+    return value
+
+def solve(entities, time_slots, rooms, locked_entries, solver='greedy', time_budget=None, seed=None,
+          context=None, progress=None, cancel=None, starts=1, iterations=None, steps=None, max_workers=None):
+    engine = SOLVERS.get(solver)
+    if engine is None:
+        raise SolverError(f"Unknown solver '{solver}'. Available: {', '.join(sorted(SOLVERS))}")
+    if time_budget is not None:
+        try:
+            time_budget = float(time_budget)
+        except (TypeError, ValueError):
+            raise SolverError('timeBudget must be a number of seconds')
+        if time_budget < 0:
+            raise SolverError('timeBudget must be a number of seconds')
+    starts = _int_param(starts, 'starts', 1, MAX_STARTS)
+    if iterations is not None:
+        iterations = _int_param(iterations, 'iterations', 0, 10 ** 9)
+    if steps is not None:
+        steps = _int_param(steps, 'steps', 1, 10 ** 12)
+    if seed is not None:
+        seed = _int_param(seed, 'seed', 0, SEED_RANGE - 1)
+    if context is None:
+        context = SchedulingContext(time_slots, rooms)
+    # Entities a hard constraint rules out entirely are reported, not searched
+    reasons = context.constraints.rejected(entities) if context.constraints else {}
+    placeable = [e for e in entities if id(e) not in reasons] if reasons else entities
+    if progress:
+        progress(total=sum(1 if e.session_type == 'lab' else e.slots_required for e in entities))
+    if starts > 1:
+        result = solve_multistart(placeable, context, locked_entries, solver, starts, time_budget=time_budget,
+                                  seed=seed, progress=progress, cancel=cancel, max_workers=max_workers)
+    else:
+        # Always run from a concrete seed so the result can be reproduced
+        if seed is None:
+            seed = random.randrange(SEED_RANGE)
+        result = engine(placeable, context, locked_entries, time_budget=time_budget, seed=seed,
+                        progress=progress, cancel=cancel, iterations=iterations, steps=steps)
+        result['seed'] = seed
+    if cancel is not None and cancel.is_set():
+        raise SolverCancelled()
+    assignments = result['assignments']
+    if progress:
+        progress(phase='score')
+    score = calculate_score(assignments, context.weights)
+    if progress:
+        progress(placed=len(assignments), score=score)
+    unplaced = find_unplaced(entities, assignments, reasons)
+    result['score'] = score
+    result['unplaced'] = unplaced
+    result['solver'] = solver
+    result.setdefault('iterations', None)
+    result.setdefault('steps', None)
+    if 'message' not in result:
+        result['message'] = f'Generated {len(assignments)} timetable entries with optimization score {score}'
+    if unplaced:
+        missing = sum(u['missingSessions'] for u in unplaced)
+        result['message'] += f' ({missing} sessions could not be placed)'
+    return result
+# --- End Solver Engines ---
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import threading
+import time
+from flask import current_app
+from .extensions import db
+from .database import read_execute
+from .erp_models import Section, Faculty, UserRole, Room, TimeSlot, TimetableEntry, SectionUnplaced
+from .revisions import current_revision
+from .constraints import configured_days
+
+# --- Dashboard Stats Cache ---
+#
+# Head counts are cached for a TTL and dropped explicitly by the endpoints that
+# change them; the TTL bounds their staleness across workers. Timetable numbers
+# are cached per timetable revision, so every worker recomputes them once after
+# any change commits. Unplaced sessions come from the per-section counts each
+# generation stores, and stay None until every section has been generated.
+
+DEFAULT_STATS_TTL = 30  # seconds
+
+class StatsCache:
+    def __init__(self, ttl=DEFAULT_STATS_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counts = None
+        self._expires_at = 0.0
+        self._timetable = None
+        self._timetable_revision = None
+
+    def init_app(self, app):
+        self.ttl = app.config.get('STATS_CACHE_TTL', DEFAULT_STATS_TTL)
+
+    def invalidate(self):
+        with self._lock:
+            self._counts = None
+
+    def counts(self):
+        with self._lock:
+            if self._counts is not None and time.monotonic() < self._expires_at:
+                return self._counts
+        # Head counts tolerate replica lag; timetable numbers below read the primary
+        # because they are recomputed right after a generation commits
+        count = db.func.count()
+        counts = {
+            'students': read_execute(db.select(count).select_from(UserRole).where(UserRole.role == 'student')).scalar(),
+            'faculty': read_execute(db.select(count).select_from(Faculty)).scalar(),
+            'classes': read_execute(db.select(count).select_from(Section)).scalar()
+        }
+        with self._lock:
+            self._counts = counts
+            self._expires_at = time.monotonic() + self.ttl
+        return counts
+
+    def timetable(self):
+        revision = current_revision()
+        with self._lock:
+            if self._timetable is not None and self._timetable_revision == revision:
+                return self._timetable
+        timetable = self._compute_timetable()
+        with self._lock:
+            self._timetable = timetable
+            self._timetable_revision = revision
+        return timetable
+
+    def _compute_timetable(self):
+        entries = TimetableEntry.__table__
+        sections = Section.__table__
+        unplaced = SectionUnplaced.__table__
+        section_count, recorded, missing = db.session.execute(
+            db.select(db.func.count(sections.c.id), db.func.count(unplaced.c.section_id),
+                      db.func.sum(unplaced.c.missing_sessions))
+            .select_from(sections.outerjoin(unplaced, unplaced.c.section_id == sections.c.id))).one()
+        # Sections no generation has covered yet leave the campus total unknown
+        unplaced_sessions = (missing or 0) if section_count and recorded == section_count else None
+        # Labs hold their room for two periods
+        periods = db.func.sum(db.case((entries.c.session_type == 'lab', 2), else_=1))
+        entry_count, occupied = db.session.execute(db.select(db.func.count(), periods).select_from(entries)).one()
+        days = configured_days(current_app.config.get('SCHEDULER_CONSTRAINTS'))
+        capacity = Room.query.count() * TimeSlot.query.count() * len(days)
+        return {
+            'entries': entry_count,
+            'unplacedSessions': unplaced_sessions,
+            'roomUtilization': round((occupied or 0) / capacity, 4) if capacity else 0.0,
+            'updatedAt': int(time.time())
+        }
+
+    def snapshot(self):
+        stats = dict(self.counts())
+        stats['timetable'] = self.timetable()
+        return stats
+
+stats_cache = StatsCache()
+
+def stats_etag(stats):
+    return hashlib.sha1(json.dumps(stats, sort_keys=True, default=str).encode()).hexdigest()
+# --- End Dashboard Stats Cache ---
@@ -0,0 +1,42 @@
+import os
+import tempfile
+import pytest
+
+# The app reads its database URI on import, so point it at a scratch SQLite file first
+_db_dir = tempfile.mkdtemp(prefix='erp-tests-')
+os.environ['MYSQL_URI'] = 'sqlite:///' + os.path.join(_db_dir, 'test.db')
+
+from backend.app import app as flask_app
+from backend.extensions import db
+from backend.erp_models import TimetableRevision
+from backend.revisions import bump_revision
+from backend.bench.campus import CampusSpec, populate
+
+with flask_app.app_context():
+    db.create_all()
+
+# Every test starts from empty tables at a new timetable revision, so the
+# per-process caches (occupancy index, stats, reports) drop what earlier tests left
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        for table in reversed(db.metadata.sorted_tables):
+            if table.name != TimetableRevision.__tablename__:
+                db.session.execute(table.delete())
+        bump_revision()
+        db.session.commit()
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+# A small synthetic campus (see backend/bench/campus.py) with no generated entries yet
+@pytest.fixture
+def campus(app):
+    spec = CampusSpec(6, departments=2)
+    with app.app_context():
+        populate(spec)
+    return spec
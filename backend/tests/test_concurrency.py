@@ -0,0 +1,35 @@
+import threading
+import pytest
+from backend.bench.concurrency import find_clashes
+
+SCOPES = [{}, {'department': 'D0'}, {'department': 'D1'}, {'sectionId': 'sec-0'}, {'sectionId': 'sec-1'}, {}]
+
+# Overlapping campus, department and section regenerations either commit or are
+# turned away with 409, and never leave a section, faculty member or room double-booked
+@pytest.mark.parametrize('lock_timeout', [0, 30])
+def test_overlapping_generations_never_double_book(app, campus, monkeypatch, lock_timeout):
+    monkeypatch.setitem(app.config, 'GENERATION_LOCK_TIMEOUT', lock_timeout)
+    start = threading.Barrier(len(SCOPES))
+    statuses = []
+
+    def worker(index):
+        client = app.test_client()
+        start.wait()
+        for round_index in range(2):
+            scope = SCOPES[(index + round_index) % len(SCOPES)]
+            body = {'action': 'regenerate', 'output': 'summary', 'seed': index * 10 + round_index, **scope}
+            statuses.append(client.post('/api/generate-timetable', json=body).status_code)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(SCOPES))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(statuses) == 2 * len(SCOPES)
+    assert set(statuses) <= {200, 409}
+    assert 200 in statuses
+    with app.app_context():
+        entry_count, clashes = find_clashes()
+    assert entry_count
+    assert clashes == []
@@ -0,0 +1,47 @@
+import threading
+from backend.jobs import JobManager
+from backend.erp_models import TimetableEntry
+
+def test_inline_job_succeeds(app, campus):
+    manager = JobManager(app, max_workers=0)
+    job = manager.submit({'action': 'regenerate', 'output': 'summary'})
+    polled = manager.get(job.id).to_dict()
+    assert polled['status'] == 'succeeded'
+    assert polled['phase'] == 'persist'
+    assert polled['result']['success']
+    assert polled['progress']['placed'] == polled['progress']['total']
+    with app.app_context():
+        assert TimetableEntry.query.count() == polled['result']['entriesCount'] + \
+            TimetableEntry.query.filter_by(is_locked=True).count()
+
+def test_failed_job_reports_the_error(app, campus):
+    manager = JobManager(app, max_workers=0)
+    job = manager.submit({'action': 'regenerate', 'department': 'no-such-department'})
+    polled = job.to_dict()
+    assert polled['status'] == 'failed'
+    assert polled['error'] == 'No sections found for the requested scope'
+    assert 'result' not in polled
+
+def test_cancelled_queued_job_never_runs(app, campus):
+    manager = JobManager(app, max_workers=1)
+    # Occupy the only worker so the next job stays queued
+    release = threading.Event()
+    blocker = manager.executor.submit(release.wait)
+    try:
+        job = manager.submit({'action': 'regenerate', 'output': 'summary'})
+        assert job.status == 'queued'
+        assert manager.cancel(job.id) is job
+        assert job.status == 'cancelled'
+    finally:
+        release.set()
+        blocker.result()
+    manager.executor.shutdown(wait=True)
+    assert job.to_dict()['status'] == 'cancelled'
+    assert job.started_at is None
+    with app.app_context():
+        assert TimetableEntry.query.filter_by(is_locked=False).count() == 0
+
+def test_unknown_job_is_404(client):
+    assert client.get('/api/generate-timetable/jobs/no-such-job').status_code == 404
+    assert client.post('/api/generate-timetable/jobs/no-such-job/cancel').status_code == 404
+    assert JobManager(None, max_workers=0).cancel('no-such-job') is None
@@ -0,0 +1,84 @@
+from datetime import time
+from backend.extensions import db
+from backend.erp_models import Section, Subject, Faculty, Room, TimeSlot, TimetableEntry
+
+def _entry(id, subject_id, day, slot_id, room_id='R1', session_type='theory'):
+    return TimetableEntry(id=id, section_id='S1', subject_id=subject_id, faculty_id='F1', room_id=room_id,
+                          time_slot_id=slot_id, day_of_week=day, session_type=session_type, is_locked=False)
+
+# One section taught by one faculty member: two theory subjects, a lab with
+# its own lab room and a lab without one, two classrooms and a lab
+def _add_section(entries):
+    db.session.add_all([
+        Section(id='S1', name='S1', department='CSE', classroom='R1'),
+        Subject(id='T1', name='Maths', code='MA1', type='theory', credits=3),
+        Subject(id='T2', name='Physics', code='PH1', type='theory', credits=3),
+        Subject(id='L1', name='Workshop', code='WS1', type='lab', credits=2),
+        Subject(id='L2', name='Chemistry Lab', code='CH1', type='lab', lab_room='LAB1', credits=2),
+        Faculty(id='F1', name='F1', department='CSE'),
+        Room(id='R1', name='R1', type='classroom', capacity=60),
+        Room(id='R2', name='R2', type='classroom', capacity=60),
+        Room(id='LAB1', name='LAB1', type='lab', capacity=30),
+    ] + [TimeSlot(id=f'P{order}', start_time=time(8 + order), end_time=time(8 + order, 50), slot_order=order)
+         for order in range(1, 5)])
+    db.session.flush()
+    db.session.add_all(entries)
+    db.session.commit()
+
+# Two entries sharing their section, faculty member and room in the same
+# period on different days; swapping them keeps every resource's week intact
+def test_swap_entries_sharing_a_period(app, client):
+    with app.app_context():
+        _add_section([_entry('A', 'T1', 1, 'P1'), _entry('B', 'T2', 2, 'P1')])
+
+    response = client.post('/api/timetable/A/swap', json={'swap_with': 'B'})
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['valid']
+
+    with app.app_context():
+        placed = {e.id: (e.day_of_week, e.time_slot_id) for e in TimetableEntry.query.all()}
+    assert placed == {'A': (2, 'P1'), 'B': (1, 'P1')}
+
+# Like the solver, a theory subject gets at most one session a day
+def test_move_keeps_one_theory_session_per_day(app, client):
+    with app.app_context():
+        _add_section([_entry('A', 'T1', 1, 'P1'), _entry('B', 'T1', 2, 'P1'), _entry('C', 'T2', 1, 'P2')])
+
+    result = client.post('/api/timetable/B/validate-move', json={'day_of_week': 1, 'time_slot_id': 'P3'}).get_json()
+    assert not result['valid']
+    assert result['conflicts'] == [{'type': 'subjectDay', 'entryId': 'A', 'dayOfWeek': 1}]
+    assert all(alternative['day_of_week'] != 1 for alternative in result['alternatives'])
+    assert client.post('/api/timetable/B/validate-move', json={'day_of_week': 2, 'time_slot_id': 'P3'}).get_json()['valid']
+    assert client.post('/api/timetable/C/validate-move', json={'day_of_week': 2, 'time_slot_id': 'P3'}).get_json()['valid']
+    # Swapping the two sessions of one subject keeps them on separate days
+    assert client.post('/api/timetable/A/swap', json={'swap_with': 'B'}).get_json()['valid']
+
+# A lab whose subject has no lab room runs in a classroom, as the generator
+# places it; labs with a lab room and theory sessions keep their room type
+def test_move_room_types_follow_the_generator(app, client):
+    with app.app_context():
+        _add_section([_entry('A', 'T1', 1, 'P1'), _entry('W', 'L1', 2, 'P1', session_type='lab'),
+                      _entry('C', 'L2', 3, 'P1', room_id='LAB1', session_type='lab')])
+
+    def move(entry_id, room_id):
+        return client.post(f'/api/timetable/{entry_id}/validate-move',
+                           json={'day_of_week': 4, 'time_slot_id': 'P1', 'room_id': room_id})
+
+    assert move('W', 'R2').get_json()['valid']
+    assert move('W', 'LAB1').get_json()['valid']
+    assert move('C', 'R2').status_code == 400
+    assert move('A', 'LAB1').status_code == 400
+    assert move('A', 'R2').get_json()['valid']
+
+# Toggling reads the entry under the commit lock; a missing entry is a 404
+def test_toggle_lock(app, client, campus):
+    with app.app_context():
+        entry_id = TimetableEntry.query.filter_by(is_locked=True).first().id
+    response = client.post(f'/api/timetable/{entry_id}/toggle-lock')
+    assert response.get_json() == {'id': entry_id, 'is_locked': False}
+    response = client.post(f'/api/timetable/{entry_id}/toggle-lock', json={'is_locked': False})
+    assert response.get_json() == {'id': entry_id, 'is_locked': False}
+    with app.app_context():
+        assert db.session.get(TimetableEntry, entry_id).is_locked is False
+    assert client.post('/api/timetable/no-such-entry/toggle-lock').status_code == 404
+    assert client.post(f'/api/timetable/{entry_id}/toggle-lock', json={'is_locked': 'true'}).status_code == 400
@@ -0,0 +1,33 @@
+from backend.erp_models import Room
+
+def _generate(client):
+    assert client.post('/api/generate-timetable', json={'action': 'regenerate', 'output': 'summary'}).status_code == 200
+
+# Filtering by room type recomputes the totals over the rooms it lists
+def test_room_filter_applies_to_the_totals(app, client, campus):
+    _generate(client)
+    report = client.get('/api/reports/room-utilization').get_json()
+    labs = client.get('/api/reports/room-utilization?type=lab').get_json()
+    with app.app_context():
+        lab_count = Room.query.filter_by(type='lab').count()
+
+    assert len(labs['rooms']) == lab_count and all(room['type'] == 'lab' for room in labs['rooms'])
+    occupied = sum(room['occupiedPeriods'] for room in labs['rooms'])
+    available = sum(room['availablePeriods'] for room in labs['rooms'])
+    assert labs['utilization'] == round(occupied / available, 4) != report['utilization']
+    assert labs['byType']['lab'] == report['byType']['lab']
+    assert labs['byType']['classroom'] == {'rooms': 0, 'utilization': 0.0}
+    assert labs['idleGaps'] == sum(room['idleGaps'] for room in labs['rooms'])
+    # Summed over a day, the heatmap shares add up to the listed labs' busy periods that day
+    per_day = len(labs['slotOrders'])
+    for d, day in enumerate(labs['heatmap']):
+        busy = sum(room['dailyUtilization'][d] * per_day for room in labs['rooms'])
+        assert round(sum(day) * lab_count) == round(busy)
+
+# A configured sixth day shows up even before anything is scheduled on it
+def test_reports_use_the_configured_days(app, client, campus, monkeypatch):
+    monkeypatch.setitem(app.config, 'SCHEDULER_CONSTRAINTS', {'days': [1, 2, 3, 4, 5, 6]})
+    for name in ('room-utilization', 'faculty-workload', 'section-load'):
+        assert client.get(f'/api/reports/{name}').get_json()['days'] == [1, 2, 3, 4, 5, 6]
+    room = client.get('/api/reports/room-utilization').get_json()['rooms'][0]
+    assert len(room['dailyUtilization']) == 6
@@ -0,0 +1,88 @@
+import random
+from collections import defaultdict
+import pytest
+from backend.scheduling import Assignment, SchedulableEntity, calculate_score
+from backend.scoring import ScoreEngine
+
+DAYS = [1, 2, 3, 4, 5]
+SLOTS = list(range(1, 8))
+
+# The per-assignment loops calculate_score used before ScoreEngine, kept as the reference
+def reference_score(assignments):
+    score = 0
+    section_day = defaultdict(int)
+    faculty_day_slots = defaultdict(list)
+    for a in assignments:
+        if a.slot_order == 1:
+            score += 2
+        if a.slot_order == 7:
+            score += 1
+        section_day[(a.entity.section_id, a.day_of_week)] += 1
+        faculty_day_slots[(a.entity.faculty_id, a.day_of_week)].append(a.slot_order)
+    for count in section_day.values():
+        if count > 5:
+            score += (count - 5) * 3
+    for slots in faculty_day_slots.values():
+        slots = sorted(set(slots))
+        for i in range(1, len(slots)):
+            score += (slots[i] - slots[i - 1] - 1) * 2
+    return score
+
+# Two sections and three faculty crammed into a short week, so sections go over
+# their daily limit and faculty pick up idle periods
+def _random_timetable(rng, size):
+    assignments = []
+    for _ in range(size):
+        entity = SchedulableEntity(rng.choice(['S1', 'S2']), 'SUB', rng.choice(['F1', 'F2', 'F3']),
+                                   None, 'theory', 1, 'SUB', 'Subject', 'Faculty')
+        slot_order = rng.choice(SLOTS)
+        assignments.append(Assignment(entity, rng.choice(DAYS[:3]), slot_order, slot_order))
+    return assignments
+
+def _engine(assignments):
+    engine = ScoreEngine(['S1', 'S2'], ['F1', 'F2', 'F3'], DAYS, max(SLOTS))
+    engine.load(assignments)
+    return engine
+
+def _move(rng, assignments):
+    a = rng.choice(assignments)
+    return a, rng.choice(DAYS), rng.choice(SLOTS)
+
+@pytest.mark.parametrize('seed', range(20))
+def test_engine_matches_reference_score(seed):
+    rng = random.Random(seed)
+    assignments = _random_timetable(rng, rng.randint(0, 40))
+    expected = reference_score(assignments)
+    assert _engine(assignments).total() == expected
+    assert calculate_score(assignments) == expected
+
+# Applying a series of moves keeps the running total equal to a full rescore
+@pytest.mark.parametrize('seed', range(10))
+def test_apply_tracks_full_rescore(seed):
+    rng = random.Random(seed)
+    assignments = _random_timetable(rng, 30)
+    engine = _engine(assignments)
+    score = engine.total()
+    for _ in range(50):
+        a, day, slot_order = _move(rng, assignments)
+        s, f = a.entity.section_id, a.entity.faculty_id
+        score += engine.apply([(s, f, a.day_of_week, a.slot_order, -1), (s, f, day, slot_order, 1)])
+        a.day_of_week, a.slot_order = day, slot_order
+        assert score == engine.total() == reference_score(assignments)
+
+# move_delta predicts the rescore of the moved timetable and leaves the engine untouched
+@pytest.mark.parametrize('seed', range(10))
+def test_move_delta_matches_full_rescore(seed):
+    rng = random.Random(seed)
+    assignments = _random_timetable(rng, 30)
+    engine = _engine(assignments)
+    before = reference_score(assignments)
+    for _ in range(50):
+        a, day, slot_order = _move(rng, assignments)
+        delta = engine.move_delta(a.entity.section_id, a.entity.faculty_id,
+                                  a.day_of_week, a.slot_order, day, slot_order)
+        old = a.day_of_week, a.slot_order
+        a.day_of_week, a.slot_order = day, slot_order
+        assert before + delta == reference_score(assignments)
+        a.day_of_week, a.slot_order = old
+        assert engine.total() == before
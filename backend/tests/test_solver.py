@@ -0,0 +1,22 @@
+import pytest
+from backend.bench.campus import CampusSpec, populate
+from backend.generation import prepare_generation
+
+def _placements(result):
+    return sorted((a.entity.section_id, a.entity.subject_id, a.day_of_week, a.slot_order)
+                  for a in result['assignments'])
+
+# A run cut short by its time budget replays exactly from its seed, iterations and steps
+@pytest.mark.parametrize('solver, budget', [('backtracking', 0), ('backtracking', 0.01),
+                                            ('anneal', 0), ('anneal', 0.02)])
+def test_replay_of_a_run_that_hit_its_deadline(app, solver, budget):
+    with app.app_context():
+        populate(CampusSpec(30, departments=2, theory_per_section=11, labs_per_section=3))
+        live = prepare_generation({'action': 'regenerate', 'solver': solver, 'timeBudget': budget}).result
+        if budget == 0:
+            assert live['steps'] == 1
+        replay = prepare_generation({'action': 'regenerate', 'solver': solver, 'seed': live['seed'],
+                                     'iterations': live['iterations'], 'steps': live['steps']}).result
+    assert _placements(replay) == _placements(live)
+    assert replay['steps'] == live['steps']
+    assert replay['iterations'] == live['iterations']
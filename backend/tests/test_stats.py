@@ -0,0 +1,27 @@
+from backend.stats import StatsCache
+from backend.erp_models import Room, TimeSlot, TimetableEntry
+
+# Unplaced sessions come from the database, so every worker reports the same
+# campus-wide number, and none until every section has been generated
+def test_unplaced_sessions_need_every_section(app, client, campus):
+    other_worker = StatsCache()
+    scoped = client.post('/api/generate-timetable', json={'action': 'regenerate', 'department': 'D0',
+                                                            'output': 'summary'})
+    assert scoped.status_code == 200
+    assert client.get('/api/stats').get_json()['timetable']['unplacedSessions'] is None
+
+    campus_run = client.post('/api/generate-timetable', json={'action': 'regenerate', 'output': 'summary'})
+    missing = sum(u['missingSessions'] for u in campus_run.get_json()['unplaced'])
+    assert client.get('/api/stats').get_json()['timetable']['unplacedSessions'] == missing
+    with app.app_context():
+        assert other_worker.timetable()['unplacedSessions'] == missing
+
+def test_room_utilization_uses_the_configured_days(app, client, campus, monkeypatch):
+    monkeypatch.setitem(app.config, 'SCHEDULER_CONSTRAINTS', {'days': [1, 2, 3, 4, 5, 6]})
+    assert client.post('/api/generate-timetable', json={'action': 'regenerate', 'output': 'summary'}).status_code == 200
+    with app.app_context():
+        entries = TimetableEntry.query.all()
+        capacity = Room.query.count() * TimeSlot.query.count() * 6
+    assert any(e.day_of_week == 6 for e in entries)
+    occupied = sum(2 if e.session_type == 'lab' else 1 for e in entries)
+    assert client.get('/api/stats').get_json()['timetable']['roomUtilization'] == round(occupied / capacity, 4)
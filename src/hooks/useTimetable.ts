@@ -35,16 +35,65 @@ export interface TimetableEntryWithDetails {
   };
 }
 
+interface GridCell {
+  id: string;
+  session_type: string;
+  is_locked: boolean;
+  section_id: string;
+  subject_id: string;
+  faculty_id: string;
+  room_id: string;
+}
+
+// Expands a /api/timetable/grid payload back into entries
+async function fetchGridEntries(kind: "section" | "faculty" | "room", id: string) {
+  const data = await apiFetch(`/api/timetable/grid/${kind}/${encodeURIComponent(id)}`);
+  const entries: TimetableEntryWithDetails[] = [];
+  (data.grid as (GridCell | null)[][]).forEach((row, dayIndex) => {
+    row.forEach((cell, slotIndex) => {
+      if (!cell) return;
+      entries.push({
+        id: cell.id,
+        day_of_week: data.days[dayIndex],
+        session_type: cell.session_type,
+        is_locked: cell.is_locked,
+        time_slot: data.timeSlots[slotIndex],
+        section: data.sections[cell.section_id],
+        subject: data.subjects[cell.subject_id],
+        faculty: data.faculty[cell.faculty_id],
+        room: data.rooms[cell.room_id],
+      } as TimetableEntryWithDetails);
+    });
+  });
+  return entries;
+}
+
+// Reads every page of /api/timetable, following nextCursor until it runs out
+async function fetchAllEntries(params: URLSearchParams) {
+  const entries: TimetableEntryWithDetails[] = [];
+  params.set("limit", "5000");
+  let cursor: string | null = null;
+  do {
+    if (cursor) params.set("cursor", cursor);
+    const data = await apiFetch(`/api/timetable?${params.toString()}`);
+    entries.push(...(data.entries as TimetableEntryWithDetails[]));
+    cursor = data.nextCursor;
+  } while (cursor);
+  return entries;
+}
+
 // Fetch all timetable entries with related data
 export function useTimetableEntries(sectionId?: string, facultyId?: string) {
   return useQuery({
     queryKey: ["timetable-entries", sectionId, facultyId],
     queryFn: async () => {
+      // A single section or faculty member is served from its precomputed grid
+      if (sectionId && !facultyId) return fetchGridEntries("section", sectionId);
+      if (facultyId && !sectionId) return fetchGridEntries("faculty", facultyId);
       const params = new URLSearchParams();
       if (sectionId) params.append("section_id", sectionId);
       if (facultyId) params.append("faculty_id", facultyId);
-      const data = await apiFetch(`/api/timetable?${params.toString()}`);
-      return data.entries as TimetableEntryWithDetails[];
+      return fetchAllEntries(params);
     },
   });
 }
@@ -100,7 +149,8 @@ export function useGenerateTimetable() {
     mutationFn: async (action: "generate" | "regenerate") => {
       const data = await apiFetch("/api/generate-timetable", {
         method: "POST",
-        body: JSON.stringify({ action }),
+        // Views refetch their own entries, so skip the full entry list
+        body: JSON.stringify({ action, output: "summary" }),
       });
       return data;
     },
@@ -139,6 +189,94 @@ export function useToggleLock() {
   });
 }
 
+export interface MoveTarget {
+  day_of_week: number;
+  time_slot_id: string;
+  room_id?: string;
+}
+
+export interface MoveCheck {
+  valid: boolean;
+  conflicts: { type: string; id?: string; entryId?: string; slotOrder?: number }[];
+  alternatives: (MoveTarget & { slot_order: number })[];
+}
+
+// Check a drag-and-drop target while hovering; nothing is written
+export async function validateMove(id: string, target: MoveTarget): Promise<MoveCheck> {
+  return apiFetch(`/api/timetable/${id}/validate-move`, {
+    method: "POST",
+    body: JSON.stringify(target),
+  });
+}
+
+// Move an entry to a new day and period (and optionally room)
+export function useMoveEntry() {
+  const queryClient = useQueryClient();
+  return useMutation({
+    mutationFn: async ({ id, target }: { id: string; target: MoveTarget }) => {
+      return apiFetch(`/api/timetable/${id}/move`, {
+        method: "POST",
+        body: JSON.stringify(target),
+      });
+    },
+    onSuccess: () => {
+      queryClient.invalidateQueries({ queryKey: ["timetable-entries"] });
+      toast.success("Class moved");
+    },
+    onError: (error: Error) => {
+      toast.error(`Failed to move: ${error.message}`);
+    },
+  });
+}
+
+// Exchange the day and period of two entries
+export function useSwapEntries() {
+  const queryClient = useQueryClient();
+  return useMutation({
+    mutationFn: async ({ id, swapWith }: { id: string; swapWith: string }) => {
+      return apiFetch(`/api/timetable/${id}/swap`, {
+        method: "POST",
+        body: JSON.stringify({ swap_with: swapWith }),
+      });
+    },
+    onSuccess: () => {
+      queryClient.invalidateQueries({ queryKey: ["timetable-entries"] });
+      toast.success("Classes swapped");
+    },
+    onError: (error: Error) => {
+      toast.error(`Failed to swap: ${error.message}`);
+    },
+  });
+}
+
+export interface RoomUtilization {
+  id: string;
+  name: string;
+  type: "classroom" | "lab";
+  capacity: number;
+  occupiedPeriods: number;
+  availablePeriods: number;
+  utilization: number;
+  dailyUtilization: number[];
+  idleGaps: number;
+}
+
+// Per-room utilization report (fractions between 0 and 1)
+export function useRoomUtilization() {
+  return useQuery({
+    queryKey: ["reports", "room-utilization"],
+    queryFn: async () => {
+      const data = await apiFetch("/api/reports/room-utilization");
+      return data as {
+        days: number[];
+        rooms: RoomUtilization[];
+        utilization: number;
+        idleGaps: number;
+      };
+    },
+  });
+}
+
 // Transform timetable entries to grid format
 export function transformToGridData(
   entries: TimetableEntryWithDetails[],
@@ -1,15 +1,20 @@
 import { AppLayout } from "@/components/layout/AppLayout";
-import { roomOccupancy } from "@/data/mockTimetable";
+import { useRoomUtilization } from "@/hooks/useTimetable";
 import { Building2, Beaker, TrendingUp, Clock } from "lucide-react";
 import { cn } from "@/lib/utils";
 
 export default function RoomOccupancy() {
+  const { data: report } = useRoomUtilization();
+  const roomOccupancy = (report?.rooms ?? []).map((r) => ({
+    room: r.name,
+    type: r.type,
+    utilization: Math.round(r.utilization * 100),
+    daily: r.dailyUtilization.map((u) => Math.round(u * 100)),
+  }));
   const classrooms = roomOccupancy.filter((r) => r.type === "classroom");
   const labs = roomOccupancy.filter((r) => r.type === "lab");
 
-  const avgUtilization = Math.round(
-    roomOccupancy.reduce((acc, r) => acc + r.utilization, 0) / roomOccupancy.length
-  );
+  const avgUtilization = Math.round((report?.utilization ?? 0) * 100);
 
   const getUtilizationColor = (util: number) => {
     if (util >= 80) return "bg-success text-success";
@@ -70,8 +75,8 @@ export default function RoomOccupancy() {
                 <Clock className="w-5 h-5 text-warning" />
               </div>
               <div>
-                <p className="text-sm text-muted-foreground">Idle Hours</p>
-                <p className="text-2xl font-semibold text-foreground">28</p>
+                <p className="text-sm text-muted-foreground">Idle Periods</p>
+                <p className="text-2xl font-semibold text-foreground">{report?.idleGaps ?? 0}</p>
               </div>
             </div>
           </div>
@@ -106,11 +111,7 @@ export default function RoomOccupancy() {
                       </div>
                     </td>
                     {[0, 1, 2, 3, 4].map((dayIndex) => {
-                      // Simulate daily variation
-                      const dailyUtil = Math.min(
-                        100,
-                        Math.max(0, room.utilization + (Math.random() * 30 - 15))
-                      );
+                      const dailyUtil = room.daily[dayIndex] ?? 0;
                       const opacity = dailyUtil / 100;
                       return (
                         <td key={dayIndex} className="p-1">